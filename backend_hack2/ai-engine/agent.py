@@ -1,10 +1,176 @@
+import base64
+import fcntl
+import hashlib
 import os
+import shutil
 import sys
 import time
-import git
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
+from urllib.parse import urlsplit
+
+import git
 from openai import OpenAI
 
+# ----------------------------------------------------------------------
+# Git mirror cache
+# ----------------------------------------------------------------------
+# One bare clone per repository URL, updated with an incremental fetch, and
+# a throw-away worktree per run – repeat runs skip the full clone and
+# parallel runs never share a checkout.  Mirrors are evicted least recently
+# used first once the cache exceeds GIT_CACHE_MAX_MB.
+#
+# Two flocks per mirror: "<mirror>.lock" (exclusive) serialises fetch and
+# worktree add/remove; "<mirror>.use" is held shared from checkout until
+# release, since a live worktree's .git points into the mirror.  Eviction
+# only deletes a mirror it can lock "<mirror>.use" exclusively.
+GIT_CACHE_DIR = os.getenv("GIT_CACHE_DIR", "/var/cache/autopilot/git")
+GIT_CACHE_MAX_BYTES = int(os.getenv("GIT_CACHE_MAX_MB", "5120")) * 1024 * 1024
+WORKTREE_ROOT = os.getenv("WORKTREE_ROOT", "/tmp/autopilot-worktrees")
+
+
+def normalise_url(repo_url):
+    """Cache key form of a repo URL: no credentials, no ``.git``, lower-case host."""
+    parts = urlsplit(repo_url.strip())
+    host = (parts.hostname or "").lower()
+    path = parts.path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    return f"{host}{path}" if host else path
+
+
+def mirror_path(repo_url):
+    digest = hashlib.sha256(normalise_url(repo_url).encode()).hexdigest()[:16]
+    return os.path.join(GIT_CACHE_DIR, f"{digest}.git")
+
+
+_in_use = {}                                       # mirror -> handle holding LOCK_SH on ".use"
+
+
+@contextmanager
+def locked(path, blocking=True, suffix=".lock"):
+    """Exclusive ``flock`` on ``path + suffix`` (yields False if busy and not blocking)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + suffix, "w") as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def use_token(repo_url, github_token):
+    """Authenticate git over HTTPS via env config, so the token never lands in a .git/config."""
+    if not github_token or "github.com" not in repo_url:
+        return
+    basic = base64.b64encode(f"x-access-token:{github_token}".encode()).decode()
+    os.environ["GIT_CONFIG_COUNT"] = "1"
+    os.environ["GIT_CONFIG_KEY_0"] = "http.https://github.com/.extraheader"
+    os.environ["GIT_CONFIG_VALUE_0"] = f"AUTHORIZATION: basic {basic}"
+    os.environ["GIT_TERMINAL_PROMPT"] = "0"
+
+
+def hold(mirror):
+    """Mark ``mirror`` in use (shared flock on ``.use``) until :func:`unhold`."""
+    os.makedirs(os.path.dirname(mirror), exist_ok=True)
+    handle = open(mirror + ".use", "w")
+    fcntl.flock(handle, fcntl.LOCK_SH)             # waits out an eviction in progress
+    _in_use[mirror] = handle
+
+
+def unhold(mirror):
+    handle = _in_use.pop(mirror, None)
+    if handle:
+        handle.close()                             # closing drops the flock
+
+
+def checkout(repo_url, run_id, branch_name):
+    """Fetch the cached mirror (cloning it once) and add a worktree on a new branch.
+
+    The mirror stays held until :func:`release`, so it cannot be evicted
+    from under the worktree.
+    """
+    mirror = mirror_path(repo_url)
+    hold(mirror)
+    try:
+        return _checkout(repo_url, mirror, run_id, branch_name)
+    except BaseException:
+        unhold(mirror)
+        raise
+
+
+def _checkout(repo_url, mirror, run_id, branch_name):
+    worktree = os.path.join(WORKTREE_ROOT, run_id)
+    with locked(mirror):
+        if os.path.isdir(mirror):
+            print(f"♻️ Updating cached mirror {mirror}...")
+            bare = git.Repo(mirror)
+        else:
+            print(f"📂 Cloning {repo_url} into the mirror cache...")
+            bare = git.Repo.clone_from(repo_url, mirror, bare=True)
+            # remote branches go to refs/remotes, so a prune never hits our run branches
+            bare.git.config("remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*")
+        bare.git.fetch("origin", "--prune")
+        default = bare.git.symbolic_ref("--short", "HEAD")
+        if os.path.exists(worktree):
+            shutil.rmtree(worktree)
+        os.makedirs(WORKTREE_ROOT, exist_ok=True)
+        bare.git.worktree("prune")
+        print(f"🌿 Creating branch {branch_name} from origin/{default}")
+        bare.git.worktree("add", "-b", branch_name, worktree, f"origin/{default}")
+        os.utime(mirror)                           # LRU clock
+    return git.Repo(worktree), worktree
+
+
+def release(repo_url, worktree, branch_name):
+    mirror = mirror_path(repo_url)
+    with locked(mirror):
+        try:
+            bare = git.Repo(mirror)
+            bare.git.worktree("remove", "--force", worktree)
+            bare.git.branch("-D", branch_name)
+        except Exception as e:
+            print(f"⚠️ Worktree cleanup failed: {e}")
+            shutil.rmtree(worktree, ignore_errors=True)
+    unhold(mirror)
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def evict_mirrors(keep=None):
+    """Delete least recently used mirrors until the cache fits GIT_CACHE_MAX_BYTES."""
+    if not os.path.isdir(GIT_CACHE_DIR):
+        return
+    mirrors = [os.path.join(GIT_CACHE_DIR, name) for name in os.listdir(GIT_CACHE_DIR) if name.endswith(".git")]
+    sizes = {path: dir_size(path) for path in mirrors}
+    total = sum(sizes.values())
+    for path in sorted(mirrors, key=os.path.getmtime):
+        if total <= GIT_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+        with locked(path, blocking=False, suffix=".use") as free:
+            if not free:                           # a live worktree depends on it
+                continue
+            print(f"🧹 Evicting cached mirror {path} ({sizes[path] // (1024 * 1024)} MB)")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+
 def main():
     print("🤖 Cline AI Agent Started...")
     
@@ -23,26 +189,13 @@ def main():
     if not github_token:
         print("⚠️ No GITHUB_TOKEN provided. Operations requiring auth (push) will fail.")
 
-    # Construct authenticated URL if token is present
-    auth_repo_url = repo_url
-    if github_token and "github.com" in repo_url:
-        auth_repo_url = repo_url.replace("https://", f"https://oauth2:{github_token}@")
+    use_token(repo_url, github_token)
+    run_id = os.getenv("EXECUTION_ID") or uuid.uuid4().hex
+    branch_name = f"autopilot-fix-{int(time.time())}-{run_id[-6:]}"
+    work_dir = None
 
-    work_dir = "/tmp/repo"
-    
     try:
-        print(f"📂 Cloning {repo_url}...")
-        if os.path.exists(work_dir):
-            import shutil
-            shutil.rmtree(work_dir)
-            
-        repo = git.Repo.clone_from(auth_repo_url, work_dir)
-        
-        # Create a new branch
-        branch_name = f"autopilot-fix-{int(time.time())}"
-        print(f"🌿 Creating branch: {branch_name}")
-        current = repo.create_head(branch_name)
-        current.checkout()
+        repo, work_dir = checkout(repo_url, run_id, branch_name)
         
         # AI Analysis & Fix
         print(f"🧠 Connecting to Ollama at {ollama_host}...")
@@ -88,7 +241,7 @@ def main():
         # Push
         if github_token:
             print(f"🚀 Pushing to {branch_name}...")
-            repo.remotes.origin.push(branch_name)
+            repo.git.push("origin", branch_name)
             print("🎉 Push successful!")
         else:
             print("⚠️ Skipping push (no token).")
@@ -96,6 +249,13 @@ def main():
     except Exception as e:
         print(f"❌ Error: {e}")
         sys.exit(1)
+    finally:
+        if work_dir:
+            release(repo_url, work_dir, branch_name)
+        try:
+            evict_mirrors(keep=mirror_path(repo_url))
+        except OSError as e:
+            print(f"⚠️ Mirror eviction failed: {e}")
 
 if __name__ == "__main__":
     main()
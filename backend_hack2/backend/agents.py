@@ -1,12 +1,23 @@
 # ----------------------------------------------------------------------
 # agents.py   (pure‑python helper – no Streamlit code)
 # ----------------------------------------------------------------------
-import os, json, time, random, base64, logging
+import os, json, time, random, base64, logging, asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import httpx
-from functools import wraps
+from functools import wraps, partial, lru_cache
 from typing import Callable, Any
 
+from blob_store import VideoSource, stream_url, upload_video
+import insights_cache
+import llm_cache
+import text_codec
+from provider_limits import limit
+from operation_poller import get_poller, OperationFailed
+from stage_graph import Stage, run_stages
+from database import redis_client
+from http_clients import get_client
+
 # Optional SDKs ---------------------------------------------------------
 try:
     from langchain_groq import ChatGroq           # LLM for prompt creation
@@ -20,13 +31,50 @@ except ImportError:                               # pragma: no cover
     genai = None
     types = None
 
+# ----------------------------------------------------------------------
+# Bounded executor for SDK calls that have no async API
+# ----------------------------------------------------------------------
+AGENT_EXECUTOR_WORKERS = int(os.getenv("AGENT_EXECUTOR_WORKERS", "4"))
+_blocking_executor = ThreadPoolExecutor(
+    max_workers=AGENT_EXECUTOR_WORKERS,
+    thread_name_prefix="agents-sdk",
+)
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking SDK call on the bounded executor, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, partial(func, *args, **kwargs))
+
 # ----------------------------------------------------------------------
 # Retry decorator for external API calls
 # ----------------------------------------------------------------------
 def retry_on_failure(max_retries: int = 3, backoff_factor: float = 2.0,
                      exceptions: tuple = (Exception,)):
-    """Decorator to retry function calls with exponential backoff."""
+    """Decorator to retry function calls with exponential backoff.
+
+    Works on both plain and ``async`` functions; coroutines back off with
+    ``asyncio.sleep`` so a retry never blocks the event loop.
+    """
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                last_exception = None
+                for attempt in range(max_retries):
+                    try:
+                        return await func(*args, **kwargs)
+                    except exceptions as exc:
+                        last_exception = exc
+                        if attempt < max_retries - 1:
+                            wait_time = backoff_factor ** attempt + random.uniform(0, 1)
+                            logging.warning(f"Attempt {attempt + 1} failed for {func.__name__}: {exc}. "
+                                          f"Retrying in {wait_time:.2f} seconds...")
+                            await asyncio.sleep(wait_time)
+                        else:
+                            logging.error(f"All {max_retries} attempts failed for {func.__name__}: {exc}")
+                raise last_exception
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             last_exception = None
@@ -51,31 +99,77 @@ def retry_on_failure(max_retries: int = 3, backoff_factor: float = 2.0,
 # ----------------------------------------------------------------------
 CODERABBIT_API_URL = "https://api.coderabbit.ai/api/v1/report.generate"
 
+CODERABBIT_WINDOW_DAYS = 14
+
+def coderabbit_window(days: int = CODERABBIT_WINDOW_DAYS) -> tuple:
+    """The (from, to) date window a CodeRabbit report covers."""
+    today = datetime.utcnow()
+    return (
+        (today - timedelta(days=days)).strftime("%Y-%m-%d"),
+        today.strftime("%Y-%m-%d"),
+    )
+
 @retry_on_failure(max_retries=3, backoff_factor=2.0, exceptions=(httpx.HTTPError, httpx.TimeoutException))
-def get_coderabbit_insights(repo_url: str, api_key: str) -> dict:
+async def get_coderabbit_insights(repo_url: str, api_key: str, window: tuple | None = None) -> dict:
     if not api_key:
         raise RuntimeError("CodeRabbit API key missing")
     headers = {
         "Content-Type": "application/json",
         "x-coderabbitai-api-key": api_key,
     }
+    date_from, date_to = window or coderabbit_window()
     data = {
         "repository": repo_url,
-        "from": (datetime.utcnow() - timedelta(days=14)).strftime("%Y-%m-%d"),
-        "to": datetime.utcnow().strftime("%Y-%m-%d"),
+        "from": date_from,
+        "to": date_to,
     }
-    with httpx.Client(timeout=30.0) as client:
-        resp = client.post(CODERABBIT_API_URL, headers=headers, json=data)
+    async with limit("coderabbit"):
+        client = get_client("coderabbit")
+        resp = await client.post(CODERABBIT_API_URL, headers=headers, json=data)
         resp.raise_for_status()
         return resp.json()
 
 
+async def get_cached_coderabbit_insights(repo_url: str, api_key: str) -> dict:
+    """CodeRabbit insights through the Redis cache (stale‑while‑revalidate)."""
+    if not api_key:
+        raise RuntimeError("CodeRabbit API key missing")
+    window = coderabbit_window()
+    return await insights_cache.get_or_fetch(
+        repo_url,
+        window,
+        lambda: get_coderabbit_insights(repo_url, api_key, window),
+    )
+
+
 # ----------------------------------------------------------------------
 # 2️⃣ LLM prompt builder (video‑mode)
 # ----------------------------------------------------------------------
-def build_video_prompt(insights: dict, llm: ChatGroq) -> str:
+GROQ_VIDEO_MODEL = "llama-3.3-70b-versatile"
+# Bump whenever the prompt text below changes – it is part of the cache key.
+VIDEO_PROMPT_TEMPLATE_VERSION = "1"
+
+@lru_cache(maxsize=8)
+def _groq_llm(api_key: str):
+    """Reuse one ChatGroq client per key instead of building one per job."""
+    if not ChatGroq:
+        raise RuntimeError("langchain-groq library not installed")
+    return ChatGroq(model=GROQ_VIDEO_MODEL, api_key=api_key)
+
+
+async def build_video_prompt(insights: dict, llm: ChatGroq) -> str:
     if not llm:
         raise RuntimeError("LLM client not available")
+    return await llm_cache.get_or_compute(
+        kind="video_prompt",
+        model=str(getattr(llm, "model_name", GROQ_VIDEO_MODEL)),
+        template_version=VIDEO_PROMPT_TEMPLATE_VERSION,
+        insights=insights,
+        compute=lambda: _invoke_video_prompt(insights, llm),
+    )
+
+
+async def _invoke_video_prompt(insights: dict, llm: ChatGroq) -> str:
     insight_str = json.dumps(insights, indent=2)
     system_prompt = (
         "You are a tech‑storyteller.  Write **ONE short paragraph** (≈30 words) "
@@ -83,18 +177,26 @@ def build_video_prompt(insights: dict, llm: ChatGroq) -> str:
         "issues that were fixed.  Mention the repo name.  Do NOT add any on‑screen "
         "text, logos, or titles.\n\nInsights:\n" + insight_str
     )
-    resp = llm.invoke(system_prompt)
+    async with limit("groq"):
+        resp = await llm.ainvoke(system_prompt)
     return resp.content.strip()
 
 
 # ----------------------------------------------------------------------
-# 3️⃣ Google Veo – now returns **raw MP4 bytes** (not a URL)
+# 3️⃣ Google Veo – returns raw MP4 bytes (or a chunk stream for URLs)
 # ----------------------------------------------------------------------
-def create_google_veo_video(prompt: str, api_key: str) -> bytes:
-    """
-    Calls Veo and returns the binary MP4 data.
-    Raises RuntimeError on failure.
-    """
+VEO_MODEL = "veo-2.0-generate-preview-0123"
+VEO_TIMEOUT = float(os.getenv("VEO_TIMEOUT", "900"))
+PIKA_TIMEOUT = float(os.getenv("PIKA_TIMEOUT", "600"))
+# First poll delay; the poller backs off from here (×1.5, capped at 30 s).
+VEO_POLL_INTERVAL = float(os.getenv("VEO_POLL_INTERVAL", "5"))
+PIKA_POLL_INTERVAL = float(os.getenv("PIKA_POLL_INTERVAL", "5"))
+PIKA_API_URL = "https://api.pika.art/generate"
+
+
+@lru_cache(maxsize=8)
+def _veo_client(api_key: str):
+    """One SDK client (and connection pool) per key, reused across jobs."""
     if not genai:
         raise RuntimeError("google‑genai library not installed")
     client = genai.Client(
@@ -103,33 +205,31 @@ def create_google_veo_video(prompt: str, api_key: str) -> bytes:
     )
     if not hasattr(client.models, "generate_videos"):
         raise RuntimeError("Veo endpoint not available for this key")
+    return client
+
 
-    # ---------- retry on quota errors ----------
+async def _start_veo_operation(client, prompt: str):
+    """Submit the Veo job, backing off (without blocking) on quota errors."""
     max_retries = 3
-    operation = None
     for attempt in range(max_retries):
         try:
-            operation = client.models.generate_videos(
-                model="veo-2.0-generate-preview-0123",
+            return await run_blocking(
+                client.models.generate_videos,
+                model=VEO_MODEL,
                 prompt=prompt,
                 config=types.GenerateVideosConfig(number_of_videos=1),
             )
-            break
         except Exception as exc:
             if "429" in str(exc) or "RESOURCE_EXHAUSTED" in str(exc):
                 if attempt < max_retries - 1:
                     backoff = (2 ** attempt) + random.uniform(0, 1)
-                    time.sleep(backoff)
+                    await asyncio.sleep(backoff)
                     continue
             raise RuntimeError(f"Veo generation failed: {exc}") from exc
+    raise RuntimeError("Veo operation never started")
 
-    if not operation:
-        raise RuntimeError("Veo operation never started")
-
-    # ---------- poll until video is ready ----------
-    while not operation.done:
-        time.sleep(5)
 
+def _veo_video(operation) -> VideoSource:
     if not operation.result:
         raise RuntimeError("Veo finished without a result")
 
@@ -137,19 +237,40 @@ def create_google_veo_video(prompt: str, api_key: str) -> bytes:
     # Veo returns a protobuf “blob”.  Convert to plain bytes.
     if hasattr(video_obj.video, "blob"):
         return video_obj.video.blob          # <- raw MP4 bytes
-    # Fallback: maybe Veo already gave us a URL – download it.
+    # Fallback: maybe Veo already gave us a URL – stream it into storage.
     if isinstance(video_obj.video, str):
-        with httpx.Client(timeout=30.0) as client:
-            resp = client.get(video_obj.video)
-            resp.raise_for_status()
-            return resp.content
+        return stream_url(video_obj.video)
     raise RuntimeError("Unable to extract video bytes from Veo response")
 
 
+async def create_google_veo_video(prompt: str, api_key: str) -> VideoSource:
+    """
+    Calls Veo and returns the binary MP4 data.
+    Raises RuntimeError on failure.
+
+    SDK calls run on the bounded executor; waiting for the video is handed to
+    the shared operation poller, so no thread sleeps while Veo renders.
+    """
+    async with limit("veo"):
+        client = _veo_client(api_key)
+        operation = await _start_veo_operation(client, prompt)
+
+        if not operation.done:
+            async def check():
+                nonlocal operation
+                operation = await run_blocking(client.operations.get, operation)
+                return operation.done, operation
+
+            operation = await get_poller().track(
+                check, name="veo", deadline=VEO_TIMEOUT, initial_interval=VEO_POLL_INTERVAL,
+            )
+        return _veo_video(operation)
+
+
 # ----------------------------------------------------------------------
-# 4️⃣ Pika Labs fallback – also returns raw MP4 bytes
+# 4️⃣ Pika Labs fallback – returns a chunk stream of the finished MP4
 # ----------------------------------------------------------------------
-def create_pika_video(prompt: str, api_key: str) -> bytes:
+async def create_pika_video(prompt: str, api_key: str) -> VideoSource:
     if not api_key:
         raise RuntimeError("Pika API key missing")
     headers = {
@@ -157,50 +278,174 @@ def create_pika_video(prompt: str, api_key: str) -> bytes:
         "Authorization": f"Bearer {api_key.strip()}",
     }
     payload = {"prompt": prompt, "options": {"aspect_ratio": "16:9"}}
-    with httpx.Client(timeout=30.0) as client:
-        resp = client.post("https://api.pika.art/generate", headers=headers, json=payload)
+    async with limit("pika"):
+        client = get_client("pika")
+        resp = await client.post(PIKA_API_URL, headers=headers, json=payload)
         resp.raise_for_status()
         job_id = resp.json().get("id")
         if not job_id:
             raise RuntimeError("Pika did not return a job ID")
 
-        # poll the job
-        for _ in range(30):                 # ≈ 2.5 min max
-            time.sleep(5)
-            check = client.get(f"https://api.pika.art/generate/{job_id}", headers=headers)
-            data = check.json()
+        async def check():
+            status = await client.get(f"{PIKA_API_URL}/{job_id}", headers=headers)
+            status.raise_for_status()
+            data = status.json()
             state = data.get("status")
-            if state == "finished":
-                # Pika returns a URL – download the file.
-                video_url = data.get("video_url") or data.get("output", {}).get("url")
-                if not video_url:
-                    raise RuntimeError("Pika finished but gave no video URL")
-                video_resp = client.get(video_url)
-                video_resp.raise_for_status()
-                return video_resp.content
             if state == "failed":
-                raise RuntimeError(f"Pika failure: {data.get('error')}")
-        raise RuntimeError("Pika video generation timed out")
+                raise OperationFailed(f"Pika failure: {data.get('error')}")
+            return state == "finished", data
+
+        # poll the job through the shared poller
+        data = await get_poller().track(
+            check, name="pika", deadline=PIKA_TIMEOUT, initial_interval=PIKA_POLL_INTERVAL,
+        )
+        # Pika returns a URL – stream the file into storage.
+        video_url = data.get("video_url") or data.get("output", {}).get("url")
+        if not video_url:
+            raise RuntimeError("Pika finished but gave no video URL")
+        return stream_url(video_url)
 
 
 # ----------------------------------------------------------------------
-# 5️⃣ Public entry‑point – called from the FastAPI webhook.
+# 5️⃣ Video generation – Veo first, Pika as fallback or hedge
 # ----------------------------------------------------------------------
-    # ---- 5️⃣ Return info for the webhook to write back ---------------
+# With hedging on, Pika is also started once Veo has run for
+# VIDEO_HEDGE_AFTER seconds; the first finished video wins and the loser
+# is cancelled (polling stops and its provider slot is freed).
+VIDEO_HEDGE = os.getenv("VIDEO_HEDGE", "false").lower() in ("1", "true", "yes")
+VIDEO_HEDGE_AFTER = float(os.getenv("VIDEO_HEDGE_AFTER", "180"))
+VIDEO_HEDGE_METRICS_KEY = "metrics:video_hedge"
+
+_video_counts = {"runs": 0, "veo": 0, "pika": 0, "fallbacks": 0,
+                 "hedges_fired": 0, "hedges_won_by_pika": 0}
+
+
+async def _count_video(*fields: str) -> None:
+    """Bump the video counters locally and in Redis (shared by all workers)."""
+    for field in fields:
+        _video_counts[field] += 1
+    try:
+        pipe = redis_client.pipeline()
+        for field in fields:
+            pipe.hincrby(VIDEO_HEDGE_METRICS_KEY, field, 1)
+        await pipe.execute()
+    except Exception as exc:
+        logging.warning(f"Video metrics update failed: {exc}")
+
+
+async def video_hedge_stats() -> dict:
+    """Video provider counters across workers (this process's if Redis is down)."""
+    try:
+        counts = await redis_client.hgetall(VIDEO_HEDGE_METRICS_KEY)
+        counts = {**dict.fromkeys(_video_counts, 0), **{k: int(v) for k, v in counts.items()}}
+    except Exception:
+        counts = dict(_video_counts)
+    fired = counts["hedges_fired"]
     return {
-        "message": "✅ Autopilot finished – video ready",
-        "artefact_id": str(artefact_doc["_id"]),
+        **counts,
+        "hedging_enabled": VIDEO_HEDGE,
+        "hedge_after_seconds": VIDEO_HEDGE_AFTER,
+        "hedge_rate": round(fired / counts["runs"], 4) if counts["runs"] else 0.0,
+        "hedge_win_rate": round(counts["hedges_won_by_pika"] / fired, 4) if fired else 0.0,
     }
 
 
+async def _race(racers: dict) -> tuple:
+    """Return ``(video, provider, failed)`` from the first racer to succeed; cancel the rest.
+
+    ``failed`` names the racers that had already failed when it won.
+    """
+    pending = set(racers)
+    failed = set()
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Prefer Veo if both finish in the same tick.
+            for task in sorted(done, key=lambda t: racers[t] != "veo"):
+                if task.exception() is None:
+                    return task.result(), racers[task], failed
+                error = task.exception()
+                failed.add(racers[task])
+                logging.warning(f"{racers[task]} failed during hedge: {error}")
+        raise error
+    finally:
+        for task in racers:
+            task.cancel()
+
+
+async def generate_video(
+    prompt: str,
+    google_key: str | None,
+    pika_key: str | None,
+    *,
+    hedge: bool | None = None,
+    hedge_after: float | None = None,
+) -> tuple:
+    """Generate the video; returns ``(VideoSource, provider_name)``.
+
+    Without hedging Pika only runs after Veo has failed.  With hedging
+    (``VIDEO_HEDGE``) Pika also starts once Veo exceeds the latency budget.
+    """
+    hedge = VIDEO_HEDGE if hedge is None else hedge
+    hedge_after = VIDEO_HEDGE_AFTER if hedge_after is None else hedge_after
+    await _count_video("runs")
+
+    if google_key:
+        veo = asyncio.ensure_future(create_google_veo_video(prompt, google_key))
+        try:
+            budget = hedge_after if hedge and pika_key else None
+            done, _ = await asyncio.wait({veo}, timeout=budget)
+        except BaseException:
+            veo.cancel()
+            raise
+        if not done:
+            logging.info(f"Veo still running after {hedge_after}s – hedging with Pika")
+            await _count_video("hedges_fired")
+            pika = asyncio.ensure_future(create_pika_video(prompt, pika_key))
+            video, provider, failed = await _race({veo: "veo", pika: "pika"})
+            if "veo" in failed:
+                # Pika only won because Veo gave up – a fallback, not a hedge win
+                await _count_video(provider, "fallbacks")
+            else:
+                await _count_video(provider, *(("hedges_won_by_pika",) if provider == "pika" else ()))
+            return video, provider
+        if veo.exception() is None:
+            await _count_video("veo")
+            return veo.result(), "veo"
+        if not pika_key:
+            raise veo.exception()
+        logging.error("Veo failed, will try Pika: %s", veo.exception())
+        await _count_video("fallbacks")
+
+    if not pika_key:
+        raise RuntimeError("No video provider key (Google or Pika) available")
+    video = await create_pika_video(prompt, pika_key)
+    await _count_video("pika")
+    return video, "pika"
+
+
 # ----------------------------------------------------------------------
 # 6️⃣ Together AI – Report Generation
 # ----------------------------------------------------------------------
-@retry_on_failure(max_retries=3, backoff_factor=2.0, exceptions=(httpx.HTTPError, httpx.TimeoutException))
-def generate_together_report(insights: dict, api_key: str) -> str:
+TOGETHER_MODEL = "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"
+# Bump whenever the prompt or sampling parameters below change.
+TOGETHER_REPORT_TEMPLATE_VERSION = "1"
+
+async def generate_together_report(insights: dict, api_key: str) -> str:
     if not api_key:
         raise RuntimeError("Together AI API key missing")
-    
+    return await llm_cache.get_or_compute(
+        kind="together_report",
+        model=TOGETHER_MODEL,
+        template_version=TOGETHER_REPORT_TEMPLATE_VERSION,
+        insights=insights,
+        compute=lambda: _request_together_report(insights, api_key),
+    )
+
+
+@retry_on_failure(max_retries=3, backoff_factor=2.0, exceptions=(httpx.HTTPError, httpx.TimeoutException))
+async def _request_together_report(insights: dict, api_key: str) -> str:
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
@@ -214,7 +459,7 @@ def generate_together_report(insights: dict, api_key: str) -> str:
     )
     
     payload = {
-        "model": "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo",
+        "model": TOGETHER_MODEL,
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": 512,
         "temperature": 0.7,
@@ -224,8 +469,9 @@ def generate_together_report(insights: dict, api_key: str) -> str:
         "stop": ["<|eot_id|>"]
     }
     
-    with httpx.Client(timeout=30.0) as client:
-        resp = client.post("https://api.together.xyz/v1/chat/completions", headers=headers, json=payload)
+    async with limit("together"):
+        client = get_client("together")
+        resp = await client.post("https://api.together.xyz/v1/chat/completions", headers=headers, json=payload)
         resp.raise_for_status()
         return resp.json()["choices"][0]["message"]["content"]
 
@@ -238,66 +484,93 @@ async def process_kestra_completion(
     db,                                   # Motor DB handle
 ) -> dict:
     """
-    Orchestrates the post‑Kestra work:
-    1. CodeRabbit insights
-    2. Together AI report
-    3. Video generation (Veo/Pika)
-    4. Store everything in Mongo
+    Orchestrates the post‑Kestra work as a small stage graph:
+
+        insights ─┬─ report (optional) ──────────────┐
+                  └─ video_prompt ─ video ─ upload ──┴─ persist
+
+    The Together report runs alongside prompt + video generation, so the
+    total time tracks the longest branch instead of the sum of all calls.
+    A failed report never blocks the video; per-stage start/end offsets
+    are stored on the artefact as ``stage_timings``.
     """
-    # ---- 1️⃣ CodeRabbit -------------------------------------------------
     coderabbit_key = os.getenv("CODERABBIT_API_KEY")
     if not coderabbit_key:
         raise RuntimeError("CODERABBIT_API_KEY missing")
-    insights = get_coderabbit_insights(repo_url, coderabbit_key)
-
-    # ---- 2️⃣ Together AI Report -----------------------------------------
-    together_key = os.getenv("TOGETHER_API_KEY")
-    together_report = None
-    if together_key:
-        try:
-            together_report = generate_together_report(insights, together_key)
-        except Exception as exc:
-            logging.error(f"Together AI report generation failed: {exc}")
-            together_report = "Report generation failed."
-
-    # ---- 3️⃣ LLM video‑prompt -------------------------------------------
     groq_key = os.getenv("GROQ_API_KEY")
     if not groq_key:
         raise RuntimeError("GROQ_API_KEY missing")
-    llm = ChatGroq(model="llama-3.3-70b-versatile", api_key=groq_key)
-    video_prompt = build_video_prompt(insights, llm)
-
-    # ---- 4️⃣ Generate video (Veo first, Pika fallback) ------------------
-    video_bytes: bytes | None = None
+    together_key = os.getenv("TOGETHER_API_KEY")
     google_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_GENAI_KEY")
-    if google_key:
-        try:
-            video_bytes = create_google_veo_video(video_prompt, google_key)
-        except Exception as exc:
-            logging.exception("Veo failed, will try Pika: %s", exc)
+    pika_key = os.getenv("PIKA_API_KEY")
+    if not google_key and not pika_key:
+        raise RuntimeError("No video provider key (Google or Pika) available")
 
-    if not video_bytes:
-        pika_key = os.getenv("PIKA_API_KEY")
-        if not pika_key:
-            raise RuntimeError("No video provider key (Google or Pika) available")
-        video_bytes = create_pika_video(video_prompt, pika_key)
+    # ---- 1️⃣ CodeRabbit -------------------------------------------------
+    async def insights_stage(_):
+        return await get_cached_coderabbit_insights(repo_url, coderabbit_key)
+
+    # ---- 2️⃣ Together AI Report (optional, runs beside the video) -------
+    async def report_stage(deps):
+        if not together_key:
+            return None
+        return await generate_together_report(deps["insights"], together_key)
+
+    # ---- 3️⃣ LLM video‑prompt -------------------------------------------
+    async def prompt_stage(deps):
+        llm = _groq_llm(groq_key)
+        return await build_video_prompt(deps["insights"], llm)
+
+    # ---- 4️⃣ Generate video (Veo first, Pika fallback / hedge) ----------
+    async def video_stage(deps):
+        return await generate_video(deps["video_prompt"], google_key, pika_key)
+
+    # ---- 5️⃣ Upload video chunks to GridFS -----------------------------
+    async def upload_stage(deps):
+        video, _provider = deps["video"]
+        return await upload_video(
+            db,
+            video,
+            filename=f"{execution_id}.mp4",
+            metadata={"session": execution_id},
+        )
+
+    timings: dict = {}
+    results = await run_stages(
+        [
+            Stage("insights", insights_stage),
+            Stage("report", report_stage, ("insights",), optional=True),
+            Stage("video_prompt", prompt_stage, ("insights",)),
+            Stage("video", video_stage, ("video_prompt",)),
+            Stage("upload", upload_stage, ("video",)),
+        ],
+        timings,
+    )
+
+    together_report = results["report"]
+    if together_key and together_report is None:
+        together_report = "Report generation failed."
 
-    # ---- 5️⃣ Persist artefact (store binary data in Mongo) --------------
+    # ---- 6️⃣ Persist artefact (video chunks in GridFS, metadata here) ---
     artefact_doc = {
         "session": execution_id,
         "user_email": user_email,
         "repo_url": repo_url,
         "tool": "video_generation",
-        "prompt": video_prompt,
-        "video_bytes": video_bytes,          # <-- raw MP4 stored as BSON binary
-        "report": together_report,           # <-- New Together AI report
+        "prompt": results["video_prompt"],
+        **results["upload"],                 # <-- video_file_id / video_length
+        "video_provider": results["video"][1],
+        # New Together AI report (zstd-compressed when large, see text_codec)
+        "report": text_codec.encode(together_report, "artefacts.report"),
+        "stage_timings": timings,
         "status": "READY",
         "created_at": datetime.utcnow(),
     }
     await db["artefacts"].insert_one(artefact_doc)
 
-    # ---- 6️⃣ Return info for the webhook to write back ---------------
+    # ---- 7️⃣ Return info for the webhook to write back ---------------
     return {
         "message": "✅ Autopilot finished – video & report ready",
         "artefact_id": str(artefact_doc["_id"]),
+        "stage_timings": timings,
     }
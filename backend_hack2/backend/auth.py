@@ -0,0 +1,113 @@
+"""Request authentication: decode the JWT once, resolve the user through caches.
+
+``current_user`` is a FastAPI dependency.  It verifies the bearer token
+and returns the user document.  Lookups go through an in-process TTL/LRU
+cache, then Redis, and only fall back to MongoDB on a double miss, so the
+hot trigger path usually needs no DB round trip for auth.
+
+The Redis copy holds the user's GitHub token, so it is Fernet-encrypted
+with a key derived from ``JWT_SECRET``.  ``auth_github_callback`` calls
+:func:`invalidate_user` after every upsert.  Other workers' in-process
+entries expire within ``USER_CACHE_TTL``.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+from cryptography.fernet import Fernet, InvalidToken
+from fastapi import Request
+
+from database import get_user_collection, cache_get, cache_set, cache_delete
+from exceptions import AuthenticationError
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))            # in-process
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", "1024"))
+USER_CACHE_REDIS_TTL = int(os.getenv("USER_CACHE_REDIS_TTL", "300"))
+USER_FIELDS = {"_id": 0, "email": 1, "full_name": 1, "github_username": 1, "github_token": 1}
+
+_users: "OrderedDict[str, tuple]" = OrderedDict()        # email -> (expires_at, doc)
+_stats = {"local_hits": 0, "redis_hits": 0, "db_lookups": 0}
+
+
+def _jwt_secret() -> str:
+    return os.getenv("JWT_SECRET", "your-secret-key")
+
+
+def _fernet() -> Fernet:
+    key = hashlib.sha256(("user-cache:" + _jwt_secret()).encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def decode_token(token: str) -> str:
+    """Verify a bearer token and return its subject (the user's e-mail)."""
+    try:
+        payload = jwt.decode(token, _jwt_secret(), algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise AuthenticationError("Token has expired")
+    except jwt.InvalidTokenError:
+        raise AuthenticationError("Invalid token")
+    email = payload.get("sub")
+    if not email:
+        raise AuthenticationError("Invalid token payload")
+    return email
+
+
+def _remember(email: str, doc: dict) -> None:
+    _users[email] = (time.monotonic() + USER_CACHE_TTL, doc)
+    _users.move_to_end(email)
+    while len(_users) > USER_CACHE_MAX:
+        _users.popitem(last=False)
+
+
+async def get_user(email: str) -> Optional[dict]:
+    """The user document for ``email`` (memory → Redis → Mongo)."""
+    entry = _users.get(email)
+    if entry and entry[0] > time.monotonic():
+        _users.move_to_end(email)
+        _stats["local_hits"] += 1
+        return entry[1]
+
+    cached = await cache_get(f"user:{email}")
+    if cached:
+        try:
+            doc = json.loads(_fernet().decrypt(cached["v"].encode()))
+            _stats["redis_hits"] += 1
+            _remember(email, doc)
+            return doc
+        except (InvalidToken, KeyError, ValueError):
+            pass                                   # stale key or rotated secret
+
+    _stats["db_lookups"] += 1
+    doc = await get_user_collection().find_one({"email": email}, USER_FIELDS)
+    if doc:
+        _remember(email, doc)
+        token = _fernet().encrypt(json.dumps(doc, default=str).encode()).decode()
+        await cache_set(f"user:{email}", {"v": token}, ttl=USER_CACHE_REDIS_TTL)
+    return doc
+
+
+async def invalidate_user(email: str) -> None:
+    _users.pop(email, None)
+    await cache_delete(f"user:{email}")
+
+
+async def current_user(request: Request) -> dict:
+    """FastAPI dependency: the authenticated user's document."""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise AuthenticationError("Missing or invalid authorization header")
+    email = decode_token(auth_header.split(" ", 1)[1])
+    user = await get_user(email)
+    if not user:
+        raise AuthenticationError("User not found")
+    return user
+
+
+def stats() -> dict:
+    return {**_stats, "local_entries": len(_users)}
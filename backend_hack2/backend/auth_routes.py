@@ -3,6 +3,7 @@ from fastapi import APIRouter, Request, HTTPException
 from authlib.integrations.starlette_client import OAuth
 from datetime import datetime
 from database import get_user_collection, UserSchema
+from auth import invalidate_user
 
 router = APIRouter()
 oauth = OAuth()
@@ -68,6 +69,8 @@ async def auth_github_callback(request: Request):
             {"$set": user_data, "$setOnInsert": {"created_at": datetime.utcnow()}},
             upsert=True
         )
+        # New GitHub token → drop cached copies of this user
+        await invalidate_user(email)
 
         return {
             "status": "success", 
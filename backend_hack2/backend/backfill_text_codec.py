@@ -0,0 +1,80 @@
+"""Backfill: compress legacy plain-string text fields in place.
+
+Walks every field in ``text_codec.COMPRESSED_FIELDS`` and rewrites values
+that are still plain strings into their encoded form.  Each update is
+conditional on the string being unchanged, so concurrent writers win and
+the script is safe to re-run.
+
+With ``--train`` (zstd only) a dictionary is first trained per field from
+up to ``--samples`` existing values and becomes the one new writes use.
+
+Usage:
+    python backfill_text_codec.py [--train] [--samples 2000] [--dry-run]
+"""
+
+import argparse
+import asyncio
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import text_codec
+from database import db
+
+# a trained dictionary needs a decent number of examples to beat plain zstd
+MIN_TRAINING_SAMPLES = 100
+
+
+async def _strings(collection, field, limit=0):
+    query = {field: {"$type": "string"}}
+    async for doc in db[collection].find(query, {field: 1}).limit(limit):
+        yield doc["_id"], doc[field]
+
+
+async def train(collection, field, samples):
+    values = [value async for _, value in _strings(collection, field, samples)]
+    family = f"{collection}.{field}"
+    if len(values) < MIN_TRAINING_SAMPLES:
+        print(f"  ⏭️  {family}: only {len(values)} sample(s), no dictionary")
+        return
+    dict_id = await text_codec.save_dictionary(db, family, text_codec.train_dictionary(values), len(values))
+    print(f"  📖 {family}: dictionary {dict_id} from {len(values)} sample(s)")
+
+
+async def backfill(collection, field, dry_run=False):
+    family = f"{collection}.{field}"
+    scanned = encoded = saved = 0
+    async for doc_id, value in _strings(collection, field):
+        scanned += 1
+        stored = text_codec.encode(value, family)
+        if not text_codec.is_encoded(stored):
+            continue                               # too small, or does not shrink
+        saved += len(value.encode("utf-8")) - len(stored["data"])
+        encoded += 1
+        if not dry_run:
+            await db[collection].update_one({"_id": doc_id, field: value}, {"$set": {field: stored}})
+    print(f"  ✅ {family}: {encoded}/{scanned} plain value(s) compressed, ~{saved / 1e6:.2f} MB saved")
+    return encoded
+
+
+async def main(train_dicts=False, samples=2000, dry_run=False):
+    print(f"🗜️  Text codec: {text_codec.algorithm()} level {text_codec.TEXT_CODEC_LEVEL}"
+          f"{' (dry run)' if dry_run else ''}")
+    await text_codec.load_dictionaries(db)
+    total = 0
+    for collection, fields in text_codec.COMPRESSED_FIELDS.items():
+        for field in fields:
+            if train_dicts and not dry_run and text_codec.algorithm() == "zstd":
+                await train(collection, field, samples)
+            total += await backfill(collection, field, dry_run)
+    print(f"🎉 Compressed {total} value(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--train", action="store_true", help="train a zstd dictionary per field first")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.train, args.samples, args.dry_run))
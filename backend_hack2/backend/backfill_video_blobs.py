@@ -0,0 +1,60 @@
+"""One-off backfill: move inline ``artefacts.video_bytes`` into GridFS.
+
+Each legacy artefact is loaded on its own, its bytes are written to the
+``videos`` bucket, and the document is rewritten to carry only the
+``video_file_id`` pointer.  Safe to re-run – migrated artefacts no longer
+match the query.
+
+Usage:
+    python backfill_video_blobs.py [--dry-run]
+"""
+
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import db
+from blob_store import upload_video, delete_video
+
+
+async def main(dry_run: bool = False):
+    artefacts = db["artefacts"]
+    query = {"video_bytes": {"$exists": True}, "video_file_id": {"$exists": False}}
+    total = await artefacts.count_documents(query)
+    print(f"🎞️  {total} artefact(s) with inline video_bytes")
+    if dry_run or not total:
+        return
+
+    migrated = 0
+    # Only ids up front – each blob is fetched (and released) one at a time.
+    ids = [doc["_id"] async for doc in artefacts.find(query, {"_id": 1})]
+    for artefact_id in ids:
+        doc = await artefacts.find_one({"_id": artefact_id}, {"video_bytes": 1, "session": 1})
+        if not doc or not doc.get("video_bytes"):
+            continue
+        session = doc.get("session") or str(artefact_id)
+        video_meta = await upload_video(
+            db,
+            bytes(doc.pop("video_bytes")),
+            filename=f"{session}.mp4",
+            metadata={"session": session},
+        )
+        result = await artefacts.update_one(
+            {"_id": artefact_id, "video_file_id": {"$exists": False}},
+            {"$set": video_meta, "$unset": {"video_bytes": ""}},
+        )
+        if result.modified_count:
+            migrated += 1
+            print(f"  ✅ {session}: {video_meta['video_length']} bytes → {video_meta['video_file_id']}")
+        else:
+            # Lost a race with a concurrent run – drop the duplicate upload.
+            await delete_video(db, video_meta["video_file_id"])
+
+    print(f"🎉 Migrated {migrated}/{total} artefact(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(dry_run="--dry-run" in sys.argv))
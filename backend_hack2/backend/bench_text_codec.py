@@ -0,0 +1,137 @@
+"""Benchmark text_codec settings on a real report corpus.
+
+Compares zlib and zstd levels, with and without a trained dictionary, on
+stored size, compression and decompression throughput, and the per-document
+decode time a report endpoint pays.  The dictionary is trained on one half
+of the corpus and measured on the other, as it would be for new documents.
+
+Usage:
+    python bench_text_codec.py --db together_reports.report [--limit 2000]
+    python bench_text_codec.py PATH [PATH ...]        # text files or directories
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import zlib
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import text_codec
+
+CONFIGS = [("zlib", 6), ("zlib", 9), ("zstd", 1), ("zstd", 3), ("zstd", 9), ("zstd", 19)]
+DICT_LEVELS = (3, 9)
+
+
+def load_files(paths):
+    corpus = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(os.path.join(root, f) for root, _, files in os.walk(path) for f in files)
+        else:
+            names = [path]
+        for name in names:
+            with open(name, errors="replace") as handle:
+                corpus.append(handle.read())
+    return corpus
+
+
+async def load_db(spec, limit):
+    from database import db
+
+    collection, field = spec.split(".", 1)
+    await text_codec.load_dictionaries(db)
+    corpus = []
+    async for doc in db[collection].find({field: {"$exists": True}}, {field: 1}).limit(limit):
+        doc = await text_codec.decode_doc(db, collection, doc)
+        if isinstance(doc.get(field), str):
+            corpus.append(doc[field])
+    return corpus
+
+
+def measure(name, docs, compress, decompress):
+    raw = [d.encode("utf-8") for d in docs]
+    started = time.perf_counter()
+    packed = [compress(r) for r in raw]
+    c_time = time.perf_counter() - started
+    per_doc = []
+    for p in packed:
+        t = time.perf_counter()
+        decompress(p)
+        per_doc.append(time.perf_counter() - t)
+    d_time = sum(per_doc)
+    size_in, size_out = sum(map(len, raw)), sum(map(len, packed))
+    mb = size_in / 1e6
+    return {
+        "codec": name,
+        "ratio": size_in / size_out,
+        "stored": size_out,
+        "c_mbs": mb / c_time if c_time else float("inf"),
+        "d_mbs": mb / d_time if d_time else float("inf"),
+        "p50_us": statistics.median(per_doc) * 1e6,
+        "p99_us": sorted(per_doc)[int(len(per_doc) * 0.99)] * 1e6,
+    }
+
+
+def run(corpus):
+    corpus = [doc for doc in corpus if doc]
+    train, test = corpus[::2], corpus[1::2]
+    size = sum(len(d.encode("utf-8")) for d in test)
+    sizes = sorted(len(d) for d in test)
+    print(f"📚 {len(corpus)} documents; measuring {len(test)} ({size / 1e6:.2f} MB, "
+          f"median {sizes[len(sizes) // 2]} chars), dictionary trained on {len(train)}")
+    results = [{"codec": "none", "ratio": 1.0, "stored": size, "c_mbs": float("inf"),
+                "d_mbs": float("inf"), "p50_us": 0.0, "p99_us": 0.0}]
+    for alg, level in CONFIGS:
+        if alg == "zstd" and text_codec.zstandard is None:
+            continue
+        if alg == "zlib":
+            results.append(measure(f"zlib-{level}", test, lambda r, l=level: zlib.compress(r, l), zlib.decompress))
+        else:
+            zc = text_codec.zstandard.ZstdCompressor(level=level)
+            zd = text_codec.zstandard.ZstdDecompressor()
+            results.append(measure(f"zstd-{level}", test, zc.compress, zd.decompress))
+
+    if text_codec.zstandard is not None and len(train) >= 8:
+        try:
+            trained = text_codec.zstandard.ZstdCompressionDict(text_codec.train_dictionary(train))
+        except Exception as exc:                 # too few / too uniform samples
+            print(f"⚠️  Dictionary training failed: {exc}")
+        else:
+            zd = text_codec.zstandard.ZstdDecompressor(dict_data=trained)
+            for level in DICT_LEVELS:
+                zc = text_codec.zstandard.ZstdCompressor(level=level, dict_data=trained)
+                results.append(measure(f"zstd-{level}+dict", test, zc.compress, zd.decompress))
+
+    print(f"{'codec':<14}{'ratio':>7}{'stored MB':>11}{'comp MB/s':>11}{'decomp MB/s':>13}"
+          f"{'p50 µs':>9}{'p99 µs':>9}")
+    for r in results:
+        print(f"{r['codec']:<14}{r['ratio']:>7.2f}{r['stored'] / 1e6:>11.3f}{r['c_mbs']:>11.0f}"
+              f"{r['d_mbs']:>13.0f}{r['p50_us']:>9.1f}{r['p99_us']:>9.1f}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="text files or directories")
+    parser.add_argument("--db", help="collection.field to sample from MongoDB")
+    parser.add_argument("--limit", type=int, default=2000)
+    args = parser.parse_args(argv)
+    if args.db:
+        corpus = asyncio.run(load_db(args.db, args.limit))
+    elif args.paths:
+        corpus = load_files(args.paths)
+    else:
+        parser.error("give --db collection.field or at least one path")
+    if len(corpus) < 2:
+        sys.exit("❌ Need at least two documents to benchmark")
+    run(corpus)
+
+
+if __name__ == "__main__":
+    main()
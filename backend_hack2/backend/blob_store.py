@@ -0,0 +1,115 @@
+"""Chunked (GridFS) storage for generated videos.
+
+Video bytes live in the ``videos.files`` / ``videos.chunks`` GridFS bucket;
+the ``artefacts`` document only carries metadata plus a ``video_file_id``
+pointer.  Uploads and downloads move one chunk at a time, so a large MP4
+never has to sit whole in a worker's memory.
+"""
+
+import hashlib
+import os
+from typing import AsyncIterable, AsyncIterator, Optional, Union
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from http_clients import get_client
+
+VIDEO_BUCKET = "videos"
+VIDEO_CHUNK_SIZE = int(os.getenv("VIDEO_CHUNK_SIZE", str(255 * 1024)))
+
+# A provider result is either the raw bytes or an async stream of chunks.
+VideoSource = Union[bytes, AsyncIterable[bytes]]
+
+
+def get_video_bucket(db) -> AsyncIOMotorGridFSBucket:
+    """Return the GridFS bucket that holds video chunks."""
+    return AsyncIOMotorGridFSBucket(
+        db, bucket_name=VIDEO_BUCKET, chunk_size_bytes=VIDEO_CHUNK_SIZE
+    )
+
+
+async def _iter_source(source: VideoSource) -> AsyncIterator[bytes]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), VIDEO_CHUNK_SIZE):
+            yield bytes(view[offset:offset + VIDEO_CHUNK_SIZE])
+        return
+    async for chunk in source:
+        if chunk:
+            yield chunk
+
+
+async def stream_url(url: str, timeout: float = 30.0) -> AsyncIterator[bytes]:
+    """Download ``url`` as a stream of chunks (used for provider video URLs)."""
+    client = get_client("downloads")
+    async with client.stream("GET", url, timeout=timeout) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes(VIDEO_CHUNK_SIZE):
+            yield chunk
+
+
+async def upload_video(
+    db,
+    source: VideoSource,
+    *,
+    filename: str,
+    content_type: str = "video/mp4",
+    metadata: Optional[dict] = None,
+) -> dict:
+    """Write ``source`` to GridFS chunk by chunk.
+
+    The strong ``ETag`` used for ``If-Range`` validation is hashed from the
+    same chunks as they pass, so it is computed exactly once, at write time.
+
+    Returns:
+        dict: ``video_file_id``, ``video_length``, ``video_etag`` and
+        ``content_type`` – the fields to store on the artefact document.
+    """
+    bucket = get_video_bucket(db)
+    grid_in = bucket.open_upload_stream(
+        filename,
+        metadata={"content_type": content_type, **(metadata or {})},
+    )
+    digest = hashlib.sha256()
+    try:
+        async for chunk in _iter_source(source):
+            digest.update(chunk)
+            await grid_in.write(chunk)
+    except BaseException:
+        await grid_in.abort()
+        raise
+    await grid_in.close()
+    return {
+        "video_file_id": grid_in._id,
+        "video_length": grid_in.length,
+        "video_etag": f'"{digest.hexdigest()[:32]}"',
+        "content_type": content_type,
+    }
+
+
+async def iter_video(
+    db,
+    file_id: ObjectId,
+    start: int = 0,
+    end: Optional[int] = None,
+    chunk_size: int = VIDEO_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Yield the bytes ``start..end`` (inclusive) of a stored video in bounded chunks."""
+    bucket = get_video_bucket(db)
+    grid_out = await bucket.open_download_stream(file_id)
+    last = grid_out.length - 1 if end is None else min(end, grid_out.length - 1)
+    if start:
+        grid_out.seek(start)
+    remaining = last - start + 1
+    while remaining > 0:
+        chunk = await grid_out.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+async def delete_video(db, file_id: ObjectId) -> None:
+    """Remove a stored video (files document and all of its chunks)."""
+    await get_video_bucket(db).delete(file_id)
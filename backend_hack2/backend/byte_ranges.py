@@ -0,0 +1,94 @@
+"""HTTP ``Range`` header parsing and multipart/byteranges framing (RFC 7233)."""
+
+from typing import List, Optional, Tuple
+
+# More ranges than this is almost certainly abuse – serve the full body.
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    """No requested range overlaps the representation."""
+
+
+def parse_range_header(header: Optional[str], length: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a ``Range`` header into sorted, merged inclusive ``(start, end)`` pairs.
+
+    Returns:
+        None when the header is absent, malformed, uses another unit or asks
+        for too many ranges – the caller should then send the full body.
+
+    Raises:
+        RangeNotSatisfiable: when the header is valid but no range overlaps
+        ``length`` bytes.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if not first:
+                # suffix range: the final N bytes
+                suffix = int(last)
+                if suffix <= 0:
+                    continue
+                start, end = max(length - suffix, 0), length - 1
+            else:
+                start = int(first)
+                end = int(last) if last else max(start, length - 1)
+                if end < start:
+                    return None
+        except ValueError:
+            return None
+        if start < 0:
+            return None
+        if start >= length:
+            continue
+        ranges.append((start, min(end, length - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        prev_start, prev_end = merged[-1]
+        if start <= prev_end + 1:
+            merged[-1] = (prev_start, max(prev_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def multipart_part_header(boundary: str, content_type: str, start: int, end: int, length: int) -> bytes:
+    """Header block that precedes one part of a multipart/byteranges body."""
+    return (
+        f"\r\n--{boundary}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Range: bytes {start}-{end}/{length}\r\n\r\n"
+    ).encode()
+
+
+def multipart_trailer(boundary: str) -> bytes:
+    return f"\r\n--{boundary}--\r\n".encode()
+
+
+def multipart_length(boundary: str, content_type: str, ranges: List[Tuple[int, int]], length: int) -> int:
+    """Exact byte length of the multipart/byteranges body for ``ranges``."""
+    total = len(multipart_trailer(boundary))
+    for start, end in ranges:
+        total += len(multipart_part_header(boundary, content_type, start, end, length))
+        total += end - start + 1
+    return total
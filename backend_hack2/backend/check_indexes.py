@@ -0,0 +1,38 @@
+"""Verify that every registered hot query is served by an index.
+
+Applies the ``database.INDEXES`` registry, then runs ``explain()`` on each
+``database.HOT_QUERIES`` entry and exits non-zero if any winning plan
+contains a COLLSCAN.  Run it in CI (or after adding an endpoint) so an
+unindexed query cannot ship unnoticed.
+
+Usage:
+    python check_indexes.py [--no-create]
+"""
+
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from database import db, create_indexes, check_query_plans
+
+
+async def main(create: bool = True) -> int:
+    if create:
+        await create_indexes(db)
+    results = await check_query_plans(db)
+    for result in results:
+        mark = "✅" if result["ok"] else "❌"
+        print(f"  {mark} {result['collection']}: {result['name']} → {' < '.join(result['stages'])}")
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        print(f"❌ {len(failed)}/{len(results)} hot queries plan a COLLSCAN")
+        return 1
+    print(f"🎉 All {len(results)} hot queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(create="--no-create" not in sys.argv)))
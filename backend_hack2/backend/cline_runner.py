@@ -0,0 +1,198 @@
+"""Asynchronous runner for the Cline agent subprocess.
+
+The agent (``ai-engine/agent.py``) clones a repository and calls an LLM,
+which can take minutes.  :func:`run_agent` starts it with
+``asyncio.create_subprocess_exec`` and reads stdout and stderr line by line
+as they are produced.  Lines are flushed in small batches into the run's
+``cline_executions`` document (``log`` holds the last ``CLINE_LOG_MAX_LINES``
+lines, ``log_seq`` is the running line count), so ``/api/cline/status`` can
+show progress while the agent is still working.
+
+* ``CLINE_MAX_CONCURRENCY`` caps the agent processes per worker.
+* ``CLINE_TIMEOUT`` bounds the run.  The process group is sent SIGTERM,
+  then SIGKILL after ``CLINE_KILL_GRACE`` seconds.
+* Setting ``cancel_requested`` on the document (``POST /api/cline/cancel``)
+  stops the run at the next flush.  Cancelling the calling task (for
+  example on a lost job lease) kills the process as well.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+CLINE_MAX_CONCURRENCY = int(os.getenv("CLINE_MAX_CONCURRENCY", "2"))
+CLINE_TIMEOUT = float(os.getenv("CLINE_TIMEOUT", "1800"))
+CLINE_KILL_GRACE = float(os.getenv("CLINE_KILL_GRACE", "10"))
+CLINE_FLUSH_INTERVAL = float(os.getenv("CLINE_FLUSH_INTERVAL", "1"))
+CLINE_LOG_MAX_LINES = int(os.getenv("CLINE_LOG_MAX_LINES", "2000"))
+CLINE_MAX_LINE_CHARS = 4000
+CLINE_COMMAND = ["python", "ai-engine/agent.py"]
+CLINE_WORKDIR = os.getenv("CLINE_WORKDIR", "/app")
+
+_STREAM_LIMIT = 1 << 20                     # longest line asyncio will buffer
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_semaphore_loop = None
+_stats = {"started": 0, "completed": 0, "failed": 0, "timed_out": 0, "cancelled": 0, "running": 0}
+
+
+class AgentResult(NamedTuple):
+    status: str                 # completed | failed | timeout | cancelled
+    returncode: Optional[int]
+    stdout: str                 # tail, at most CLINE_LOG_MAX_LINES lines
+    stderr: str
+    duration: float
+
+
+def _slots() -> asyncio.Semaphore:
+    """The concurrency semaphore of the running loop (tests use many loops)."""
+    global _semaphore, _semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _semaphore is None or _semaphore_loop is not loop:
+        _semaphore = asyncio.Semaphore(CLINE_MAX_CONCURRENCY)
+        _semaphore_loop = loop
+    return _semaphore
+
+
+async def _pump(stream: asyncio.StreamReader, name: str, pending: list, tails: Dict[str, list]) -> None:
+    while True:
+        try:
+            raw = await stream.readline()
+        except ValueError:                       # a line longer than _STREAM_LIMIT
+            raw = await stream.read(_STREAM_LIMIT)
+        if not raw:
+            return
+        line = raw.decode(errors="replace").rstrip("\r\n")[:CLINE_MAX_LINE_CHARS]
+        pending.append({"stream": name, "line": line})
+        tail = tails[name]
+        tail.append(line)
+        if len(tail) > CLINE_LOG_MAX_LINES:
+            del tail[: len(tail) - CLINE_LOG_MAX_LINES]
+
+
+async def _flush(collection, execution_id: str, pending: list) -> bool:
+    """Append buffered lines to the run document. Returns True if a cancel was requested."""
+    try:
+        return await _write(collection, execution_id, pending)
+    except Exception as exc:                     # keep the agent running; retry next flush
+        logging.warning(f"Cline log flush failed for {execution_id}: {exc}")
+        del pending[:-CLINE_LOG_MAX_LINES]       # the document only keeps this many anyway
+        return False
+
+
+async def _write(collection, execution_id: str, pending: list) -> bool:
+    query = {"execution_id": execution_id}
+    if not pending:
+        doc = await collection.find_one(query, {"cancel_requested": 1})
+        return bool(doc and doc.get("cancel_requested"))
+    batch = pending[:]
+    doc = await collection.find_one_and_update(
+        query,
+        {
+            "$push": {"log": {"$each": batch, "$slice": -CLINE_LOG_MAX_LINES}},
+            "$inc": {"log_seq": len(batch)},
+        },
+        projection={"cancel_requested": 1},
+    )
+    del pending[: len(batch)]
+    return bool(doc and doc.get("cancel_requested"))
+
+
+def _signal(proc, sig) -> None:
+    try:
+        os.killpg(proc.pid, sig)                 # the agent runs git in children
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _stop(proc) -> None:
+    if proc.returncode is not None:
+        return
+    _signal(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), CLINE_KILL_GRACE)
+    except asyncio.TimeoutError:
+        _signal(proc, signal.SIGKILL)
+        await proc.wait()
+
+
+async def run_agent(
+    collection,
+    execution_id: str,
+    env: dict,
+    *,
+    command: Optional[List[str]] = None,
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> AgentResult:
+    """Run the agent for ``execution_id``, streaming its output into ``collection``."""
+    timeout = CLINE_TIMEOUT if timeout is None else timeout
+    async with _slots():
+        started = time.monotonic()
+        claimed = await collection.find_one_and_update(
+            {"execution_id": execution_id, "cancel_requested": {"$ne": True}},
+            {"$set": {"status": "running", "log": [], "log_seq": 0}},
+            projection={"_id": 1},
+        )
+        if claimed is None:                      # cancelled while queued
+            _stats["cancelled"] += 1
+            return AgentResult("cancelled", None, "", "", 0.0)
+        proc = await asyncio.create_subprocess_exec(
+            *(command or CLINE_COMMAND),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**env, "PYTHONUNBUFFERED": "1"},
+            cwd=cwd or CLINE_WORKDIR,
+            limit=_STREAM_LIMIT,
+            start_new_session=True,
+        )
+        _stats["started"] += 1
+        _stats["running"] += 1
+        pending: list = []
+        tails: Dict[str, list] = {"stdout": [], "stderr": []}
+        readers = asyncio.gather(
+            _pump(proc.stdout, "stdout", pending, tails),
+            _pump(proc.stderr, "stderr", pending, tails),
+        )
+        status = None
+        try:
+            deadline = started + timeout
+            while status is None:
+                wait = min(CLINE_FLUSH_INTERVAL, deadline - time.monotonic())
+                done, _ = await asyncio.wait({readers}, timeout=max(wait, 0))
+                cancel = await _flush(collection, execution_id, pending)
+                if done:
+                    await proc.wait()
+                    status = "completed" if proc.returncode == 0 else "failed"
+                elif cancel:
+                    status = "cancelled"
+                elif time.monotonic() >= deadline:
+                    status = "timeout"
+            if status in ("cancelled", "timeout"):
+                logging.warning(f"Cline run {execution_id}: {status} – stopping agent")
+                await _stop(proc)
+                await asyncio.wait({readers}, timeout=CLINE_KILL_GRACE)
+                await _flush(collection, execution_id, pending)
+        except asyncio.CancelledError:
+            await asyncio.shield(_stop(proc))
+            raise
+        finally:
+            readers.cancel()
+            _stats["running"] -= 1
+
+        _stats[{"completed": "completed", "failed": "failed",
+                "timeout": "timed_out", "cancelled": "cancelled"}[status]] += 1
+        return AgentResult(
+            status=status,
+            returncode=proc.returncode,
+            stdout="\n".join(tails["stdout"]),
+            stderr="\n".join(tails["stderr"]),
+            duration=round(time.monotonic() - started, 3),
+        )
+
+
+def stats() -> dict:
+    return {**_stats, "max_concurrency": CLINE_MAX_CONCURRENCY}
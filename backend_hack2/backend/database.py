@@ -2,7 +2,7 @@ import os
 import json
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, NamedTuple, Optional, Tuple
 from datetime import datetime
 import redis.asyncio as redis
 from cryptography.fernet import Fernet
@@ -50,20 +50,123 @@ async def cache_set(key: str, value: dict, ttl: int = 3600):
     except Exception as e:
         print(f"Redis set error: {e}")
 
+async def cache_add(key: str, value: dict, ttl: int = 3600) -> bool:
+    """Set ``key`` only if it does not exist yet (SET NX). Returns True if set."""
+    try:
+        return bool(await redis_client.set(key, json.dumps(value), ex=ttl, nx=True))
+    except Exception as e:
+        print(f"Redis add error: {e}")
+        return False
+
 async def cache_delete(key: str):
     try:
         await redis_client.delete(key)
     except Exception as e:
         print(f"Redis delete error: {e}")
 
-async def create_indexes():
-    try:
-        await db.users.create_index("email", unique=True)
-        await db.runs.create_index("id", unique=True)
-        await db.runs.create_index("user_email")
-        print("✅ MongoDB Indexes Created")
-    except Exception as e:
-        print(f"❌ MongoDB Index Error: {e}")
+# --- Index registry ---
+# Every index the app relies on, declared once.  ``create_indexes`` applies
+# the list at start-up; ``check_query_plans`` explains each HOT_QUERIES
+# entry against it (see check_indexes.py).
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    options: Optional[dict] = None
+
+class HotQuery(NamedTuple):
+    name: str
+    collection: str
+    filter: dict
+    sort: Optional[List[Tuple[str, int]]] = None
+
+INDEXES: List[IndexSpec] = [
+    IndexSpec("users", [("email", 1)], {"unique": True}),
+    IndexSpec("runs", [("id", 1)], {"unique": True}),
+    IndexSpec("runs", [("user_email", 1)]),
+    # /api/runs keyset pagination: newest first, execution id breaks ties
+    IndexSpec("runs", [("timestamp", -1), ("id", -1)]),
+    IndexSpec("runs", [("user_email", 1), ("timestamp", -1), ("id", -1)]),
+    IndexSpec("runs", [("status", 1), ("timestamp", -1), ("id", -1)]),
+    IndexSpec("runs", [("repo", 1), ("timestamp", -1), ("id", -1)]),
+    IndexSpec("artefacts", [("session", 1), ("status", 1)]),
+    IndexSpec("together_reports", [("execution_id", 1)]),
+    IndexSpec("cline_executions", [("execution_id", 1)], {"unique": True}),
+    IndexSpec("llm_cache", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    IndexSpec("llm_cache", [("last_used_at", 1)]),
+    IndexSpec("jobs", [("type", 1), ("status", 1), ("run_at", 1)]),
+    IndexSpec("jobs", [("type", 1), ("status", 1), ("lease_expires_at", 1)]),
+    IndexSpec("jobs", [("dedupe_key", 1)], {"unique": True, "sparse": True}),
+]
+
+# Representative filters of the queries the API and worker run per request.
+# Values only need the right type – the planner does not care which.
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery("user by email", "users", {"email": "x@example.com"}),
+    HotQuery("run by id", "runs", {"id": "x"}),
+    HotQuery("runs page", "runs", {}, [("timestamp", -1), ("id", -1)]),
+    HotQuery("runs page by user", "runs", {"user_email": "x@example.com"}, [("timestamp", -1), ("id", -1)]),
+    HotQuery("runs page by status", "runs", {"status": "SUCCESS"}, [("timestamp", -1), ("id", -1)]),
+    HotQuery("runs page by repo", "runs", {"repo": "https://github.com/x/y"}, [("timestamp", -1), ("id", -1)]),
+    HotQuery("recent runs", "runs", {"timestamp": {"$gte": "1970-01-01T00:00:00"}}),
+    HotQuery("artefact by session", "artefacts", {"session": "x"}),
+    HotQuery("ready artefact by session", "artefacts", {"session": "x", "status": "READY"}),
+    HotQuery("together report by execution", "together_reports", {"execution_id": "x"}),
+    HotQuery("cline execution by id", "cline_executions", {"execution_id": "x"}),
+    HotQuery("llm cache eviction", "llm_cache", {}, [("last_used_at", 1)]),
+    HotQuery("job by dedupe key", "jobs", {"dedupe_key": "x"}),
+    HotQuery("job lease", "jobs", {
+        "type": "x",
+        "$or": [
+            {"status": "queued", "run_at": {"$lte": datetime(1970, 1, 1)}},
+            {"status": "running", "lease_expires_at": {"$lt": datetime(1970, 1, 1)}},
+        ],
+    }, [("run_at", 1)]),
+]
+
+async def create_indexes(database=None) -> int:
+    """Apply INDEXES; one bad index is reported without skipping the rest."""
+    database = db if database is None else database
+    created = 0
+    for spec in INDEXES:
+        try:
+            await database[spec.collection].create_index(spec.keys, **(spec.options or {}))
+            created += 1
+        except Exception as e:
+            print(f"❌ MongoDB Index Error ({spec.collection} {spec.keys}): {e}")
+    print(f"✅ MongoDB Indexes Created ({created}/{len(INDEXES)})")
+    return created
+
+def plan_stages(plan) -> List[str]:
+    """Every ``stage`` name in an explain() plan tree, depth first."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+async def check_query_plans(database=None) -> List[dict]:
+    """Explain every HOT_QUERIES entry; ``ok`` is False when its winning plan scans the collection."""
+    database = db if database is None else database
+    results = []
+    for query in HOT_QUERIES:
+        cursor = database[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        explain = await cursor.explain()
+        stages = plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        results.append({
+            "name": query.name,
+            "collection": query.collection,
+            "stages": stages,
+            "ok": "COLLSCAN" not in stages,
+        })
+    return results
 
 async def ping_db():
     try:
@@ -0,0 +1,137 @@
+"""Shared, keep-alive outbound HTTP pools.
+
+One long-lived ``httpx.AsyncClient`` per upstream (Kestra, CodeRabbit,
+Together, Pika, Slack, video downloads) replaces the client-per-call
+pattern, so hot paths reuse warm TCP/TLS connections instead of
+handshaking on every request.  Kestra log follows, which hold their
+connection for a whole run, use a separate ``kestra_follow`` pool.  Each pool has its own connection limit and
+timeout (``HTTP_POOL_LIMITS``) and negotiates HTTP/2 with TLS hosts when
+the optional ``h2`` package is installed.
+
+The API opens the pools in its ``lifespan`` (the worker in ``main()``) and
+closes them on shutdown; ``get_client`` also creates a pool lazily for
+scripts and tests.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, NamedTuple
+
+import httpx
+
+try:                                              # HTTP/2 support is optional
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:                               # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+
+class PoolConfig(NamedTuple):
+    max_connections: int
+    timeout: float
+    http2: bool = True
+
+
+POOLS: Dict[str, PoolConfig] = {
+    "kestra": PoolConfig(max_connections=50, timeout=10.0, http2=False),   # plain-HTTP, internal
+    # Log follows hold a connection for a whole run (plus one for state polls), so
+    # they get their own pool sized to the log hub's cap instead of starving
+    # triggers and output fetches on "kestra".
+    "kestra_follow": PoolConfig(
+        max_connections=2 * int(os.getenv("LOG_HUB_MAX_CONNECTIONS", "500")), timeout=10.0, http2=False),
+    "coderabbit": PoolConfig(max_connections=10, timeout=30.0),
+    "together": PoolConfig(max_connections=10, timeout=30.0),
+    "pika": PoolConfig(max_connections=10, timeout=30.0),
+    "slack": PoolConfig(max_connections=5, timeout=10.0),
+    "downloads": PoolConfig(max_connections=10, timeout=30.0),
+}
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_requests: Dict[str, int] = {}
+_clients_loop = None
+
+
+def _configure() -> None:
+    """Apply ``HTTP_POOL_LIMITS`` overrides, e.g. ``"kestra=100:15,pika=4"``."""
+    for item in filter(None, (p.strip() for p in os.getenv("HTTP_POOL_LIMITS", "").split(","))):
+        name, _, values = item.partition("=")
+        base = POOLS.get(name.strip(), POOLS["downloads"])
+        parts = [p for p in values.split(":") if p]
+        POOLS[name.strip()] = base._replace(
+            max_connections=int(parts[0]) if parts else base.max_connections,
+            timeout=float(parts[1]) if len(parts) > 1 else base.timeout,
+        )
+
+
+def _build(name: str) -> httpx.AsyncClient:
+    config = POOLS.get(name) or POOLS["downloads"]
+
+    async def count(request):
+        _requests[name] = _requests.get(name, 0) + 1
+
+    return httpx.AsyncClient(
+        timeout=config.timeout,
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_connections,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=config.http2 and HTTP2_AVAILABLE,
+        event_hooks={"request": [count]},
+    )
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """The shared pool for ``name`` (created on first use)."""
+    global _clients_loop
+    loop = asyncio.get_running_loop()
+    if _clients_loop is not loop:
+        # Pools are bound to the loop that opened them (tests use many loops).
+        _clients.clear()
+        _clients_loop = loop
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build(name)
+    return client
+
+
+async def open_clients() -> None:
+    for name in POOLS:
+        get_client(name)
+    logging.info(f"HTTP pools opened: {sorted(_clients)} (http2={'on' if HTTP2_AVAILABLE else 'off'})")
+
+
+async def close_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+    logging.info("HTTP pools closed")
+
+
+def _connections(client: httpx.AsyncClient) -> tuple:
+    """(open, idle) connection counts, read from the transport's connection pool."""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)())
+    return len(connections), idle
+
+
+def stats() -> dict:
+    result = {}
+    for name, config in POOLS.items():
+        client = _clients.get(name)
+        open_, idle = _connections(client) if client else (0, 0)
+        result[name] = {
+            "max_connections": config.max_connections,
+            "timeout": config.timeout,
+            "http2": config.http2 and HTTP2_AVAILABLE,
+            "requests": _requests.get(name, 0),
+            "open_connections": open_,
+            "idle_connections": idle,
+        }
+    return result
+
+
+_configure()
@@ -0,0 +1,43 @@
+"""Time-sortable unique identifiers (ULID-style).
+
+26 Crockford base32 characters: a 48-bit millisecond timestamp followed
+by 80 random bits.  IDs sort lexicographically by creation time, and
+within one millisecond the random part is incremented, so IDs from one
+process are strictly increasing and never collide the way
+``int(time.time())`` IDs did.
+"""
+
+import secrets
+import threading
+import time
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _encode(value: int, length: int = 26) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def new_id(prefix: str = "") -> str:
+    """A new ULID, optionally prefixed (e.g. ``new_id("cline_")``)."""
+    global _last_ms, _last_random
+    now = int(time.time() * 1000)
+    with _lock:
+        if now <= _last_ms:
+            now, random_part = _last_ms, _last_random + 1        # monotonic within a ms
+            if random_part >> _RANDOM_BITS:
+                now, random_part = now + 1, secrets.randbits(_RANDOM_BITS)
+        else:
+            random_part = secrets.randbits(_RANDOM_BITS)
+        _last_ms, _last_random = now, random_part
+    return prefix + _encode((now << _RANDOM_BITS) | random_part)
+
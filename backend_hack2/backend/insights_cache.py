@@ -0,0 +1,105 @@
+"""Redis-backed cache for CodeRabbit insights with stale-while-revalidate.
+
+Entries are keyed by repository and report date window.  A *fresh* entry
+(younger than ``INSIGHTS_CACHE_TTL``) is returned as is; a *stale* one
+(kept in Redis for ``INSIGHTS_CACHE_STALE_TTL``) is returned at once while a
+single background refresh replaces it.  Only a true miss waits for
+CodeRabbit.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from database import cache_get, cache_set, cache_delete, cache_add
+
+INSIGHTS_CACHE_TTL = int(os.getenv("INSIGHTS_CACHE_TTL", "900"))
+INSIGHTS_CACHE_STALE_TTL = int(os.getenv("INSIGHTS_CACHE_STALE_TTL", "86400"))
+INSIGHTS_REFRESH_LOCK_TTL = 120
+
+_stats: Dict[str, int] = {
+    "hits": 0,
+    "stale_hits": 0,
+    "misses": 0,
+    "refreshes": 0,
+    "refresh_errors": 0,
+}
+# Strong references so in-flight refreshes are not garbage-collected.
+_refresh_tasks: Dict[str, asyncio.Task] = {}
+
+
+def insights_key(repo_url: str, window: Tuple[str, str]) -> str:
+    repo_hash = hashlib.sha1(repo_url.strip().rstrip("/").lower().encode()).hexdigest()
+    return f"insights:{repo_hash}:{window[0]}:{window[1]}"
+
+
+def stats() -> dict:
+    """Hit/miss counters for this worker, plus the derived hit ratio."""
+    lookups = _stats["hits"] + _stats["stale_hits"] + _stats["misses"]
+    served = _stats["hits"] + _stats["stale_hits"]
+    return {
+        **_stats,
+        "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        "ttl_seconds": INSIGHTS_CACHE_TTL,
+        "stale_ttl_seconds": INSIGHTS_CACHE_STALE_TTL,
+    }
+
+
+async def _store(key: str, insights: dict) -> None:
+    await cache_set(
+        key,
+        {"insights": insights, "fetched_at": time.time()},
+        ttl=INSIGHTS_CACHE_STALE_TTL,
+    )
+
+
+async def _refresh(key: str, fetch: Callable[[], Awaitable[dict]]) -> None:
+    try:
+        await _store(key, await fetch())
+        _stats["refreshes"] += 1
+    except Exception as exc:
+        _stats["refresh_errors"] += 1
+        logging.warning(f"Insights refresh failed for {key}: {exc}")
+    finally:
+        await cache_delete(f"{key}:refreshing")
+        _refresh_tasks.pop(key, None)
+
+
+async def _schedule_refresh(key: str, fetch: Callable[[], Awaitable[dict]]) -> None:
+    if key in _refresh_tasks:
+        return
+    # One refresh per key across all workers.
+    if not await cache_add(f"{key}:refreshing", {"at": time.time()}, ttl=INSIGHTS_REFRESH_LOCK_TTL):
+        return
+    _refresh_tasks[key] = asyncio.create_task(_refresh(key, fetch))
+
+
+async def get_or_fetch(
+    repo_url: str,
+    window: Tuple[str, str],
+    fetch: Callable[[], Awaitable[dict]],
+) -> dict:
+    """Return cached insights for ``repo_url``/``window``, calling ``fetch`` on a miss."""
+    key = insights_key(repo_url, window)
+    entry = await cache_get(key)
+    if entry and "insights" in entry:
+        age = time.time() - entry.get("fetched_at", 0)
+        if age < INSIGHTS_CACHE_TTL:
+            _stats["hits"] += 1
+        else:
+            _stats["stale_hits"] += 1
+            await _schedule_refresh(key, fetch)
+        return entry["insights"]
+
+    _stats["misses"] += 1
+    insights = await fetch()
+    await _store(key, insights)
+    return insights
+
+
+async def invalidate(repo_url: str, window: Tuple[str, str]) -> None:
+    """Drop the cached insights for ``repo_url``/``window``."""
+    await cache_delete(insights_key(repo_url, window))
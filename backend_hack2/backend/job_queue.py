@@ -0,0 +1,336 @@
+"""Durable, Mongo-backed background job queue.
+
+The API only *enqueues* documents into the ``jobs`` collection; worker
+processes (``python worker.py``) lease them, run the registered handler and
+record the outcome.  A lease is a ``lease_expires_at`` deadline that the
+running worker keeps extending – if the worker dies, the lease lapses and
+another worker picks the job up (visibility timeout).  Failed jobs are
+retried with exponential backoff until ``max_attempts``, then parked as
+``dead`` and handed to the job type's ``on_dead`` hook.  So is a job whose
+last attempt lost its lease (e.g. the worker was OOM-killed), rather than
+being re-leased forever.
+
+Job lifecycle: ``queued`` → ``running`` → ``done`` | ``queued`` (retry) | ``dead``
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import telemetry
+
+JOBS_COLLECTION = "jobs"
+
+# Job types enqueued by the API
+POST_KESTRA_JOB = "post_kestra"
+CLINE_JOB = "cline"
+KESTRA_OUTPUTS_JOB = "kestra_outputs"
+
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", "10"))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", "900"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+JobHandler = Callable[[dict], Awaitable[Optional[dict]]]
+DeadHook = Callable[[dict, str], Awaitable[None]]
+
+_handlers: Dict[str, JobHandler] = {}
+_dead_hooks: Dict[str, DeadHook] = {}
+
+
+def handler(job_type: str, *, on_dead: Optional[DeadHook] = None):
+    """Register the coroutine that processes ``job_type`` jobs."""
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[job_type] = func
+        if on_dead:
+            _dead_hooks[job_type] = on_dead
+        return func
+    return decorator
+
+
+def parse_concurrency(spec: str, default: int = 1) -> Dict[str, int]:
+    """Parse ``"post_kestra=2,cline=1"`` into a per-type concurrency map."""
+    limits = {job_type: default for job_type in _handlers}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        job_type, _, value = item.partition("=")
+        limits[job_type.strip()] = max(int(value), 0)
+    return limits
+
+
+def _backoff(attempts: int) -> float:
+    delay = JOB_BACKOFF_BASE * (2 ** max(attempts - 1, 0))
+    return min(delay, JOB_BACKOFF_MAX) + random.uniform(0, JOB_BACKOFF_BASE / 2)
+
+
+# ----------------------------------------------------------------------
+# Queue operations
+# ----------------------------------------------------------------------
+async def enqueue(
+    db,
+    job_type: str,
+    payload: dict,
+    *,
+    dedupe_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    delay: float = 0,
+    redact: Iterable[str] = (),
+) -> str:
+    """Persist a job and return its id.
+
+    ``dedupe_key`` makes enqueueing idempotent (e.g. Kestra re-sending the
+    same webhook).  ``redact`` lists payload fields (secrets) that are
+    removed once the job reaches a terminal state.
+    """
+    now = datetime.utcnow()
+    job_id = uuid.uuid4().hex
+    doc = {
+        "_id": job_id,
+        "type": job_type,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "max_attempts": max_attempts or JOB_MAX_ATTEMPTS,
+        "run_at": now + timedelta(seconds=delay),
+        "lease_expires_at": None,
+        "worker_id": None,
+        "last_error": None,
+        "redact": list(redact),
+        "created_at": now,
+        "updated_at": now,
+    }
+    if not dedupe_key:
+        await db[JOBS_COLLECTION].insert_one(doc)
+        return job_id
+
+    doc["dedupe_key"] = dedupe_key
+    try:
+        existing = await db[JOBS_COLLECTION].find_one_and_update(
+            {"dedupe_key": dedupe_key},
+            {"$setOnInsert": doc},
+            upsert=True,
+            projection={"_id": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        existing = await db[JOBS_COLLECTION].find_one({"dedupe_key": dedupe_key}, {"_id": 1})
+    return existing["_id"]
+
+
+async def lease(db, job_type: str, worker_id: str, visibility: int = JOB_VISIBILITY_TIMEOUT) -> Optional[dict]:
+    """Atomically claim the next runnable job of ``job_type`` (or an expired lease)."""
+    now = datetime.utcnow()
+    return await db[JOBS_COLLECTION].find_one_and_update(
+        {
+            "type": job_type,
+            "$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "lease_expires_at": {"$lt": now},
+                 "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+            ],
+        },
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "lease_expires_at": now + timedelta(seconds=visibility),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def heartbeat(db, job: dict, worker_id: str, visibility: int = JOB_VISIBILITY_TIMEOUT) -> bool:
+    """Extend the lease. Returns False if another worker has taken the job over."""
+    now = datetime.utcnow()
+    result = await db[JOBS_COLLECTION].update_one(
+        {"_id": job["_id"], "worker_id": worker_id, "status": "running"},
+        {"$set": {"lease_expires_at": now + timedelta(seconds=visibility), "updated_at": now}},
+    )
+    return result.matched_count == 1
+
+
+def _terminal_update(job: dict, fields: dict) -> dict:
+    update = {"$set": {**fields, "lease_expires_at": None, "updated_at": datetime.utcnow()}}
+    if job.get("redact"):
+        update["$unset"] = {f"payload.{name}": "" for name in job["redact"]}
+    return update
+
+
+async def complete(db, job: dict, worker_id: str, result: Optional[dict] = None) -> None:
+    await db[JOBS_COLLECTION].update_one(
+        {"_id": job["_id"], "worker_id": worker_id},
+        _terminal_update(job, {"status": "done", "result": result, "finished_at": datetime.utcnow()}),
+    )
+
+
+async def fail(db, job: dict, worker_id: str, error: str) -> str:
+    """Record a failed attempt; requeue with backoff or park as ``dead``."""
+    now = datetime.utcnow()
+    if job["attempts"] < job["max_attempts"]:
+        await db[JOBS_COLLECTION].update_one(
+            {"_id": job["_id"], "worker_id": worker_id},
+            {"$set": {
+                "status": "queued",
+                "run_at": now + timedelta(seconds=_backoff(job["attempts"])),
+                "lease_expires_at": None,
+                "last_error": error,
+                "updated_at": now,
+            }},
+        )
+        return "queued"
+
+    await db[JOBS_COLLECTION].update_one(
+        {"_id": job["_id"], "worker_id": worker_id},
+        _terminal_update(job, {"status": "dead", "last_error": error, "finished_at": now}),
+    )
+    return "dead"
+
+
+async def reap_exhausted(db, job_type: str, worker_id: str,
+                         visibility: int = JOB_VISIBILITY_TIMEOUT) -> list:
+    """Dead-letter jobs whose final attempt lost its lease. Returns the jobs parked.
+
+    Each job is claimed first and then parked through :func:`fail`, so only
+    one worker runs its ``on_dead`` hook.
+    """
+    reaped = []
+    while True:
+        now = datetime.utcnow()
+        job = await db[JOBS_COLLECTION].find_one_and_update(
+            {
+                "type": job_type,
+                "status": "running",
+                "lease_expires_at": {"$lt": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {"$set": {
+                "worker_id": worker_id,
+                "lease_expires_at": now + timedelta(seconds=visibility),
+                "updated_at": now,
+            }},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return reaped
+        error = f"Lease expired on attempt {job['attempts']} (worker lost)"
+        await fail(db, job, worker_id, error)
+        job["last_error"] = error
+        reaped.append(job)
+
+
+# ----------------------------------------------------------------------
+# Worker
+# ----------------------------------------------------------------------
+class Worker:
+    """Leases jobs and runs them, at most ``concurrency[type]`` at a time per type."""
+
+    def __init__(
+        self,
+        db,
+        concurrency: Dict[str, int],
+        *,
+        worker_id: Optional[str] = None,
+        visibility: int = JOB_VISIBILITY_TIMEOUT,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.db = db
+        self.concurrency = {t: n for t, n in concurrency.items() if n > 0 and t in _handlers}
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.visibility = visibility
+        self.poll_interval = poll_interval
+        self.in_flight: Dict[str, int] = {t: 0 for t in self.concurrency}
+        self._tasks: set = set()
+        self._wakeup = asyncio.Event()
+
+    async def _heartbeat_loop(self, job: dict, task: asyncio.Task) -> None:
+        while not task.done():
+            await asyncio.sleep(self.visibility / 3)
+            if not await heartbeat(self.db, job, self.worker_id, self.visibility):
+                logging.warning(f"Lost lease on job {job['_id']} – cancelling")
+                task.cancel()
+                return
+
+    async def _dead_hook(self, job: dict, error: str) -> None:
+        if job["type"] not in _dead_hooks:
+            return
+        try:
+            await _dead_hooks[job["type"]](job["payload"], error)
+        except Exception:
+            logging.exception("on_dead hook for job %s failed", job["_id"])
+
+    async def _execute(self, job: dict) -> None:
+        job_type = job["type"]
+        work = asyncio.ensure_future(_handlers[job_type](job["payload"]))
+        beat = asyncio.create_task(self._heartbeat_loop(job, work))
+        outcome = "cancelled"
+        try:
+            result = await work
+            await complete(self.db, job, self.worker_id, result)
+            outcome = "done"
+            logging.info(f"Job {job['_id']} ({job_type}) done")
+        except asyncio.CancelledError:
+            if not work.cancelled():
+                raise
+        except Exception as exc:
+            logging.exception("Job %s (%s) failed: %s", job["_id"], job_type, exc)
+            status = await fail(self.db, job, self.worker_id, str(exc))
+            outcome = "retry" if status == "queued" else "dead"
+            if status == "dead":
+                await self._dead_hook(job, str(exc))
+        finally:
+            beat.cancel()
+            self.in_flight[job_type] -= 1
+            telemetry.jobs_in_flight.set(self.in_flight[job_type], type=job_type)
+            telemetry.jobs_finished.inc(type=job_type, outcome=outcome)
+            self._wakeup.set()
+
+    async def poll_once(self) -> int:
+        """Lease as many jobs as free capacity allows. Returns how many started."""
+        started = 0
+        for job_type, limit in self.concurrency.items():
+            for job in await reap_exhausted(self.db, job_type, self.worker_id, self.visibility):
+                logging.error(f"Job {job['_id']} ({job_type}) dead: {job['last_error']}")
+                telemetry.jobs_finished.inc(type=job_type, outcome="dead")
+                await self._dead_hook(job, job["last_error"])
+            while self.in_flight[job_type] < limit:
+                job = await lease(self.db, job_type, self.worker_id, self.visibility)
+                if not job:
+                    break
+                self.in_flight[job_type] += 1
+                telemetry.jobs_in_flight.set(self.in_flight[job_type], type=job_type)
+                task = asyncio.create_task(self._execute(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                started += 1
+        return started
+
+    async def run(self, stop: asyncio.Event) -> None:
+        logging.info(f"Worker {self.worker_id} started: {self.concurrency}")
+        while not stop.is_set():
+            try:
+                started = await self.poll_once()
+            except Exception as exc:
+                logging.error(f"Job lease failed: {exc}")
+                started = 0
+            if not started:
+                self._wakeup.clear()
+                waiters = [asyncio.ensure_future(stop.wait()), asyncio.ensure_future(self._wakeup.wait())]
+                await asyncio.wait(waiters, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in waiters:
+                    waiter.cancel()
+        # Let running jobs finish; anything killed mid-way is re-leased elsewhere.
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logging.info(f"Worker {self.worker_id} stopped")
@@ -1,7 +1,12 @@
 import os
+import json
+import asyncio
+import logging
 import httpx
 from fastapi import HTTPException
 
+from http_clients import get_client
+
 # Kestra OSS URL (internal Docker hostname)
 KESTRA_URL = os.getenv("KESTRA_URL", "http://kestra:8080")
 
@@ -13,9 +18,14 @@ async def trigger_workflow(
     branch: str, 
     user_email: str, 
     github_token: str, 
-    coderabbit_token: str = ""
+    coderabbit_token: str = "",
+    incremental_tests: bool = False,
 ):
-    """Trigger a Kestra workflow in OSS mode (no auth)."""
+    """Trigger a Kestra workflow in OSS mode (no auth).
+
+    ``incremental_tests`` lets scan-repo run only the tests affected since
+    the last scan of this branch (with periodic full runs).
+    """
 
     url = f"{KESTRA_URL}/api/v1/executions/trigger/hackathon/devops-autopilot"
 
@@ -25,36 +35,187 @@ async def trigger_workflow(
         "userEmail": user_email,
         "githubToken": github_token,
         "coderabbitToken": coderabbit_token,
+        "incrementalTests": incremental_tests,
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(url, json=payload, headers=HEADERS)
+    client = get_client("kestra")
+    try:
+        response = await client.post(url, json=payload, headers=HEADERS)
+
+        # If flow not found
+        if response.status_code == 404:
+            raise HTTPException(404, "Kestra flow 'devops-autopilot' not found.")
+
+        response.raise_for_status()
+        return response.json()
 
-            # If flow not found
-            if response.status_code == 404:
-                raise HTTPException(404, "Kestra flow 'devops-autopilot' not found.")
+    except httpx.ConnectError:
+        raise HTTPException(503, f"Cannot reach Kestra at {KESTRA_URL}")
 
-            response.raise_for_status()
-            return response.json()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(e.response.status_code, f"Kestra error: {e.response.text}")
 
-        except httpx.ConnectError:
-            raise HTTPException(503, f"Cannot reach Kestra at {KESTRA_URL}")
+# ----------------------------------------------------------------------
+# Live log tailing
+# ----------------------------------------------------------------------
+# Kestra's follow endpoint replays an execution's logs and then pushes new
+# lines as Server-Sent Events.  Lines are numbered in arrival order; that
+# number is the SSE ``id`` we hand to browsers, so a reconnect carrying
+# ``Last-Event-ID: n`` resumes after line n.
+TERMINAL_STATES = {"SUCCESS", "WARNING", "FAILED", "KILLED", "CANCELLED"}
 
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(e.response.status_code, f"Kestra error: {e.response.text}")
+LOG_BATCH_WINDOW = float(os.getenv("LOG_BATCH_WINDOW", "0.25"))      # seconds
+LOG_BATCH_MAX_LINES = int(os.getenv("LOG_BATCH_MAX_LINES", "200"))
+LOG_HEARTBEAT_INTERVAL = float(os.getenv("LOG_HEARTBEAT_INTERVAL", "15"))
+LOG_STATE_POLL_INTERVAL = float(os.getenv("LOG_STATE_POLL_INTERVAL", "3"))
+# After a terminal state, wait this long for trailing lines before closing.
+LOG_DRAIN_GRACE = float(os.getenv("LOG_DRAIN_GRACE", "2"))
+LOG_RECONNECT_DELAY = 2.0
+# Lines buffered between the upstream reader and the SSE writer; the
+# reader waits when it is full, so memory stays flat for huge executions.
+LOG_QUEUE_SIZE = 1000
+# The follow request stays open, so it has no read timeout.
+FOLLOW_TIMEOUT = httpx.Timeout(10.0, read=None)
 
-async def get_logs_stream(execution_id: str):
-    """Stream logs from Kestra OSS."""
-    url = f"{KESTRA_URL}/api/v1/executions/{execution_id}/logs"
 
-    async with httpx.AsyncClient() as client:
+async def get_execution_state(client: httpx.AsyncClient, execution_id: str) -> str:
+    """Current Kestra state of ``execution_id`` (e.g. RUNNING, SUCCESS)."""
+    response = await client.get(f"{KESTRA_URL}/api/v1/executions/{execution_id}", headers=HEADERS)
+    response.raise_for_status()
+    return response.json().get("state", {}).get("current", "UNKNOWN")
+
+
+async def _read_follow(client: httpx.AsyncClient, execution_id: str, after: int,
+                       queue: asyncio.Queue) -> None:
+    """Push ``("log", seq, message)`` for every line past ``after``; reconnects on drop."""
+    url = f"{KESTRA_URL}/api/v1/logs/{execution_id}/follow"
+    last_seen = after
+    while True:
+        seq = 0
         try:
-            response = await client.get(url)
-            response.raise_for_status()
+            async with client.stream("GET", url, headers={**HEADERS, "Accept": "text/event-stream"},
+                                     timeout=FOLLOW_TIMEOUT) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        entry = json.loads(line[5:].strip())
+                    except ValueError:
+                        continue
+                    seq += 1
+                    if seq <= last_seen:
+                        continue                    # replayed on reconnect / resume
+                    last_seen = seq
+                    await queue.put(("log", seq, entry.get("message", "")))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logging.warning(f"Kestra log follow for {execution_id} dropped: {exc}")
+        await asyncio.sleep(LOG_RECONNECT_DELAY)
+
+
+async def _watch_state(client: httpx.AsyncClient, execution_id: str, queue: asyncio.Queue) -> None:
+    """Push ``("state", state)`` once the execution reaches a terminal state."""
+    errors = 0
+    while True:
+        try:
+            state = await get_execution_state(client, execution_id)
+            errors = 0
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 404:
+                await queue.put(("error", f"Execution {execution_id} not found"))
+                return
+            errors += 1
+            state = None
+        except Exception as exc:
+            errors += 1
+            state = None
+            logging.warning(f"Kestra state check for {execution_id} failed: {exc}")
+        if state in TERMINAL_STATES:
+            await queue.put(("state", state))
+            return
+        if errors >= 5:
+            await queue.put(("error", "Kestra unreachable"))
+            return
+        await asyncio.sleep(LOG_STATE_POLL_INTERVAL)
+
+
+async def follow_logs(execution_id: str, after: int = 0):
+    """Tail an execution's logs until it reaches a terminal state.
+
+    Yields ``("logs", last_seq, [messages])`` batches (bursts within
+    ``LOG_BATCH_WINDOW`` are merged), ``("heartbeat", None, None)`` when
+    idle, and finally ``("end", state, None)`` or ``("error", message, None)``.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+    client = get_client("kestra_follow")         # long-lived; kept off the "kestra" pool
+    tasks = [
+        asyncio.create_task(_read_follow(client, execution_id, after, queue)),
+        asyncio.create_task(_watch_state(client, execution_id, queue)),
+    ]
+    try:
+        final = None
+        while True:
+            wait = LOG_DRAIN_GRACE if final else LOG_HEARTBEAT_INTERVAL
+            try:
+                item = await asyncio.wait_for(queue.get(), wait)
+            except asyncio.TimeoutError:
+                if final:
+                    yield final
+                    return
+                yield ("heartbeat", None, None)
+                continue
+
+            if item[0] == "state":
+                final = ("end", item[1], None)
+                continue
+            if item[0] == "error":
+                yield ("error", item[1], None)
+                return
+
+            # Merge a burst of lines into one batch.
+            seq, lines = item[1], [item[2]]
+            deadline = loop.time() + LOG_BATCH_WINDOW
+            while len(lines) < LOG_BATCH_MAX_LINES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if nxt[0] == "state":
+                    final = ("end", nxt[1], None)
+                    break
+                if nxt[0] == "error":
+                    queue.put_nowait(nxt)               # handled next turn
+                    break
+                seq = nxt[1]
+                lines.append(nxt[2])
+            yield ("logs", seq, lines)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def format_sse(kind: str, value, lines=None) -> str:
+    """Render one ``follow_logs`` item as an SSE frame."""
+    if kind == "logs":
+        data = "".join(f"data: {part}\n" for line in lines for part in str(line).splitlines() or [""])
+        return f"id: {value}\n{data}\n"
+    if kind == "heartbeat":
+        return ": keep-alive\n\n"
+    return f"event: {kind}\ndata: {value}\n\n"
 
-            for log in response.json():
-                yield f"data: {log.get('message', '')}\n\n"
 
-        except Exception as e:
-            yield f"data: Log stream error: {str(e)}\n\n"
+async def get_logs_stream(execution_id: str, last_event_id: int = 0):
+    """SSE stream of an execution's logs, resuming after ``last_event_id``."""
+    yield f"retry: {int(LOG_RECONNECT_DELAY * 1000)}\n\n"
+    try:
+        async for kind, value, lines in follow_logs(execution_id, after=last_event_id):
+            yield format_sse(kind, value, lines)
+    except Exception as e:
+        yield f"event: error\ndata: Log stream error: {str(e)}\n\n"
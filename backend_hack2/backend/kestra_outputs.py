@@ -0,0 +1,200 @@
+"""Fetch Kestra task outputs by reference.
+
+The ``/webhook/kestra`` body only names output files (``kestra:///…``
+storage URIs).  A ``kestra_outputs`` job then streams each one from Kestra's
+internal storage API:
+
+* text outputs (bug report, raw pytest log) go chunk by chunk into the
+  ``kestra_outputs`` GridFS bucket, and the run document gets
+  ``outputs.<name> = {file_id, length, truncated}``;
+* small JSON outputs (test summary, scan timings) are parsed and stored
+  directly on the run.
+
+Each download is capped (``KESTRA_OUTPUT_MAX_BYTES``; anything beyond is
+dropped and flagged ``truncated``), read in ``KESTRA_OUTPUT_CHUNK_SIZE``
+pieces and retried with backoff on transport errors and 5xx responses.  So
+neither the webhook nor the worker ever holds a whole report in memory.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from http_clients import get_client
+from kestra_client import KESTRA_URL, HEADERS
+
+OUTPUT_BUCKET = "kestra_outputs"
+KESTRA_OUTPUT_MAX_BYTES = int(os.getenv("KESTRA_OUTPUT_MAX_BYTES", str(20 * 1024 * 1024)))
+KESTRA_OUTPUT_JSON_MAX_BYTES = int(os.getenv("KESTRA_OUTPUT_JSON_MAX_BYTES", str(256 * 1024)))
+KESTRA_OUTPUT_CHUNK_SIZE = int(os.getenv("KESTRA_OUTPUT_CHUNK_SIZE", str(64 * 1024)))
+KESTRA_OUTPUT_RETRIES = int(os.getenv("KESTRA_OUTPUT_RETRIES", "3"))
+KESTRA_OUTPUT_RETRY_DELAY = float(os.getenv("KESTRA_OUTPUT_RETRY_DELAY", "1"))
+# Newer Kestra versions prefix the tenant: /api/v1/main/executions/{execution_id}/file
+KESTRA_FILE_PATH = os.getenv("KESTRA_FILE_PATH", "/api/v1/executions/{execution_id}/file")
+
+# Output name (webhook key) -> (kind, run document field)
+OUTPUTS: Dict[str, tuple] = {
+    "bug_report": ("text", "outputs.bug_report"),
+    "raw_report": ("text", "outputs.raw_report"),
+    "test_summary": ("json", "test_summary"),
+    "timings": ("json", "scan"),
+}
+
+
+class OutputTooLarge(ValueError):
+    """A JSON output exceeded ``KESTRA_OUTPUT_JSON_MAX_BYTES``."""
+
+
+def get_output_bucket(db) -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(db, bucket_name=OUTPUT_BUCKET, chunk_size_bytes=255 * 1024)
+
+
+def valid_refs(execution_id: str, refs) -> Dict[str, str]:
+    """The known outputs among ``refs`` whose URI belongs to this execution's storage."""
+    if not isinstance(refs, dict):
+        return {}
+    marker = f"/executions/{execution_id}/"
+    valid = {}
+    for name, uri in refs.items():
+        if name not in OUTPUTS or not isinstance(uri, str):
+            continue
+        if uri.startswith("kestra:///") and marker in uri:
+            valid[name] = uri
+        else:
+            logging.warning(f"Ignoring output {name!r} for {execution_id}: unexpected URI {uri!r}")
+    return valid
+
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+async def _with_retries(execution_id: str, uri: str, attempt):
+    """Run ``attempt()`` (a full download) until it succeeds or retries run out."""
+    for n in range(KESTRA_OUTPUT_RETRIES + 1):
+        try:
+            return await attempt()
+        except Exception as exc:
+            if n == KESTRA_OUTPUT_RETRIES or not _retryable(exc):
+                raise
+            delay = KESTRA_OUTPUT_RETRY_DELAY * (2 ** n)
+            logging.warning(f"Fetching {uri} for {execution_id} failed ({exc}); retry in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def _stream(execution_id: str, uri: str, limit: int) -> AsyncIterator[bytes]:
+    """Chunks of a storage file, stopping after ``limit`` bytes (+1 to detect overflow)."""
+    url = f"{KESTRA_URL}{KESTRA_FILE_PATH.format(execution_id=execution_id)}"
+    client = get_client("kestra")
+    async with client.stream("GET", url, params={"path": uri}, headers=HEADERS) as resp:
+        resp.raise_for_status()
+        seen = 0
+        async for chunk in resp.aiter_bytes(KESTRA_OUTPUT_CHUNK_SIZE):
+            if seen + len(chunk) > limit:
+                yield chunk[: limit - seen + 1]
+                return
+            seen += len(chunk)
+            yield chunk
+
+
+async def fetch_json(execution_id: str, uri: str, limit: Optional[int] = None):
+    limit = KESTRA_OUTPUT_JSON_MAX_BYTES if limit is None else limit
+
+    async def attempt():
+        body = bytearray()
+        async for chunk in _stream(execution_id, uri, limit):
+            body += chunk
+        if len(body) > limit:
+            raise OutputTooLarge(f"{uri} exceeds {limit} bytes")
+        return json.loads(body)
+
+    return await _with_retries(execution_id, uri, attempt)
+
+
+async def fetch_to_gridfs(db, execution_id: str, name: str, uri: str,
+                          limit: Optional[int] = None) -> dict:
+    """Copy a storage file into GridFS (first ``limit`` bytes). Returns the run-document metadata."""
+    limit = KESTRA_OUTPUT_MAX_BYTES if limit is None else limit
+    bucket = get_output_bucket(db)
+
+    async def attempt():
+        grid_in = bucket.open_upload_stream(
+            f"{execution_id}/{name}",
+            metadata={"execution_id": execution_id, "name": name, "source": uri},
+        )
+        length, truncated = 0, False
+        try:
+            async for chunk in _stream(execution_id, uri, limit):
+                if length + len(chunk) > limit:
+                    chunk, truncated = chunk[: limit - length], True
+                length += len(chunk)
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        await grid_in.close()
+        return {"file_id": grid_in._id, "length": length, "truncated": truncated}
+
+    return await _with_retries(execution_id, uri, attempt)
+
+
+def _stored(run: dict, field: str) -> bool:
+    value = run
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value is not None
+
+
+async def store_outputs(db, execution_id: str, refs: Dict[str, str]) -> dict:
+    """Fetch every referenced output and record it on the run. Returns the fields set.
+
+    Each output is saved as soon as it is fetched, so a retried job skips
+    the ones an earlier attempt already stored.
+    """
+    fields: dict = {}
+    failed = []
+    run = await db["runs"].find_one({"id": execution_id}, {f: 1 for _, f in OUTPUTS.values()}) or {}
+    for name, uri in valid_refs(execution_id, refs).items():
+        kind, field = OUTPUTS[name]
+        if _stored(run, field):
+            continue
+        try:
+            if kind == "json":
+                value = await fetch_json(execution_id, uri)
+            else:
+                value = await fetch_to_gridfs(db, execution_id, name, uri)
+        except ValueError as exc:                # too large or not valid JSON
+            # not worth retrying: the file itself is unusable
+            logging.warning(f"Skipping output {name} for {execution_id}: {exc}")
+            failed.append(name)
+            continue
+        except httpx.HTTPStatusError as exc:
+            if _retryable(exc):
+                raise
+            logging.warning(f"Output {name} for {execution_id} not available: {exc}")
+            failed.append(name)
+            continue
+        fields[field] = value
+        await db["runs"].update_one({"id": execution_id}, {"$set": {field: value}})
+    if failed:
+        fields["outputs_failed"] = failed
+        await db["runs"].update_one({"id": execution_id}, {"$set": {"outputs_failed": failed}})
+    return fields
+
+
+async def iter_output(db, file_id: ObjectId, chunk_size: int = KESTRA_OUTPUT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Stream a stored output back out of GridFS."""
+    grid_out = await get_output_bucket(db).open_download_stream(file_id)
+    while True:
+        chunk = await grid_out.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
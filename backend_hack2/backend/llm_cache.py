@@ -0,0 +1,106 @@
+"""Content-addressed, persistent cache for LLM outputs.
+
+An entry is keyed by a SHA-256 of ``(kind, model, template version,
+canonical insights JSON)``, so the same insights sent through the same
+prompt template and model never hit the remote LLM twice.  Entries live in
+the ``llm_cache`` Mongo collection; ``expires_at`` drives a TTL index and
+``last_used_at`` drives LRU eviction once ``LLM_CACHE_MAX_ENTRIES`` is
+exceeded.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict
+
+from database import db
+
+LLM_CACHE_COLLECTION = "llm_cache"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+
+def canonical_json(value: Any) -> str:
+    """Stable JSON: sorted keys, no insignificant whitespace."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def cache_key(kind: str, model: str, template_version: str, insights: Any) -> str:
+    material = canonical_json([kind, model, template_version, insights])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_ratio": round(_stats["hits"] / lookups, 4) if lookups else 0.0}
+
+
+def _collection():
+    return db[LLM_CACHE_COLLECTION]
+
+
+async def _evict_overflow() -> None:
+    col = _collection()
+    overflow = await col.estimated_document_count() - LLM_CACHE_MAX_ENTRIES
+    if overflow <= 0:
+        return
+    victims = await col.find({}, {"_id": 1}).sort("last_used_at", 1).limit(overflow).to_list(overflow)
+    if victims:
+        result = await col.delete_many({"_id": {"$in": [v["_id"] for v in victims]}})
+        _stats["evictions"] += result.deleted_count
+
+
+async def get_or_compute(
+    *,
+    kind: str,
+    model: str,
+    template_version: str,
+    insights: Any,
+    compute: Callable[[], Awaitable[str]],
+) -> str:
+    """Return the cached output for these inputs, or run ``compute`` and store it.
+
+    Cache failures are logged and never fail the LLM call itself.
+    """
+    key = cache_key(kind, model, template_version, insights)
+    now = datetime.utcnow()
+    try:
+        doc = await _collection().find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}, "$inc": {"hits": 1}},
+            projection={"output": 1},
+        )
+        if doc:
+            _stats["hits"] += 1
+            return doc["output"]
+    except Exception as exc:
+        _stats["errors"] += 1
+        logging.warning(f"LLM cache lookup failed ({kind}): {exc}")
+
+    _stats["misses"] += 1
+    output = await compute()
+
+    try:
+        await _collection().replace_one(
+            {"_id": key},
+            {
+                "kind": kind,
+                "model": model,
+                "template_version": template_version,
+                "output": output,
+                "hits": 0,
+                "created_at": now,
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=LLM_CACHE_TTL),
+            },
+            upsert=True,
+        )
+        await _evict_overflow()
+    except Exception as exc:
+        _stats["errors"] += 1
+        logging.warning(f"LLM cache store failed ({kind}): {exc}")
+    return output
@@ -0,0 +1,258 @@
+"""Per-process fan-out hub for execution log streams.
+
+Every ``/api/status/{execution_id}`` viewer subscribes here instead of
+opening its own Kestra follow: the hub runs **one** upstream
+:func:`kestra_client.follow_logs` per execution and copies each batch into
+the bounded queue of every subscriber, so upstream load grows with the
+number of executions, not viewers.
+
+* Recent lines are kept in a small ring buffer, so late joiners and
+  ``Last-Event-ID`` reconnects are served from memory.
+* A subscriber whose queue is full is **skipped ahead**: its backlog is
+  dropped and replaced by a ``skipped`` event (the line count), so a slow
+  browser never blocks the others.  After ``LOG_HUB_MAX_SKIPS`` skips it is
+  disconnected.
+* ``LOG_HUB_MAX_CONNECTIONS`` caps open SSE connections per worker.  The
+  slot is taken when the request is accepted and released however the
+  response ends – including when the client is gone before the body is
+  ever iterated (see :class:`_Stream`).
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Dict, Optional
+
+from kestra_client import follow_logs, format_sse, LOG_RECONNECT_DELAY
+
+LOG_HUB_MAX_CONNECTIONS = int(os.getenv("LOG_HUB_MAX_CONNECTIONS", "500"))
+LOG_HUB_CLIENT_QUEUE = int(os.getenv("LOG_HUB_CLIENT_QUEUE", "64"))       # batches
+LOG_HUB_REPLAY_LINES = int(os.getenv("LOG_HUB_REPLAY_LINES", "2000"))
+LOG_HUB_MAX_SKIPS = int(os.getenv("LOG_HUB_MAX_SKIPS", "5"))
+# Keep an upstream follow alive this long after its last viewer leaves,
+# so a page reload does not restart it from scratch.
+LOG_HUB_LINGER = float(os.getenv("LOG_HUB_LINGER", "10"))
+
+_FINAL = ("end", "error")
+
+
+class TooManyStreams(RuntimeError):
+    """The worker already serves ``LOG_HUB_MAX_CONNECTIONS`` streams."""
+
+
+class _Subscriber:
+    __slots__ = ("follower", "queue", "after", "skips", "closed")
+
+    def __init__(self, follower: "_Follower", after: int, maxsize: int):
+        self.follower = follower
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.after = after          # last line number queued for this client
+        self.skips = 0
+        self.closed = False
+
+    def offer(self, item: tuple) -> None:
+        """Queue ``item`` without ever waiting; skip ahead if the client lags."""
+        kind, value, lines = item
+        if self.closed:
+            return
+        if kind == "logs":
+            if value <= self.after:
+                return
+            lines = lines[-(value - self.after):]
+            item = ("logs", value, lines)
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._skip_ahead(item)
+            return
+        if kind == "logs":
+            self.after = value
+        elif kind in _FINAL:
+            self.closed = True
+
+    def _skip_ahead(self, item: tuple) -> None:
+        dropped = 0
+        while not self.queue.empty():
+            kind, _, lines = self.queue.get_nowait()
+            if kind == "logs":
+                dropped += len(lines)
+        self.skips += 1
+        self.follower.hub.skipped_lines += dropped
+        if self.skips > LOG_HUB_MAX_SKIPS:
+            self.follower.hub.dropped_clients += 1
+            self.queue.put_nowait(("error", "Client too slow – reconnect to resume", None))
+            self.closed = True
+            return
+        self.queue.put_nowait(("skipped", dropped, None))
+        self.offer(item)
+
+
+class _Follower:
+    """One upstream log follow for an execution, shared by its subscribers."""
+
+    def __init__(self, hub: "LogHub", execution_id: str):
+        self.hub = hub
+        self.execution_id = execution_id
+        self.subscribers: set = set()
+        self.lines: deque = deque(maxlen=LOG_HUB_REPLAY_LINES)   # (seq, line)
+        self.final: Optional[tuple] = None
+        self.task: Optional[asyncio.Task] = None
+        self.linger: Optional[asyncio.TimerHandle] = None
+
+    def start(self) -> None:
+        self.task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        try:
+            async for item in follow_logs(self.execution_id):
+                kind, value, lines = item
+                if kind == "logs":
+                    first = value - len(lines) + 1
+                    self.lines.extend(zip(range(first, value + 1), lines))
+                self._broadcast(item)
+                if kind in _FINAL:
+                    self.final = item
+                    return
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logging.error(f"Log follower for {self.execution_id} crashed: {exc}")
+            self.final = ("error", f"Log stream error: {exc}", None)
+            self._broadcast(self.final)
+        finally:
+            self.hub._forget(self)
+
+    def _broadcast(self, item: tuple) -> None:
+        for sub in list(self.subscribers):
+            sub.offer(item)
+
+    def replay(self, sub: _Subscriber) -> None:
+        """Queue buffered lines after ``sub.after`` (and the final event, if any)."""
+        backlog = [(seq, line) for seq, line in self.lines if seq > sub.after]
+        if backlog and backlog[0][0] > sub.after + 1:
+            missed = backlog[0][0] - sub.after - 1
+            sub.queue.put_nowait(("skipped", missed, None))
+            self.hub.skipped_lines += missed
+        while backlog:
+            chunk, backlog = backlog[:500], backlog[500:]
+            sub.offer(("logs", chunk[-1][0], [line for _, line in chunk]))
+        if self.final:
+            sub.offer(self.final)
+
+
+class LogHub:
+    """Subscriptions for every execution watched by this worker."""
+
+    def __init__(self, max_connections: int = LOG_HUB_MAX_CONNECTIONS,
+                 client_queue: int = LOG_HUB_CLIENT_QUEUE):
+        self.max_connections = max_connections
+        self.client_queue = client_queue
+        self.followers: Dict[str, _Follower] = {}
+        self.connections = 0
+        self.rejected = 0
+        self.skipped_lines = 0
+        self.dropped_clients = 0
+
+    def subscribe(self, execution_id: str, after: int = 0) -> _Subscriber:
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            raise TooManyStreams(f"Log stream limit reached ({self.max_connections})")
+        follower = self.followers.get(execution_id)
+        if follower is None:
+            follower = self.followers[execution_id] = _Follower(self, execution_id)
+            follower.start()
+        if follower.linger:
+            follower.linger.cancel()
+            follower.linger = None
+        sub = _Subscriber(follower, after, self.client_queue)
+        follower.replay(sub)
+        follower.subscribers.add(sub)
+        self.connections += 1
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        follower = sub.follower
+        if sub not in follower.subscribers:
+            return
+        follower.subscribers.discard(sub)
+        self.connections -= 1
+        if not follower.subscribers and follower.task and not follower.task.done():
+            # the follower's loop, not the running one: this may run from a finaliser
+            loop = follower.task.get_loop()
+            follower.linger = loop.call_later(LOG_HUB_LINGER, self._stop_idle, follower)
+
+    def _stop_idle(self, follower: _Follower) -> None:
+        follower.linger = None
+        if not follower.subscribers and follower.task:
+            follower.task.cancel()
+
+    def _forget(self, follower: _Follower) -> None:
+        if self.followers.get(follower.execution_id) is follower:
+            del self.followers[follower.execution_id]
+
+    async def stream(self, sub: _Subscriber):
+        """SSE frames for one subscriber; always unsubscribes on exit."""
+        try:
+            yield f"retry: {int(LOG_RECONNECT_DELAY * 1000)}\n\n"
+            while True:
+                kind, value, lines = await sub.queue.get()
+                yield format_sse(kind, value, lines)
+                if kind in _FINAL:
+                    return
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        return {
+            "executions": len(self.followers),
+            "connections": self.connections,
+            "max_connections": self.max_connections,
+            "rejected": self.rejected,
+            "skipped_lines": self.skipped_lines,
+            "dropped_clients": self.dropped_clients,
+        }
+
+
+class _Stream:
+    """SSE body that owns its subscription.
+
+    A generator's ``finally`` only runs once it has started, and Starlette
+    never starts the body if the client disconnects first.  So the
+    subscription is also released by :meth:`aclose` (run it as the
+    response's background task) and, as a last resort, when the body is
+    garbage-collected.
+    """
+
+    def __init__(self, hub: LogHub, sub: _Subscriber):
+        self.hub = hub
+        self.sub = sub
+        self._frames = hub.stream(sub)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        return await self._frames.__anext__()
+
+    async def aclose(self) -> None:
+        await self._frames.aclose()
+        self.hub.unsubscribe(self.sub)
+
+    def __del__(self):
+        try:
+            self.hub.unsubscribe(self.sub)
+        except RuntimeError:                 # event loop already closed (shutdown)
+            pass
+
+
+log_hub = LogHub()
+
+
+def get_logs_stream(execution_id: str, last_event_id: int = 0) -> _Stream:
+    """Subscribe now (raising :class:`TooManyStreams` at the cap) and return the SSE body."""
+    return _Stream(log_hub, log_hub.subscribe(execution_id, last_event_id))
+
+
+def stats() -> dict:
+    return log_hub.stats()
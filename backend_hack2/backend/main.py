@@ -1,12 +1,13 @@
 # ----------------------------------------------------------------------
 # main.py – only the parts that changed are shown
 # ----------------------------------------------------------------------
-import os, asyncio, logging, time
+import os, asyncio, logging, time, uuid, json, base64
 from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Request, BackgroundTasks, Depends
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -14,15 +15,30 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from pydantic import BaseModel, HttpUrl, EmailStr, validator
+from pydantic import ValidationError as PydanticValidationError
+from pymongo.errors import BulkWriteError
+from typing import List, Optional
 from dotenv import load_dotenv
 import uvicorn
 
 # ----------------------------------------------------------------------
 # Project‑specific imports
 # ----------------------------------------------------------------------
-from database import ping_db, get_user_collection, db, cache_get, cache_set, cache_delete, create_indexes
+from database import ping_db, db, cache_get, cache_set, cache_delete, create_indexes
 from auth_routes import router as auth_router
-from kestra_client import trigger_workflow, get_logs_stream
+from auth import current_user, get_user
+import auth
+from kestra_client import trigger_workflow
+from log_hub import get_logs_stream, TooManyStreams
+import log_hub
+from blob_store import iter_video
+from byte_ranges import (
+    RangeNotSatisfiable,
+    parse_range_header,
+    multipart_part_header,
+    multipart_trailer,
+    multipart_length,
+)
 from logging_config import setup_logging
 from exceptions import (
     AutopilotBaseException,
@@ -38,7 +54,16 @@ from exceptions import (
 )
 
 # NEW – import the helper we just created
-from agents import process_kestra_completion
+from agents import coderabbit_window, video_hedge_stats
+import insights_cache
+import llm_cache
+import job_queue
+import provider_limits
+import http_clients
+import telemetry
+import kestra_outputs
+import text_codec
+from ids import new_id
 
 # ----------------------------------------------------------------------
 # Set up structured logging
@@ -53,7 +78,13 @@ load_dotenv()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await ping_db()               # aborts start‑up if Mongo is down
+    await create_indexes()
+    await text_codec.load_dictionaries(db)
+    await http_clients.open_clients()
+    refresher = asyncio.create_task(telemetry.business_refresher(db))
     yield
+    refresher.cancel()
+    await http_clients.close_clients()
     await db.client.close()
     logging.info("Mongo client closed")
 
@@ -73,6 +104,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-route request counter and latency histogram (route templates, not raw paths)."""
+    started = time.perf_counter()
+    telemetry.http_in_progress.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        telemetry.http_in_progress.dec()
+        route = request.scope.get("route")
+        labels = {
+            "method": request.method,
+            "route": getattr(route, "path", "unmatched"),
+            "status": status,
+        }
+        telemetry.http_requests.inc(**labels)
+        telemetry.http_latency.observe(time.perf_counter() - started, **labels)
+
+@app.exception_handler(AutopilotBaseException)
+async def autopilot_exception_handler(request: Request, exc: AutopilotBaseException):
+    """Map the custom exceptions to their HTTP status (same shape as HTTPException)."""
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.message})
+
 # ----------------------------------------------------------------------
 # Pydantic models with enhanced validation
 # ----------------------------------------------------------------------
@@ -80,6 +137,7 @@ class TriggerRequest(BaseModel):
     repo_url: HttpUrl
     branch: str = "main"
     user_email: EmailStr
+    incremental_tests: bool = False     # scan only tests impacted since the last scan
 
     class Config:
         str_strip_whitespace = True
@@ -152,36 +210,32 @@ async def health():
 @app.get(
     "/metrics",
     summary="Performance metrics",
-    description="Get application performance metrics and statistics.",
+    description="Prometheus text exposition of request, provider, job and business metrics. Use `?format=json` for the JSON summary including cache and pool statistics.",
     tags=["Monitoring"]
 )
-async def metrics():
+async def metrics(format: str = "prometheus"):
     """
     Get performance metrics for monitoring.
 
+    Nothing here queries MongoDB: business totals come from the snapshot
+    refreshed in the background every ``METRICS_REFRESH_INTERVAL`` seconds.
+
     Returns:
-        dict: Performance metrics including request counts, response times, etc.
+        Prometheus text, or a dict of statistics with ``format=json``.
     """
-    try:
-        # Get basic metrics from database
-        runs_count = await db["runs"].count_documents({})
-        users_count = await db["users"].count_documents({})
-        artefacts_count = await db["artefacts"].count_documents({})
-
-        # Get recent activity (last 24 hours)
-        yesterday = datetime.utcnow() - timedelta(days=1)
-        recent_runs = await db["runs"].count_documents({"timestamp": {"$gte": yesterday}})
-
-        return {
-            "total_runs": runs_count,
-            "total_users": users_count,
-            "total_artefacts": artefacts_count,
-            "recent_runs_24h": recent_runs,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    except Exception as exc:
-        logger.error(f"Metrics collection failed: {exc}")
-        raise DatabaseError(f"Failed to collect metrics: {str(exc)}")
+    if format != "json":
+        return Response(telemetry.render(), media_type=telemetry.CONTENT_TYPE)
+    return {
+        **telemetry.business_totals(),
+        "insights_cache": insights_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "providers": provider_limits.stats(),
+        "video_generation": await video_hedge_stats(),
+        "log_streams": log_hub.stats(),
+        "http_pools": http_clients.stats(),
+        "user_cache": auth.stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
 # ----------------------------------------------------------------------
 # /api/trigger – enhanced with custom exceptions and logging
@@ -214,53 +268,17 @@ async def metrics():
 async def trigger_autopilot(
     req: TriggerRequest,
     background: BackgroundTasks,
-    request: Request
+    request: Request,
+    user: dict = Depends(current_user),
 ):
-    # Enhanced JWT validation
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise AuthenticationError("Missing or invalid authorization header")
-
-    token = auth_header.split(" ")[1]
-    try:
-        # Decode and validate JWT token
-        import jwt
-        from datetime import datetime, timedelta
-
-        JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-
-        # Check token expiration
-        exp = payload.get("exp")
-        if exp and datetime.utcnow().timestamp() > exp:
-            raise AuthenticationError("Token has expired")
-
-        user_email = payload.get("sub")
-        if not user_email:
-            raise AuthenticationError("Invalid token payload")
-
-        # Verify user exists in database
-        users_col = get_user_collection()
-        user_doc = await users_col.find_one({"email": user_email})
-        if not user_doc:
-            raise AuthenticationError("User not found")
-
-        logger.info(f"Authenticated user: {user_email}")
-
-    except jwt.ExpiredSignatureError:
-        raise AuthenticationError("Token has expired")
-    except jwt.InvalidTokenError:
-        raise AuthenticationError("Invalid token")
-    except Exception as exc:
-        logger.error(f"JWT validation failed: {exc}")
-        raise AuthenticationError("Authentication failed")
+    logger.info(f"Authenticated user: {user['email']}")
     logger.info(f"Triggering autopilot for repo: {req.repo_url}, user: {req.user_email}")
 
     try:
         # ------ validation & Kestra start ------
         repo_str = str(req.repo_url)
-        users_col = get_user_collection()
-        user_doc = await users_col.find_one({"email": req.user_email})
+        # Usually the caller triggers for themselves – no second lookup then.
+        user_doc = user if req.user_email == user["email"] else await get_user(req.user_email)
         if not user_doc:
             logger.warning(f"User not found: {req.user_email}")
             raise ResourceNotFoundError(f"User not found: {req.user_email}")
@@ -282,6 +300,7 @@ async def trigger_autopilot(
                 user_email=req.user_email,
                 github_token=github_token,
                 coderabbit_token=system_coderabbit_token,
+                incremental_tests=req.incremental_tests,
             )
             execution_id = execution["id"]
             logger.info(f"Kestra workflow triggered successfully: {execution_id}")
@@ -318,47 +337,222 @@ async def trigger_autopilot(
         logger.exception(f"Unexpected error in trigger_autopilot: {exc}")
         raise HTTPException(500, "Internal server error")
 
+# ----------------------------------------------------------------------
+# /api/trigger/batch – launch many repositories in one round trip
+# ----------------------------------------------------------------------
+BATCH_TRIGGER_MAX_ITEMS = int(os.getenv("BATCH_TRIGGER_MAX_ITEMS", "100"))
+BATCH_TRIGGER_CONCURRENCY = int(os.getenv("BATCH_TRIGGER_CONCURRENCY", "8"))
+
+
+class BatchTriggerItem(BaseModel):
+    repo_url: str
+    branch: str = "main"
+
+
+class BatchTriggerRequest(BaseModel):
+    user_email: EmailStr
+    items: List[BatchTriggerItem]
+    incremental_tests: bool = False
+
+
+@app.post(
+    "/api/trigger/batch",
+    summary="Trigger workflows for many repositories",
+    description="Validates every entry, resolves the user once, starts the Kestra executions with bounded concurrency and records all runs with one bulk insert. Returns a result per entry; failures of individual entries do not fail the batch.",
+    tags=["Workflow"],
+    response_model=dict,
+    responses={
+        200: {
+            "description": "Batch processed (see per-item results)",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "success": False,
+                        "total": 2,
+                        "launched": 1,
+                        "failed": 1,
+                        "results": [
+                            {"index": 0, "repo_url": "https://github.com/org/a", "branch": "main",
+                             "success": True, "execution_id": "abc123", "status_url": "/api/status/abc123"},
+                            {"index": 1, "repo_url": "https://gitlab.com/org/b", "branch": "main",
+                             "success": False, "error": "Only GitHub repositories are supported"}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {"description": "Empty or oversized batch"},
+        401: {"description": "Authentication failed"},
+        404: {"description": "User not found"},
+    }
+)
+async def trigger_autopilot_batch(req: BatchTriggerRequest, user: dict = Depends(current_user)):
+    if not req.items:
+        raise ValidationError("Batch must contain at least one repository")
+    if len(req.items) > BATCH_TRIGGER_MAX_ITEMS:
+        raise ValidationError(f"Batch too large (max {BATCH_TRIGGER_MAX_ITEMS} repositories)")
+
+    # ------ user lookup: once for the whole batch (token checked by current_user) ------
+    user_doc = user if req.user_email == user["email"] else await get_user(req.user_email)
+    if not user_doc:
+        raise ResourceNotFoundError(f"User not found: {req.user_email}")
+    github_token = user_doc.get("github_token")
+    if not github_token:
+        raise AuthenticationError("GitHub token missing – please re-authenticate")
+    system_coderabbit_token = os.getenv("CODERABBIT_TOKEN")
+    if not system_coderabbit_token:
+        logger.error("CODERABBIT_TOKEN environment variable not set")
+        raise ConfigurationError("System configuration error")
+
+    # ------ validate every entry in one pass ------
+    results = []
+    valid = []
+    seen = set()
+    for index, item in enumerate(req.items):
+        result = {"index": index, "repo_url": item.repo_url, "branch": item.branch}
+        results.append(result)
+        try:
+            checked = TriggerRequest(repo_url=item.repo_url, branch=item.branch, user_email=req.user_email)
+        except PydanticValidationError as exc:
+            result.update(success=False, error="; ".join(e["msg"] for e in exc.errors()))
+            continue
+        key = (str(checked.repo_url), checked.branch)
+        if key in seen:
+            result.update(success=False, error="Duplicate repository/branch in batch")
+            continue
+        seen.add(key)
+        result.update(repo_url=key[0], branch=key[1])
+        valid.append(result)
+
+    # ------ start executions with bounded concurrency ------
+    slots = asyncio.Semaphore(BATCH_TRIGGER_CONCURRENCY)
+
+    async def launch(result: dict) -> Optional[dict]:
+        async with slots:
+            try:
+                execution = await trigger_workflow(
+                    repo_url=result["repo_url"],
+                    branch=result["branch"],
+                    user_email=req.user_email,
+                    github_token=github_token,
+                    coderabbit_token=system_coderabbit_token,
+                    incremental_tests=req.incremental_tests,
+                )
+            except Exception as exc:
+                detail = getattr(exc, "detail", None) or str(exc)
+                logger.error(f"Kestra trigger failed for {result['repo_url']}: {detail}")
+                result.update(success=False, error=f"Failed to trigger workflow: {detail}")
+                return None
+        result.update(success=True, execution_id=execution["id"],
+                      status_url=f"/api/status/{execution['id']}")
+        return {
+            "id": execution["id"],
+            "repo": result["repo_url"],
+            "status": "RUNNING",
+            "timestamp": execution["state"]["startDate"],
+            "user_email": req.user_email,
+        }
+
+    launched = await asyncio.gather(*(launch(result) for result in valid))
+    started = [(result, doc) for result, doc in zip(valid, launched) if doc]
+
+    # ------ one bulk insert for all run documents ------
+    if started:
+        try:
+            await db["runs"].insert_many([doc for _, doc in started], ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details.get("writeErrors", []):
+                started[error["index"]][0].update(success=False, error="Failed to store execution record")
+        except Exception as exc:
+            logger.error(f"Failed to store batch run documents: {exc}")
+            for result, _ in started:
+                result.update(success=False, error="Failed to store execution record")
+
+    ok = sum(1 for result in results if result.get("success"))
+    logger.info(f"Batch trigger for {req.user_email}: {ok}/{len(results)} launched")
+    return {
+        "success": ok == len(results),
+        "total": len(results),
+        "launched": ok,
+        "failed": len(results) - ok,
+        "results": results,
+    }
+
 # ----------------------------------------------------------------------
 # /api/status – log streaming with documentation
 # ----------------------------------------------------------------------
 @app.get(
     "/api/status/{execution_id}",
     summary="Stream workflow execution logs",
-    description="Streams real-time logs for a specific workflow execution using Server-Sent Events.",
+    description="Tails the logs of a workflow execution using Server-Sent Events. Events carry an `id:` line number; reconnect with `Last-Event-ID` to resume without replay. The stream ends with an `end` event once the execution finishes.",
     tags=["Workflow"],
     responses={
         200: {
             "description": "Log stream established",
             "content": {
                 "text/event-stream": {
-                    "example": "data: Workflow started\n\ndata: Processing repository\n\n"
+                    "example": "id: 2\ndata: Workflow started\ndata: Processing repository\n\nevent: end\ndata: SUCCESS\n\n"
                 }
             }
         },
         404: {"description": "Execution not found"},
-        500: {"description": "Log streaming failed"}
+        500: {"description": "Log streaming failed"},
+        503: {"description": "Too many open log streams on this worker"}
     }
 )
-async def stream_status(execution_id: str):
+async def stream_status(execution_id: str, request: Request):
+    # EventSource resends the last ``id:`` it saw; resume after that line.
+    try:
+        last_event_id = max(int(request.headers.get("Last-Event-ID", "0")), 0)
+    except ValueError:
+        last_event_id = 0
     try:
+        stream = get_logs_stream(execution_id, last_event_id)
         return StreamingResponse(
-            get_logs_stream(execution_id),
+            stream,
             media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # frees the connection slot even if the body is never iterated
+            background=BackgroundTask(stream.aclose),
         )
+    except TooManyStreams as exc:
+        raise HTTPException(503, str(exc), headers={"Retry-After": "5"})
     except Exception as exc:
         raise HTTPException(500, f"Log stream failed: {exc}")
 
 # ----------------------------------------------------------------------
 # /api/runs – recent runs with enhanced error handling
 # ----------------------------------------------------------------------
+RUNS_PAGE_MAX = 200
+RUN_FIELDS = ("id", "repo", "status", "timestamp", "user_email",
+              "video_job_id", "artefact_id", "completion_message", "error", "scan", "test_summary",
+              "outputs_job_id", "outputs_failed")
+RUN_DEFAULT_FIELDS = ("id", "repo", "status", "timestamp", "user_email")
+
+
+def _encode_cursor(run: dict) -> str:
+    # legacy runs may lack a timestamp – they sort last and page by id alone
+    raw = json.dumps([run.get("timestamp"), run["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, run_id = json.loads(raw)
+        return timestamp, run_id
+    except Exception:
+        raise ValidationError("Invalid cursor")
+
+
 @app.get(
     "/api/runs",
     summary="Get recent workflow executions",
-    description="Retrieves the most recent workflow executions, sorted by timestamp.",
+    description="Lists workflow executions, newest first, with keyset pagination: pass the returned `next_cursor` as `cursor` to fetch the next page. Every page costs the same index seek, however deep. Filter by `user_email`, `repo` or `status`, and pick fields with `fields=id,status,...`.",
     tags=["Workflow"],
     responses={
         200: {
-            "description": "List of recent runs",
+            "description": "One page of runs",
             "content": {
                 "application/json": {
                     "example": {
@@ -370,61 +564,145 @@ async def stream_status(execution_id: str):
                                 "timestamp": "2024-01-01T00:00:00Z",
                                 "user_email": "user@example.com"
                             }
-                        ]
+                        ],
+                        "next_cursor": "WyIyMDI0LTAxLTAxVDAwOjAwOjAwWiIsImV4ZWMxMjMiXQ"
                     }
                 }
             }
         },
+        400: {"description": "Invalid cursor, limit or field list"},
         500: {"description": "Database error"}
     }
 )
-async def get_runs():
-    logger.info("Fetching recent runs")
+async def get_runs(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user_email: Optional[str] = None,
+    repo: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    if not 1 <= limit <= RUNS_PAGE_MAX:
+        raise ValidationError(f"limit must be between 1 and {RUNS_PAGE_MAX}")
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(RUN_DEFAULT_FIELDS)
+    unknown = sorted(set(wanted) - set(RUN_FIELDS))
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+    query = {}
+    if user_email:
+        query["user_email"] = user_email
+    if repo:
+        query["repo"] = repo
+    if status:
+        query["status"] = status
+    if cursor:
+        timestamp, run_id = _decode_cursor(cursor)
+        if timestamp is None:
+            # already in the trailing block of runs without a timestamp
+            query["$or"] = [{"timestamp": None, "id": {"$lt": run_id}}]
+        else:
+            # $lt never matches null/missing, so those runs are added explicitly
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "id": {"$lt": run_id}},
+                {"timestamp": None},
+            ]
+    # timestamp and id are always read – they form the cursor.
+    projection = {"_id": 0, "timestamp": 1, "id": 1, **{f: 1 for f in wanted}}
+    logger.info(f"Fetching runs page (limit={limit}, filters={sorted(k for k in query if k != '$or')})")
 
     try:
-        cur = db["runs"].find().sort("timestamp", -1).limit(50)
-        runs = await cur.to_list(50)
-        for r in runs:
-            r["_id"] = str(r["_id"])
-        logger.info(f"Retrieved {len(runs)} runs")
-        return {"runs": runs}
+        cur = db["runs"].find(query, projection).sort([("timestamp", -1), ("id", -1)]).limit(limit + 1)
+        runs = await cur.to_list(limit + 1)
     except Exception as exc:
         logger.error(f"Failed to fetch runs: {exc}")
         raise DatabaseError(f"Failed to retrieve execution history: {str(exc)}")
 
+    next_cursor = _encode_cursor(runs[limit - 1]) if len(runs) > limit else None
+    runs = runs[:limit]
+    if fields:
+        runs = [{f: run.get(f) for f in wanted} for run in runs]
+    logger.info(f"Retrieved {len(runs)} runs")
+    return {"runs": runs, "next_cursor": next_cursor}
+
 # ----------------------------------------------------------------------
 # /webhook/kestra – now also fires the video‑generation background task
 # ----------------------------------------------------------------------
+# The flow sends output *references*, so a real webhook body is tiny.
+WEBHOOK_MAX_BYTES = int(os.getenv("WEBHOOK_MAX_BYTES", str(64 * 1024)))
+# Run statuses the webhook may move to COMPLETED (None: no status yet)
+RUN_STATUSES_BEFORE_COMPLETED = [None, "RUNNING"]
+
+
+async def _read_capped_json(request: Request, limit: int) -> dict:
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(413, f"Webhook body exceeds {limit} bytes")
+    return json.loads(body)
+
+
 @app.post("/webhook/kestra")
 async def kestra_webhook(request: Request):
     """
     Kestra calls this when a workflow finishes.
     1️⃣ Mark the run as COMPLETED.
-    2️⃣ Fire‑and‑forget `process_kestra_completion` (which creates the video).
+    2️⃣ Enqueue a `kestra_outputs` job – a worker streams the referenced
+       output files (bug report, test summary, timings) from Kestra storage.
+    3️⃣ Enqueue a `post_kestra` job – a worker runs `process_kestra_completion`
+       (which creates the video).
     """
     try:
-        payload = await request.json()
+        payload = await _read_capped_json(request, WEBHOOK_MAX_BYTES)
         exec_id = payload.get("id") or payload.get("executionId")
         if not exec_id:
             raise ValueError("Missing executionId in webhook payload")
 
         # 1️⃣ update run status (upsert=True to handle manual Kestra runs)
+        now = datetime.utcnow()
+        fields = {}
+        # Only when creating a doc: triggered runs already carry these, and
+        # /api/runs pages by timestamp
+        on_insert = {
+            "status": "COMPLETED",
+            "finished_at": now,
+            "repo": payload.get("repo"),
+            "user_email": payload.get("user_email"),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+        }
+        # Older flows inline these instead of sending references
+        if isinstance(payload.get("scan"), dict):
+            # scan-repo timings: setup_seconds, test_seconds, deps_cache
+            fields["scan"] = payload["scan"]
+        if isinstance(payload.get("test_summary"), dict):
+            # compact failure summary (totals + trimmed failures), size-capped by scan-repo
+            fields["test_summary"] = payload["test_summary"]
+        update = {"$setOnInsert": on_insert}
+        if fields:
+            update["$set"] = fields
+        await db["runs"].update_one({"id": exec_id}, update, upsert=True)
+        # A redelivered webhook must not move a run that the post_kestra job
+        # already advanced (VIDEO_GENERATING, VIDEO_READY, …) back to COMPLETED
         await db["runs"].update_one(
-            {"id": exec_id},
-            {
-                "$set": {
-                    "status": "COMPLETED", 
-                    "finished_at": datetime.utcnow(),
-                    # Ensure these fields exist if creating a new doc
-                    "repo": payload.get("repo"),
-                    "user_email": payload.get("user_email")
-                }
-            },
-            upsert=True
+            {"id": exec_id, "status": {"$in": RUN_STATUSES_BEFORE_COMPLETED}},
+            {"$set": {"status": "COMPLETED", "finished_at": now}},
         )
 
+        # 2️⃣ fetch referenced outputs off the request path
+        refs = kestra_outputs.valid_refs(exec_id, payload.get("outputs"))
+        if refs:
+            outputs_job_id = await job_queue.enqueue(
+                db,
+                job_queue.KESTRA_OUTPUTS_JOB,
+                {"execution_id": exec_id, "outputs": refs},
+                dedupe_key=f"{job_queue.KESTRA_OUTPUTS_JOB}:{exec_id}",
+            )
+            await db["runs"].update_one({"id": exec_id}, {"$set": {"outputs_job_id": outputs_job_id}})
+
         # -----------------------------------------------------------------
-        # 2️⃣ launch the *creative* background job
+        # 3️⃣ queue the *creative* background job
         # -----------------------------------------------------------------
         run_doc = await db["runs"].find_one({"id": exec_id})
         if not run_doc:
@@ -437,38 +715,45 @@ async def kestra_webhook(request: Request):
              logging.warning("Skipping video generation: repo or user_email missing in run doc")
              return {"status": "processed", "video": "skipped"}
 
-        async def _run_post_kestra():
-            try:
-                result = await process_kestra_completion(
-                    repo_url=repo_url,
-                    execution_id=exec_id,
-                    user_email=user_email,
-                    db=db,
-                )
-                # Store the result back onto the run document
-                await db["runs"].update_one(
-                    {"id": exec_id},
-                    {"$set": {
-                        "status": "VIDEO_READY",
-                        "completion_message": result["message"],
-                        "artefact_id": result["artefact_id"],
-                    }},
-                )
-            except Exception as exc:
-                logging.exception("Post‑Kestra video generation failed: %s", exc)
-                await db["runs"].update_one(
-                    {"id": exec_id},
-                    {"$set": {"status": "VIDEO_FAILED"}}
-                )
-
-        # fire‑and‑forget – the webhook returns *immediately*
-        asyncio.create_task(_run_post_kestra())
+        # durable hand-off – a worker process picks the job up; the
+        # webhook returns *immediately* and nothing is lost on restart
+        job_id = await job_queue.enqueue(
+            db,
+            job_queue.POST_KESTRA_JOB,
+            {"execution_id": exec_id, "repo_url": repo_url, "user_email": user_email},
+            dedupe_key=f"{job_queue.POST_KESTRA_JOB}:{exec_id}",
+        )
+        await db["runs"].update_one({"id": exec_id}, {"$set": {"video_job_id": job_id}})
 
-        return {"status": "processed"}
+        return {"status": "processed", "job_id": job_id}
+    except HTTPException:
+        raise
     except Exception as exc:
         logging.exception("Kestra webhook handling error: %s", exc)
         raise HTTPException(500, f"Webhook processing failed: {exc}")
 
+
+@app.get(
+    "/api/runs/{execution_id}/outputs/{name}",
+    summary="Download a stored workflow output",
+    description="Streams a text output (`bug_report`, `raw_report`) that the worker copied from Kestra storage.",
+    tags=["Workflow"],
+    responses={404: {"description": "Output not (yet) stored"}},
+)
+async def get_run_output(execution_id: str, name: str):
+    run = await db["runs"].find_one({"id": execution_id}, {f"outputs.{name}": 1})
+    meta = ((run or {}).get("outputs") or {}).get(name)
+    if not meta:
+        raise HTTPException(404, "Output not found")
+    headers = {"Content-Length": str(meta["length"])}
+    if meta.get("truncated"):
+        headers["X-Output-Truncated"] = "true"
+    return StreamingResponse(
+        kestra_outputs.iter_output(db, meta["file_id"]),
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
+    )
+
 # ----------------------------------------------------------------------
 # NEW – endpoint that streams the *raw video bytes* to the front‑end
 # ----------------------------------------------------------------------
@@ -486,29 +771,91 @@ async def kestra_webhook(request: Request):
                 }
             }
         },
+        206: {"description": "Requested byte range(s) of the video"},
+        304: {"description": "Video unchanged (If-None-Match)"},
         404: {"description": "Video not found"},
+        416: {"description": "Requested range not satisfiable"},
         500: {"description": "Video retrieval failed"}
     }
 )
-async def get_video(execution_id: str):
+async def get_video(execution_id: str, request: Request):
     """
     Returns the video generated for a given Kestra execution.
     The video is streamed as `video/mp4` (or whatever codec the provider produced).
+
+    Supports `Range` requests (single → 206, multiple → 206
+    multipart/byteranges, unsatisfiable → 416) validated by `If-Range`
+    against the ETag computed when the artefact was written, so players can
+    seek without re-downloading the whole file.
     """
-    # Find the artefact that belongs to this execution
-    artefact = await db["artefacts"].find_one({"session": execution_id})
+    # Find the artefact that belongs to this execution (metadata only –
+    # the video itself lives in GridFS and is streamed chunk by chunk)
+    artefact = await db["artefacts"].find_one(
+        {"session": execution_id},
+        {"video_file_id": 1, "video_length": 1, "video_etag": 1, "content_type": 1},
+    )
     if not artefact:
         raise HTTPException(404, "Video artefact not found")
 
-    video_bytes = artefact.get("video_bytes")
-    if not video_bytes:
+    file_id = artefact.get("video_file_id")
+    if not file_id:
         raise HTTPException(500, "Video data is missing in artefact")
 
-    # Stream the bytes – FastAPI will set the correct `Content‑Length`
+    length = artefact["video_length"]
+    etag = artefact.get("video_etag")
+    content_type = artefact.get("content_type", "video/mp4")
+    headers = {
+        "Content-Disposition": f'inline; filename="{execution_id}.mp4"',
+        "Accept-Ranges": "bytes",
+    }
+    if etag:
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+    # A stale If-Range validator means "send me the whole new file".
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and (not etag or if_range.strip() != etag):
+        range_header = None
+
+    try:
+        ranges = parse_range_header(range_header, length)
+    except RangeNotSatisfiable:
+        raise HTTPException(416, "Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{length}"})
+
+    if not ranges:
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(iter_video(db, file_id), media_type=content_type, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            iter_video(db, file_id, start, end),
+            status_code=206,
+            media_type=content_type,
+            headers=headers,
+        )
+
+    boundary = uuid.uuid4().hex
+
+    async def _multipart():
+        for start, end in ranges:
+            yield multipart_part_header(boundary, content_type, start, end, length)
+            async for chunk in iter_video(db, file_id, start, end):
+                yield chunk
+        yield multipart_trailer(boundary)
+
+    headers["Content-Length"] = str(multipart_length(boundary, content_type, ranges, length))
     return StreamingResponse(
-        iter([video_bytes]),      # a single‑iteration generator
-        media_type="video/mp4",
-        headers={"Content-Disposition": f'inline; filename="{execution_id}.mp4"'},
+        _multipart(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers=headers,
     )
 
 # ----------------------------------------------------------------------
@@ -547,25 +894,25 @@ async def generate_together_report(request: Request):
             raise HTTPException(400, "Missing repo_url or execution_id")
 
         # Get CodeRabbit insights first
-        from agents import get_coderabbit_insights, generate_together_report
+        from agents import get_cached_coderabbit_insights, generate_together_report
         coderabbit_key = os.getenv("CODERABBIT_API_KEY")
         if not coderabbit_key:
             raise HTTPException(500, "CODERABBIT_API_KEY missing")
 
-        insights = get_coderabbit_insights(repo_url, coderabbit_key)
+        insights = await get_cached_coderabbit_insights(repo_url, coderabbit_key)
         
         # Generate Together AI report
         together_key = os.getenv("TOGETHER_API_KEY")
         if not together_key:
             raise HTTPException(500, "TOGETHER_API_KEY missing")
 
-        report = generate_together_report(insights, together_key)
+        report = await generate_together_report(insights, together_key)
 
         # Store report in database
         report_doc = {
             "execution_id": execution_id,
             "repo_url": repo_url,
-            "report": report,
+            "report": text_codec.encode(report, "together_reports.report"),
             "created_at": datetime.utcnow(),
         }
         await db["together_reports"].insert_one(report_doc)
@@ -609,7 +956,8 @@ async def get_together_report(execution_id: str):
         report_doc = await db["together_reports"].find_one({"execution_id": execution_id})
         if not report_doc:
             raise HTTPException(404, "Report not found")
-        
+        await text_codec.decode_doc(db, "together_reports", report_doc)
+
         report_doc["_id"] = str(report_doc["_id"])
         report_doc["created_at"] = report_doc["created_at"].isoformat()
         return report_doc
@@ -619,6 +967,36 @@ async def get_together_report(execution_id: str):
         logging.exception("Failed to fetch Together AI report: %s", exc)
         raise HTTPException(500, f"Failed to fetch report: {exc}")
 
+# ----------------------------------------------------------------------
+# CodeRabbit insights cache – counters & explicit invalidation
+# ----------------------------------------------------------------------
+@app.get(
+    "/api/cache/insights/stats",
+    summary="Insights cache statistics",
+    description="Hit/miss counters of the CodeRabbit insights cache on this worker.",
+    tags=["Monitoring"],
+)
+async def get_insights_cache_stats():
+    """Get insights cache hit/miss counters (used to size the TTL)."""
+    return insights_cache.stats()
+
+@app.delete(
+    "/api/cache/insights",
+    summary="Invalidate cached insights",
+    description="Drops the cached CodeRabbit insights for a repository's current report window.",
+    tags=["Monitoring"],
+    responses={
+        200: {"description": "Cache entry invalidated"},
+        400: {"description": "Missing repo_url"}
+    }
+)
+async def invalidate_insights_cache(repo_url: str):
+    """Invalidate the insights cache entry for `repo_url`."""
+    window = coderabbit_window()
+    await insights_cache.invalidate(repo_url, window)
+    logger.info(f"Invalidated insights cache for {repo_url} ({window[0]}..{window[1]})")
+    return {"status": "invalidated", "repo_url": repo_url, "from": window[0], "to": window[1]}
+
 # ----------------------------------------------------------------------
 # NEW – Cline AI agent endpoints
 # ----------------------------------------------------------------------
@@ -636,88 +1014,62 @@ async def trigger_cline_agent(request: Request):
             raise HTTPException(400, "Missing repo_url")
 
         # Store execution in database
-        execution_id = f"cline_{int(time.time())}"
+        execution_id = new_id("cline_")            # time-sortable, collision-free
         cline_doc = {
             "execution_id": execution_id,
             "repo_url": repo_url,
             "branch": branch,
-            "bug_report": bug_report,
+            "bug_report": text_codec.encode(bug_report, "cline_executions.bug_report"),
             "status": "pending",
             "created_at": datetime.utcnow(),
         }
         await db["cline_executions"].insert_one(cline_doc)
 
-        # Trigger Cline agent in background
-        async def _run_cline():
-            try:
-                import subprocess
-                import os
-                
-                env = os.environ.copy()
-                env["REPO_URL"] = repo_url
-                env["GITHUB_TOKEN"] = github_token or ""
-                env["BUG_REPORT"] = bug_report
-                
-                # Run Cline agent (assuming it's in the ai-engine directory)
-                result = subprocess.run(
-                    ["python", "ai-engine/agent.py"],
-                    capture_output=True,
-                    text=True,
-                    env=env,
-                    cwd="/app"  # Adjust path as needed
-                )
-                
-                status = "completed" if result.returncode == 0 else "failed"
-                await db["cline_executions"].update_one(
-                    {"execution_id": execution_id},
-                    {
-                        "$set": {
-                            "status": status,
-                            "output": result.stdout,
-                            "error": result.stderr if result.returncode != 0 else None,
-                            "completed_at": datetime.utcnow(),
-                        }
-                    }
-                )
-            except Exception as exc:
-                logging.exception("Cline execution failed: %s", exc)
-                await db["cline_executions"].update_one(
-                    {"execution_id": execution_id},
-                    {
-                        "$set": {
-                            "status": "failed",
-                            "error": str(exc),
-                            "completed_at": datetime.utcnow(),
-                        }
-                    }
-                )
-
-        asyncio.create_task(_run_cline())
+        # Hand the run to a worker process
+        await job_queue.enqueue(
+            db,
+            job_queue.CLINE_JOB,
+            {
+                "execution_id": execution_id,
+                "repo_url": repo_url,
+                "branch": branch,
+                "bug_report": bug_report,
+                "github_token": github_token,
+            },
+            max_attempts=2,
+            redact=("github_token",),
+        )
 
         return {
             "execution_id": execution_id,
             "repo_url": repo_url,
             "branch": branch,
-            "status": "running",
+            "status": "pending",
         }
     except Exception as exc:
         logging.exception("Cline trigger failed: %s", exc)
         raise HTTPException(500, f"Failed to trigger Cline: {exc}")
 
 @app.get("/api/cline/status/{execution_id}")
-async def get_cline_status(execution_id: str):
-    """Get Cline agent execution status."""
+async def get_cline_status(execution_id: str, after: int = 0):
+    """Get Cline agent execution status.
+
+    While the agent runs, ``lines`` holds the output lines after line number
+    ``after`` (pass the previous ``log_seq`` to poll incrementally).
+    """
     try:
-        cline_doc = await db["cline_executions"].find_one({"execution_id": execution_id})
+        # the bug report is not part of the response – skip decoding it
+        cline_doc = await db["cline_executions"].find_one({"execution_id": execution_id}, {"bug_report": 0})
         if not cline_doc:
             raise HTTPException(404, "Cline execution not found")
-        
-        cline_doc["_id"] = str(cline_doc["_id"])
-        if "created_at" in cline_doc:
-            cline_doc["created_at"] = cline_doc["created_at"].isoformat()
-        if "completed_at" in cline_doc:
-            cline_doc["completed_at"] = cline_doc["completed_at"].isoformat()
-        
+        await text_codec.decode_doc(db, "cline_executions", cline_doc)
+
+        log = cline_doc.get("log") or []
+        log_seq = cline_doc.get("log_seq", 0)
+        # ``log`` keeps the last lines only; its first entry is line log_seq - len(log) + 1
+        first = log_seq - len(log) + 1
+        lines = log[max(after - first + 1, 0):] if after < log_seq else []
+
         return {
             "execution_id": cline_doc["execution_id"],
             "repo_url": cline_doc["repo_url"],
@@ -725,6 +1077,9 @@ async def get_cline_status(execution_id: str):
             "status": cline_doc["status"],
             "output": cline_doc.get("output"),
             "error": cline_doc.get("error"),
+            "log_seq": log_seq,
+            "lines": lines,
+            "cancel_requested": bool(cline_doc.get("cancel_requested")),
         }
     except HTTPException:
         raise
@@ -732,6 +1087,21 @@ async def get_cline_status(execution_id: str):
         logging.exception("Failed to fetch Cline status: %s", exc)
         raise HTTPException(500, f"Failed to fetch Cline status: {exc}")
 
+@app.post("/api/cline/cancel/{execution_id}")
+async def cancel_cline_agent(execution_id: str):
+    """Ask the worker to stop a Cline run (takes effect within a second or two)."""
+    cline_doc = await db["cline_executions"].find_one_and_update(
+        {"execution_id": execution_id, "status": {"$in": ["pending", "running"]}},
+        {"$set": {"cancel_requested": True}},
+        projection={"status": 1},
+    )
+    if not cline_doc:
+        existing = await db["cline_executions"].find_one({"execution_id": execution_id}, {"status": 1})
+        if not existing:
+            raise HTTPException(404, "Cline execution not found")
+        raise HTTPException(409, f"Cline execution already {existing['status']}")
+    return {"execution_id": execution_id, "status": cline_doc["status"], "cancel_requested": True}
+
 # ----------------------------------------------------------------------
 # Run the server
 # ----------------------------------------------------------------------
@@ -0,0 +1,185 @@
+"""One async poller for all long-running provider operations (Veo, Pika).
+
+Instead of every video job sleeping in its own loop (or thread), jobs hand
+a ``check`` coroutine to the shared :class:`OperationPoller` and await the
+returned future.  The poller keeps a single timer heap: each operation is
+re-checked with adaptive (exponential) backoff until it completes, fails,
+hits its deadline or is cancelled – so hundreds of in-flight generations
+cost one background task and a handful of concurrent checks.
+
+A ``check`` returns ``(done, result)``.  Raising :class:`OperationFailed`
+fails the operation at once; any other exception is treated as a transient
+check error, and ``max_errors`` consecutive ones fail the operation.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+POLLER_MAX_CONCURRENT_CHECKS = int(os.getenv("POLLER_MAX_CONCURRENT_CHECKS", "32"))
+
+Check = Callable[[], Awaitable[Tuple[bool, Any]]]
+
+
+class OperationTimeout(RuntimeError):
+    """The operation did not finish before its deadline."""
+
+
+class OperationFailed(RuntimeError):
+    """The provider reported a terminal failure – stop polling."""
+
+
+class _Operation:
+    __slots__ = ("name", "check", "future", "deadline", "interval", "max_interval",
+                 "backoff", "max_errors", "errors", "on_cancel")
+
+    def __init__(self, name, check, future, deadline, interval, max_interval,
+                 backoff, max_errors, on_cancel):
+        self.name = name
+        self.check = check
+        self.future = future
+        self.deadline = deadline
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+        self.errors = 0
+        self.on_cancel = on_cancel
+
+
+class OperationPoller:
+    """Tracks many provider operations on a single timer heap."""
+
+    def __init__(self, max_concurrent_checks: int = POLLER_MAX_CONCURRENT_CHECKS):
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._checks = asyncio.Semaphore(max_concurrent_checks)
+        self._in_flight: set = set()
+        self._background: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"tracked": 0, "completed": 0, "failed": 0,
+                       "timed_out": 0, "cancelled": 0, "checks": 0}
+
+    def track(
+        self,
+        check: Check,
+        *,
+        name: str = "operation",
+        deadline: float = 600.0,
+        initial_interval: float = 2.0,
+        max_interval: float = 30.0,
+        backoff: float = 1.5,
+        max_errors: int = 3,
+        on_cancel: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> asyncio.Future:
+        """Start polling ``check``; the returned future resolves with its result.
+
+        Cancelling the future stops polling and runs ``on_cancel`` (for
+        providers that can abort a job).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        op = _Operation(name, check, future, loop.time() + deadline, initial_interval,
+                        max_interval, backoff, max_errors, on_cancel)
+        future.add_done_callback(lambda f: self._on_done(op, f))
+        self._stats["tracked"] += 1
+        self._schedule(op, loop.time() + initial_interval)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return future
+
+    def stats(self) -> dict:
+        return {**self._stats, "pending": len(self._heap) + len(self._in_flight)}
+
+    # ------------------------------------------------------------------
+    def _schedule(self, op: _Operation, when: float) -> None:
+        heapq.heappush(self._heap, (min(when, op.deadline), next(self._seq), op))
+        self._wakeup.set()
+
+    def _on_done(self, op: _Operation, future: asyncio.Future) -> None:
+        if not future.cancelled():
+            return
+        self._stats["cancelled"] += 1
+        if op.on_cancel:
+            task = asyncio.ensure_future(op.on_cancel())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._heap or self._in_flight:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            when, _, op = self._heap[0]
+            now = loop.time()
+            if when > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), when - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            if op.future.done():
+                continue                            # cancelled by its waiter
+            if now >= op.deadline:
+                self._stats["timed_out"] += 1
+                op.future.set_exception(OperationTimeout(f"{op.name} did not finish before its deadline"))
+                continue
+            task = loop.create_task(self._poll(op))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _poll(self, op: _Operation) -> None:
+        try:
+            async with self._checks:
+                if op.future.done():
+                    return
+                self._stats["checks"] += 1
+                try:
+                    done, result = await op.check()
+                    op.errors = 0
+                except OperationFailed as exc:
+                    self._stats["failed"] += 1
+                    if not op.future.done():
+                        op.future.set_exception(exc)
+                    return
+                except Exception as exc:
+                    op.errors += 1
+                    logging.warning(f"Poll of {op.name} failed ({op.errors}/{op.max_errors}): {exc}")
+                    if op.errors >= op.max_errors and not op.future.done():
+                        self._stats["failed"] += 1
+                        op.future.set_exception(exc)
+                        return
+                    done, result = False, None
+            if op.future.done():
+                return
+            if done:
+                self._stats["completed"] += 1
+                op.future.set_result(result)
+                return
+            loop = asyncio.get_running_loop()
+            self._schedule(op, loop.time() + op.interval)
+            op.interval = min(op.interval * op.backoff, op.max_interval)
+        finally:
+            self._in_flight.discard(asyncio.current_task())
+            self._wakeup.set()
+
+
+_poller: Optional[OperationPoller] = None
+_poller_loop = None
+
+
+def get_poller() -> OperationPoller:
+    """The process-wide poller for the running event loop."""
+    global _poller, _poller_loop
+    loop = asyncio.get_running_loop()
+    if _poller is None or _poller_loop is not loop:
+        _poller, _poller_loop = OperationPoller(), loop
+    return _poller
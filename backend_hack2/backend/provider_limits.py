@@ -0,0 +1,284 @@
+"""Per-provider concurrency limits and token-bucket rate limiting.
+
+Every outbound AI call (CodeRabbit, Together, Groq, Veo, Pika) first waits
+for capacity here instead of finding out about the quota from a 429:
+
+* an **in-flight cap** – a Redis sorted set of leased slots, shared by all
+  workers (entries expire, so a crashed holder cannot leak a slot);
+* a **requests-per-minute token bucket** – kept in a Redis hash and updated
+  atomically by a Lua script using the Redis clock.
+
+Limits come from ``PROVIDER_LIMITS``, e.g.
+``"veo=2:10,pika=2:10:2"`` → ``provider=max_in_flight:rpm[:burst]``.
+If Redis is unreachable the limiter degrades to per-process limits.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Dict, Optional
+
+import telemetry
+from database import redis_client
+
+DEFAULT_PROVIDER_LIMITS = "coderabbit=4:60,together=8:120,groq=8:30,veo=2:10,pika=2:10"
+PROVIDER_WAIT_TIMEOUT = float(os.getenv("PROVIDER_WAIT_TIMEOUT", "600"))
+# How long a slot survives without being released (must cover the slowest call).
+PROVIDER_SLOT_TTL = int(os.getenv("PROVIDER_SLOT_TTL", "1800"))
+# After a Redis error, use local limits for this long before trying Redis again.
+PROVIDER_REDIS_RETRY = 30.0
+
+_SLOT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]) + 60)
+  return 1
+end
+return 0
+"""
+
+_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class ProviderLimiter:
+    """In-flight cap plus RPM token bucket for one provider."""
+
+    def __init__(self, name: str, max_in_flight: int, rpm: float,
+                 burst: Optional[int] = None, use_redis: bool = True):
+        self.name = name
+        self.max_in_flight = max(int(max_in_flight), 1)
+        self.rate = max(float(rpm), 0.001) / 60.0          # tokens per second
+        self.burst = max(int(burst or self.max_in_flight), 1)
+        self.use_redis = use_redis
+        self._redis_down_until = 0.0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.in_flight = 0
+        # per-process fallback state
+        self._local_slots = asyncio.Semaphore(self.max_in_flight)
+        self._local_tokens = float(self.burst)
+        self._local_ts = time.monotonic()
+        self._local_lock = asyncio.Lock()
+
+    # ---------- Redis-coordinated ----------
+    async def _redis_slot(self, token: str) -> bool:
+        return bool(await _slot_script(
+            keys=[f"ratelimit:{self.name}:slots"],
+            args=[self.max_in_flight, token, PROVIDER_SLOT_TTL],
+        ))
+
+    async def _redis_token_wait(self) -> float:
+        return float(await _bucket_script(
+            keys=[f"ratelimit:{self.name}:bucket"],
+            args=[self.burst, self.rate],
+        ))
+
+    # ---------- per-process fallback ----------
+    async def _local_token_wait(self) -> float:
+        async with self._local_lock:
+            now = time.monotonic()
+            self._local_tokens = min(self.burst, self._local_tokens + (now - self._local_ts) * self.rate)
+            self._local_ts = now
+            if self._local_tokens >= 1:
+                self._local_tokens -= 1
+                return 0.0
+            wait = (1 - self._local_tokens) / self.rate
+            # reserve the token we are about to wait for
+            self._local_tokens -= 1
+            return wait
+
+    @property
+    def _redis_ok(self) -> bool:
+        return self.use_redis and time.monotonic() >= self._redis_down_until
+
+    def _fallback(self, exc: Exception) -> None:
+        logging.warning(f"Provider limiter for {self.name} falling back to local limits: {exc}")
+        self._redis_down_until = time.monotonic() + PROVIDER_REDIS_RETRY
+
+    async def _acquire_slot(self, deadline: float) -> Optional[str]:
+        """Take an in-flight slot: a Redis slot token, or None for a local slot."""
+        token = uuid.uuid4().hex
+        delay = 0.05
+        while self._redis_ok:
+            try:
+                if await self._redis_slot(token):
+                    return token
+            except Exception as exc:
+                self._fallback(exc)
+                break
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"Timed out waiting for {self.name} capacity")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        try:
+            await asyncio.wait_for(self._local_slots.acquire(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Timed out waiting for {self.name} capacity")
+        return None
+
+    async def _acquire_rate(self, deadline: float) -> None:
+        """Take one token from the RPM bucket, sleeping until one is available."""
+        while True:
+            local = not self._redis_ok
+            if local:
+                wait = await self._local_token_wait()
+            else:
+                try:
+                    wait = await self._redis_token_wait()
+                except Exception as exc:
+                    self._fallback(exc)
+                    continue
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RuntimeError(f"Timed out waiting for {self.name} rate limit")
+            await asyncio.sleep(wait)
+            if local:
+                return                  # the local bucket already reserved our token
+
+    async def acquire(self, timeout: float = PROVIDER_WAIT_TIMEOUT) -> Optional[str]:
+        """Queue for an in-flight slot and a rate token; returns the slot token."""
+        started = time.monotonic()
+        deadline = started + timeout
+        try:
+            token = await self._acquire_slot(deadline)
+            try:
+                await self._acquire_rate(deadline)
+            except BaseException:
+                self.release(token)
+                raise
+        finally:
+            self._record_wait(time.monotonic() - started)
+        self.in_flight += 1
+        return token
+
+    async def _release_redis(self, token: str) -> None:
+        try:
+            await redis_client.zrem(f"ratelimit:{self.name}:slots", token)
+        except Exception as exc:
+            logging.warning(f"Provider limiter release failed for {self.name}: {exc}")
+
+    def release(self, token: Optional[str]) -> None:
+        if token:
+            task = asyncio.ensure_future(self._release_redis(token))
+            _pending_releases.add(task)
+            task.add_done_callback(_pending_releases.discard)
+        else:
+            self._local_slots.release()
+
+    def _record_wait(self, seconds: float) -> None:
+        self.waits += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+        for observer in _wait_observers:
+            observer(self.name, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "rpm": round(self.rate * 60, 3),
+            "burst": self.burst,
+            "in_flight": self.in_flight,
+            "acquired": self.waits,
+            "avg_wait_seconds": round(self.total_wait / self.waits, 4) if self.waits else 0.0,
+            "max_wait_seconds": round(self.max_wait, 4),
+            "backend": "redis" if self._redis_ok else "local",
+        }
+
+
+class _Slot:
+    """``async with limit("veo"):`` – holds one unit of provider capacity."""
+
+    def __init__(self, limiter: ProviderLimiter):
+        self.limiter = limiter
+        self.token = None
+        self.started = 0.0
+
+    async def __aenter__(self):
+        self.token = await self.limiter.acquire()
+        self.started = time.perf_counter()
+        return self.limiter
+
+    async def __aexit__(self, exc_type, exc, tb):
+        telemetry.provider_calls.observe(
+            time.perf_counter() - self.started,
+            provider=self.limiter.name,
+            outcome="error" if exc_type else "ok",
+        )
+        self.limiter.in_flight -= 1
+        self.limiter.release(self.token)
+
+
+def parse_limits(spec: str) -> Dict[str, tuple]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        parts = [p for p in values.split(":") if p]
+        max_in_flight = int(parts[0]) if parts else 1
+        rpm = float(parts[1]) if len(parts) > 1 else 60.0
+        burst = int(parts[2]) if len(parts) > 2 else None
+        limits[name.strip()] = (max_in_flight, rpm, burst)
+    return limits
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+_pending_releases: set = set()
+_wait_observers: list = []
+_slot_script = redis_client.register_script(_SLOT_SCRIPT)
+_bucket_script = redis_client.register_script(_BUCKET_SCRIPT)
+
+
+def _configure() -> None:
+    limits = parse_limits(DEFAULT_PROVIDER_LIMITS)
+    limits.update(parse_limits(os.getenv("PROVIDER_LIMITS", "")))
+    for name, (max_in_flight, rpm, burst) in limits.items():
+        _limiters[name] = ProviderLimiter(name, max_in_flight, rpm, burst)
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    if provider not in _limiters:
+        _limiters[provider] = ProviderLimiter(provider, 1, 60)
+    return _limiters[provider]
+
+
+def limit(provider: str) -> _Slot:
+    """Context manager that holds one unit of ``provider`` capacity."""
+    return _Slot(get_limiter(provider))
+
+
+def add_wait_observer(observer) -> None:
+    """Register ``observer(provider, seconds)`` to receive every queue-wait sample."""
+    _wait_observers.append(observer)
+
+
+def stats() -> dict:
+    """Per-provider limits, in-flight counts and queue-wait figures for this worker."""
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+_configure()
+add_wait_observer(lambda provider, seconds: telemetry.provider_wait.observe(seconds, provider=provider))
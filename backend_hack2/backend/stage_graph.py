@@ -0,0 +1,95 @@
+"""Tiny dependency-graph runner for pipeline stages.
+
+Each :class:`Stage` names the stages it depends on; every stage starts as
+soon as its dependencies are done, so independent branches run
+concurrently and total latency tracks the critical path rather than the
+sum of all stages.  A failing *optional* stage yields ``None`` for its
+dependents instead of failing the pipeline; a failing required stage
+cancels everything still running and re-raises.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Tuple
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]   # receives results of its deps
+    deps: Tuple[str, ...] = ()
+    optional: bool = False
+
+
+class StageFailed(RuntimeError):
+    """A required stage raised; ``stage`` names it and ``__cause__`` holds the error."""
+
+    def __init__(self, stage: str, exc: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {exc}")
+        self.stage = stage
+
+
+async def run_stages(stages: Iterable[Stage], timings: Dict[str, dict]) -> Dict[str, Any]:
+    """Run ``stages`` respecting dependencies; fill ``timings`` per stage.
+
+    ``timings[name]`` gets ``start``/``end`` offsets (seconds since the
+    pipeline started), ``duration`` and ``status`` (ok / failed / cancelled).
+
+    Returns:
+        dict: stage name → result (``None`` for failed optional stages).
+    """
+    stages = {stage.name: stage for stage in stages}
+    for stage in stages.values():
+        missing = [dep for dep in stage.deps if dep not in stages]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {missing}")
+
+    origin = time.monotonic()
+    tasks: Dict[str, asyncio.Task] = {}
+    results: Dict[str, Any] = {}
+
+    async def _run(stage: Stage) -> Any:
+        dep_results = {}
+        for dep in stage.deps:
+            dep_results[dep] = await tasks[dep]
+        start = time.monotonic()
+        timings[stage.name] = {"start": round(start - origin, 3), "status": "running"}
+        try:
+            value = await stage.run(dep_results)
+            status = "ok"
+        except asyncio.CancelledError:
+            timings[stage.name]["status"] = "cancelled"
+            raise
+        except Exception as exc:
+            if not stage.optional:
+                timings[stage.name].update(_finish(origin, start, "failed"))
+                raise StageFailed(stage.name, exc) from exc
+            logging.warning(f"Optional stage '{stage.name}' failed: {exc}")
+            value, status = None, "failed"
+        timings[stage.name].update(_finish(origin, start, status))
+        results[stage.name] = value
+        return value
+
+    # Create tasks in dependency order so every dep task exists before use.
+    pending = dict(stages)
+    while pending:
+        ready = [s for s in pending.values() if all(d in tasks for d in s.deps)]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+        for stage in ready:
+            tasks[stage.name] = asyncio.ensure_future(_run(stage))
+            del pending[stage.name]
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return results
+
+
+def _finish(origin: float, start: float, status: str) -> dict:
+    end = time.monotonic()
+    return {"end": round(end - origin, 3), "duration": round(end - start, 3), "status": status}
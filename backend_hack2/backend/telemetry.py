@@ -0,0 +1,231 @@
+"""In-process metrics with Prometheus text exposition.
+
+A deliberately small registry (counters, gauges, histograms with labels)
+so the API and the worker can be scraped without an extra dependency.
+Recording a sample is a dict update.  ``render()`` produces the
+``text/plain; version=0.0.4`` format that Prometheus expects.
+
+Business totals (runs, users, artefacts, jobs) come from MongoDB.  They are
+refreshed by :func:`refresh_business_totals` on an interval and served from
+a snapshot, so a scrape never touches the database.
+"""
+
+import asyncio
+import bisect
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+METRICS_REFRESH_INTERVAL = float(os.getenv("METRICS_REFRESH_INTERVAL", "60"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PROVIDER_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.values: Dict[Tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def lines(self) -> list:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in self.values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def lines(self) -> list:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in self.values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self.values.get(key)
+        if state is None:
+            state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def lines(self) -> list:
+        out = []
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(round(total, 6))}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return out
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        body = metric.lines()
+        if body:
+            lines.extend(metric.header())
+            lines.extend(body)
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------------------------------------------------
+# Shared metrics
+# ----------------------------------------------------------------------
+http_requests = Counter(
+    "autopilot_http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_latency = Histogram(
+    "autopilot_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+http_in_progress = Gauge(
+    "autopilot_http_requests_in_progress", "HTTP requests currently being handled")
+provider_calls = Histogram(
+    "autopilot_provider_call_duration_seconds", "Outbound AI provider call duration",
+    ("provider", "outcome"), buckets=PROVIDER_BUCKETS)
+provider_wait = Histogram(
+    "autopilot_provider_queue_wait_seconds", "Time spent waiting for provider capacity",
+    ("provider",), buckets=LATENCY_BUCKETS + (30, 60, 300))
+jobs_in_flight = Gauge(
+    "autopilot_jobs_in_flight", "Background jobs running in this worker", ("type",))
+jobs_finished = Counter(
+    "autopilot_jobs_finished_total", "Background job attempts by outcome", ("type", "outcome"))
+business = Gauge(
+    "autopilot_business_total", "Business totals (refreshed every METRICS_REFRESH_INTERVAL)", ("kind",))
+jobs_by_status = Gauge(
+    "autopilot_jobs", "Jobs in the queue by type and status", ("type", "status"))
+
+
+# ----------------------------------------------------------------------
+# Cached business totals
+# ----------------------------------------------------------------------
+_business_snapshot: dict = {}
+
+
+async def refresh_business_totals(db) -> dict:
+    """Recompute totals from MongoDB (cheap metadata counts + one aggregation)."""
+    since = (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%S")
+    runs, users, artefacts, recent, jobs = await asyncio.gather(
+        db["runs"].estimated_document_count(),
+        db["users"].estimated_document_count(),
+        db["artefacts"].estimated_document_count(),
+        # run timestamps are Kestra's ISO-8601 start dates (strings)
+        db["runs"].count_documents({"timestamp": {"$gte": since}}),
+        db["jobs"].aggregate([
+            {"$match": {"status": {"$in": ["queued", "running", "dead"]}}},
+            {"$group": {"_id": {"type": "$type", "status": "$status"}, "n": {"$sum": 1}}},
+        ]).to_list(None),
+    )
+    snapshot = {
+        "total_runs": runs,
+        "total_users": users,
+        "total_artefacts": artefacts,
+        "recent_runs_24h": recent,
+        "jobs": {f"{j['_id']['type']}:{j['_id']['status']}": j["n"] for j in jobs},
+        "refreshed_at": datetime.utcnow().isoformat(),
+    }
+    for kind in ("total_runs", "total_users", "total_artefacts", "recent_runs_24h"):
+        business.set(snapshot[kind], kind=kind)
+    jobs_by_status.values.clear()
+    for j in jobs:
+        jobs_by_status.set(j["n"], type=j["_id"]["type"], status=j["_id"]["status"])
+    _business_snapshot.clear()
+    _business_snapshot.update(snapshot)
+    return snapshot
+
+
+def business_totals() -> dict:
+    return dict(_business_snapshot)
+
+
+async def business_refresher(db, interval: float = METRICS_REFRESH_INTERVAL) -> None:
+    """Background task: keep the business snapshot fresh."""
+    while True:
+        try:
+            await refresh_business_totals(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logging.warning(f"Business metrics refresh failed: {exc}")
+        await asyncio.sleep(interval)
+
+
+# ----------------------------------------------------------------------
+# Worker exposition
+# ----------------------------------------------------------------------
+async def serve(port: int, host: str = "0.0.0.0"):
+    """Minimal HTTP endpoint that answers every request with ``render()``."""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            body = render().encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: " + CONTENT_TYPE.encode()
+                + b"\r\nContent-Length: " + str(len(body)).encode()
+                + b"\r\nConnection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
@@ -60,3 +60,70 @@ def mock_genai():
         mock_client.models.generate_videos.return_value = mock_operation
         mock_genai.Client.return_value = mock_client
         yield mock_genai
+
+
+class _AsyncCursor:
+    """Motor-style cursor over a mongomock cursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, n):
+        self._cursor = self._cursor.limit(n)
+        return self
+
+    def skip(self, n):
+        self._cursor = self._cursor.skip(n)
+        return self
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._cursor:
+            yield doc
+
+
+class _AsyncCollection:
+    """Motor-style awaitable facade over a mongomock collection."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self._collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        return _AsyncCursor(self._collection.aggregate(pipeline, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def _call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return _call
+
+
+class _AsyncDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._database[name])
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+@pytest.fixture
+def async_mongo():
+    """In-memory Motor-like database backed by mongomock."""
+    return _AsyncDatabase(mongomock.MongoClient().test_db)
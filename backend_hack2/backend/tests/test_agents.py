@@ -0,0 +1,225 @@
+import asyncio
+import time
+import pytest
+import httpx
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import agents
+from main import app
+
+
+def _fake_db():
+    """Minimal Motor-like DB: every collection accepts awaited writes."""
+    async def insert_one(doc):
+        doc.setdefault("_id", "oid")
+        return MagicMock(inserted_id=doc["_id"])
+
+    database = MagicMock()
+    database.__getitem__.return_value.insert_one = AsyncMock(side_effect=insert_one)
+    return database
+
+
+class TestNonBlockingPipeline:
+    @pytest.mark.asyncio
+    async def test_run_blocking_uses_executor(self):
+        """Blocking SDK calls run off the event-loop thread."""
+        import threading
+        loop_thread = threading.get_ident()
+        worker_thread = await agents.run_blocking(threading.get_ident)
+        assert worker_thread != loop_thread
+
+    @pytest.mark.asyncio
+    async def test_async_retry_backs_off_without_blocking(self):
+        """Async functions are retried with asyncio.sleep."""
+        calls = []
+
+        @agents.retry_on_failure(max_retries=3, backoff_factor=0.0, exceptions=(ValueError,))
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise ValueError("boom")
+            return "ok"
+
+        with patch("agents.random.uniform", return_value=0.0):
+            assert await flaky() == "ok"
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_health_answers_while_slow_provider_runs(self, monkeypatch):
+        """/health stays responsive while a slow (blocking) Veo job is in flight."""
+        monkeypatch.setenv("CODERABBIT_API_KEY", "cr")
+        monkeypatch.setenv("GROQ_API_KEY", "groq")
+        monkeypatch.setenv("GOOGLE_API_KEY", "google")
+        monkeypatch.delenv("TOGETHER_API_KEY", raising=False)
+
+        # Blocking SDK calls: a slow submit, then a few slow status refreshes
+        def slow_submit(**kwargs):
+            time.sleep(0.5)
+            return MagicMock(done=False)
+
+        refreshes = []
+
+        def slow_refresh(operation):
+            time.sleep(0.2)
+            refreshes.append(1)
+            done = len(refreshes) >= 3
+            return MagicMock(done=done, result=MagicMock(
+                generated_videos=[MagicMock(video=MagicMock(blob=b"mp4"))]))
+
+        veo_client = MagicMock()
+        veo_client.models.generate_videos.side_effect = slow_submit
+        veo_client.operations.get.side_effect = slow_refresh
+
+        with patch("agents.get_cached_coderabbit_insights", AsyncMock(return_value={"issues": []})), \
+             patch("agents.build_video_prompt", AsyncMock(return_value="prompt")), \
+             patch("agents.ChatGroq", MagicMock()), \
+             patch("agents._veo_client", return_value=veo_client), \
+             patch("agents.types", MagicMock()), \
+             patch("agents.VEO_POLL_INTERVAL", 0.1), \
+             patch("agents.upload_video", AsyncMock(return_value={"video_file_id": "fid"})), \
+             patch("main.ping_db", AsyncMock()):
+            job = asyncio.create_task(agents.process_kestra_completion(
+                repo_url="https://github.com/test/repo",
+                execution_id="exec_1",
+                user_email="test@example.com",
+                db=_fake_db(),
+            ))
+            await asyncio.sleep(0.05)
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                latencies = []
+                while not job.done():
+                    started = time.perf_counter()
+                    response = await client.get("/health")
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200
+                    await asyncio.sleep(0.1)
+
+            result = await job
+
+        assert result["artefact_id"]
+        assert len(latencies) >= 5
+        assert max(latencies) < 0.5
+
+
+class TestStageGraph:
+    @pytest.mark.asyncio
+    async def test_report_runs_beside_video_and_may_fail(self, monkeypatch):
+        """The Together report overlaps video generation; its failure is non-fatal."""
+        monkeypatch.setenv("CODERABBIT_API_KEY", "cr")
+        monkeypatch.setenv("GROQ_API_KEY", "groq")
+        monkeypatch.setenv("TOGETHER_API_KEY", "together")
+        monkeypatch.setenv("PIKA_API_KEY", "pika")
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        monkeypatch.delenv("GOOGLE_GENAI_KEY", raising=False)
+
+        async def slow_report(insights, key):
+            await asyncio.sleep(0.2)
+            raise RuntimeError("together down")
+
+        async def slow_video(prompt, key):
+            await asyncio.sleep(0.2)
+            return b"mp4"
+
+        db = _fake_db()
+        with patch("agents.get_cached_coderabbit_insights", AsyncMock(return_value={"issues": []})), \
+             patch("agents.generate_together_report", side_effect=slow_report), \
+             patch("agents.build_video_prompt", AsyncMock(return_value="prompt")), \
+             patch("agents.ChatGroq", MagicMock()), \
+             patch("agents.create_pika_video", side_effect=slow_video), \
+             patch("agents.upload_video", AsyncMock(return_value={"video_file_id": "fid"})):
+            started = time.perf_counter()
+            result = await agents.process_kestra_completion(
+                repo_url="https://github.com/test/repo",
+                execution_id="exec_2",
+                user_email="test@example.com",
+                db=db,
+            )
+            elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.35
+        artefact = db["artefacts"].insert_one.call_args.args[0]
+        assert artefact["report"] == "Report generation failed."
+        assert artefact["video_file_id"] == "fid"
+        timings = result["stage_timings"]
+        assert timings["report"]["status"] == "failed"
+        assert timings["upload"]["status"] == "ok"
+        assert timings["report"]["start"] < timings["video"]["end"]
+
+
+class TestVideoHedge:
+    @staticmethod
+    def _provider(seconds, value=None, error=None, cancelled=None):
+        async def run(prompt, key):
+            try:
+                await asyncio.sleep(seconds)
+            except asyncio.CancelledError:
+                if cancelled is not None:
+                    cancelled.append(True)
+                raise
+            if error:
+                raise error
+            return value
+        return run
+
+    @pytest.mark.asyncio
+    async def test_hedge_fires_and_pika_wins(self):
+        cancelled = []
+        before = dict(agents._video_counts)
+        with patch("agents.create_google_veo_video", side_effect=self._provider(5, b"veo", cancelled=cancelled)), \
+             patch("agents.create_pika_video", side_effect=self._provider(0.05, b"pika")):
+            video, provider = await agents.generate_video("p", "g", "k", hedge=True, hedge_after=0.05)
+            await asyncio.sleep(0)
+
+        assert (video, provider) == (b"pika", "pika")
+        assert cancelled == [True]
+        assert agents._video_counts["hedges_fired"] == before["hedges_fired"] + 1
+        assert agents._video_counts["hedges_won_by_pika"] == before["hedges_won_by_pika"] + 1
+
+    @pytest.mark.asyncio
+    async def test_pika_after_veo_fails_mid_hedge_is_a_fallback(self):
+        before = dict(agents._video_counts)
+        with patch("agents.create_google_veo_video", side_effect=self._provider(0.08, error=RuntimeError("quota"))), \
+             patch("agents.create_pika_video", side_effect=self._provider(0.15, b"pika")):
+            video, provider = await agents.generate_video("p", "g", "k", hedge=True, hedge_after=0.05)
+
+        assert (video, provider) == (b"pika", "pika")
+        assert agents._video_counts["hedges_fired"] == before["hedges_fired"] + 1
+        assert agents._video_counts["fallbacks"] == before["fallbacks"] + 1
+        assert agents._video_counts["hedges_won_by_pika"] == before["hedges_won_by_pika"]
+
+    @pytest.mark.asyncio
+    async def test_fast_veo_never_hedges(self):
+        pika = AsyncMock()
+        before = dict(agents._video_counts)
+        with patch("agents.create_google_veo_video", side_effect=self._provider(0.01, b"veo")), \
+             patch("agents.create_pika_video", pika):
+            assert await agents.generate_video("p", "g", "k", hedge=True, hedge_after=1) == (b"veo", "veo")
+
+        pika.assert_not_called()
+        assert agents._video_counts["hedges_fired"] == before["hedges_fired"]
+
+    @pytest.mark.asyncio
+    async def test_hedge_survives_pika_failure(self):
+        with patch("agents.create_google_veo_video", side_effect=self._provider(0.15, b"veo")), \
+             patch("agents.create_pika_video", side_effect=self._provider(0.01, error=RuntimeError("pika"))):
+            assert await agents.generate_video("p", "g", "k", hedge=True, hedge_after=0.05) == (b"veo", "veo")
+
+    @pytest.mark.asyncio
+    async def test_without_hedge_pika_waits_for_veo_failure(self):
+        order = []
+
+        async def veo(prompt, key):
+            await asyncio.sleep(0.1)
+            order.append("veo")
+            raise RuntimeError("quota")
+
+        async def pika(prompt, key):
+            order.append("pika")
+            return b"pika"
+
+        with patch("agents.create_google_veo_video", side_effect=veo), \
+             patch("agents.create_pika_video", side_effect=pika):
+            assert await agents.generate_video("p", "g", "k", hedge=False, hedge_after=0.01) == (b"pika", "pika")
+        assert order == ["veo", "pika"]
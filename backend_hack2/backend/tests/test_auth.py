@@ -0,0 +1,80 @@
+import time
+import pytest
+import jwt
+from unittest.mock import patch, MagicMock
+
+import auth
+from exceptions import AuthenticationError
+
+
+def _request(token):
+    request = MagicMock()
+    request.headers = {"Authorization": f"Bearer {token}"} if token else {}
+    return request
+
+
+@pytest.fixture
+def users(async_mongo, monkeypatch):
+    """Users collection plus an in-memory stand-in for the Redis cache."""
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    async_mongo._database["users"].insert_one({"email": "dev@example.com", "github_token": "gh-1"})
+    redis = {}
+
+    async def cache_get(key):
+        return redis.get(key)
+
+    async def cache_set(key, value, ttl=3600):
+        redis[key] = value
+
+    async def cache_delete(key):
+        redis.pop(key, None)
+
+    auth._users.clear()
+    with patch("auth.get_user_collection", return_value=async_mongo["users"]), \
+         patch("auth.cache_get", cache_get), patch("auth.cache_set", cache_set), \
+         patch("auth.cache_delete", cache_delete):
+        yield async_mongo, redis
+    auth._users.clear()
+
+
+def _token(sub="dev@example.com", exp=60):
+    return jwt.encode({"sub": sub, "exp": time.time() + exp}, "your-secret-key", algorithm="HS256")
+
+
+class TestAuthFastPath:
+    @pytest.mark.asyncio
+    async def test_repeat_requests_skip_the_database(self, users):
+        before = auth.stats()["db_lookups"]
+        for _ in range(3):
+            user = await auth.current_user(_request(_token()))
+        assert user["github_token"] == "gh-1"
+        assert auth.stats()["db_lookups"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_redis_copy_is_encrypted_and_used(self, users):
+        _, redis = users
+        await auth.get_user("dev@example.com")
+        assert "gh-1" not in redis["user:dev@example.com"]["v"]
+
+        auth._users.clear()                        # e.g. another worker
+        before = auth.stats()
+        assert (await auth.get_user("dev@example.com"))["github_token"] == "gh-1"
+        assert auth.stats()["redis_hits"] == before["redis_hits"] + 1
+        assert auth.stats()["db_lookups"] == before["db_lookups"]
+
+    @pytest.mark.asyncio
+    async def test_invalidate_picks_up_new_token(self, users):
+        mongo, redis = users
+        await auth.get_user("dev@example.com")
+        mongo._database["users"].update_one({"email": "dev@example.com"}, {"$set": {"github_token": "gh-2"}})
+
+        await auth.invalidate_user("dev@example.com")
+
+        assert redis == {}
+        assert (await auth.get_user("dev@example.com"))["github_token"] == "gh-2"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("token", [None, "garbage", _token(exp=-10), _token(sub="ghost@example.com")])
+    async def test_rejects_bad_credentials(self, users, token):
+        with pytest.raises(AuthenticationError):
+            await auth.current_user(_request(token))
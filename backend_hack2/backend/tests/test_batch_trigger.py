@@ -0,0 +1,88 @@
+import asyncio
+import time
+import pytest
+import httpx
+import jwt
+from unittest.mock import patch
+from fastapi import HTTPException
+
+import auth
+from main import app
+
+
+def _token(email="lead@example.com"):
+    return jwt.encode({"sub": email, "exp": time.time() + 60}, "your-secret-key", algorithm="HS256")
+
+
+@pytest.fixture
+def batch_env(async_mongo, monkeypatch):
+    monkeypatch.setenv("CODERABBIT_TOKEN", "cr")
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    async_mongo._database["users"].insert_one({"email": "lead@example.com", "github_token": "gh"})
+    auth._users.clear()
+    with patch("main.db", async_mongo), \
+         patch("auth.get_user_collection", return_value=async_mongo["users"]):
+        yield async_mongo
+    auth._users.clear()
+
+
+async def _post(body, token=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/trigger/batch", json=body,
+                                 headers={"Authorization": f"Bearer {token or _token()}"})
+
+
+class TestBatchTrigger:
+    @pytest.mark.asyncio
+    async def test_partial_failures_are_reported_per_item(self, batch_env):
+        active, peak = 0, 0
+
+        async def fake_trigger(repo_url, branch, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if repo_url.endswith("/broken"):
+                raise HTTPException(503, "Cannot reach Kestra")
+            return {"id": f"exec-{repo_url.rsplit('/', 1)[-1]}", "state": {"startDate": "2024-01-01T00:00:00Z"}}
+
+        items = [{"repo_url": f"https://github.com/org/r{i}"} for i in range(6)]
+        items += [
+            {"repo_url": "https://gitlab.com/org/x"},
+            {"repo_url": "https://github.com/org/r0"},
+            {"repo_url": "https://github.com/org/broken"},
+            {"repo_url": "https://github.com/org/r9", "branch": "bad branch!"},
+        ]
+        with patch("main.trigger_workflow", side_effect=fake_trigger), \
+             patch("main.BATCH_TRIGGER_CONCURRENCY", 3):
+            response = await _post({"user_email": "lead@example.com", "items": items})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["total"], body["launched"], body["failed"]) == (10, 6, 4)
+        results = body["results"]
+        assert results[0]["execution_id"] == "exec-r0"
+        assert "GitHub" in results[6]["error"]
+        assert "Duplicate" in results[7]["error"]
+        assert "Kestra" in results[8]["error"]
+        assert results[9]["success"] is False
+        assert peak <= 3
+        assert batch_env["runs"]._collection.count_documents({}) == 6
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_and_oversized_batch(self, batch_env):
+        response = await _post({"user_email": "ghost@example.com",
+                                "items": [{"repo_url": "https://github.com/org/a"}]})
+        assert response.status_code == 404
+
+        with patch("main.BATCH_TRIGGER_MAX_ITEMS", 1):
+            response = await _post({"user_email": "lead@example.com",
+                                    "items": [{"repo_url": "https://github.com/org/a"}] * 2})
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_requires_valid_token(self, batch_env):
+        response = await _post({"user_email": "lead@example.com", "items": []}, token="garbage")
+        assert response.status_code == 401
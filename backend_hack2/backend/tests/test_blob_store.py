@@ -0,0 +1,100 @@
+import pytest
+from unittest.mock import patch
+
+import blob_store
+
+
+class _FakeGridIn:
+    def __init__(self, store, filename, metadata=None):
+        self.store, self.filename, self.metadata = store, filename, metadata
+        self._id = f"file_{len(store) + 1}"
+        self.writes = []
+        self.aborted = False
+
+    async def write(self, chunk):
+        self.writes.append(chunk)
+
+    async def abort(self):
+        self.aborted = True
+
+    async def close(self):
+        self.store[self._id] = b"".join(self.writes)
+
+    @property
+    def length(self):
+        return len(self.store[self._id])
+
+
+class _FakeGridOut:
+    def __init__(self, data):
+        self.data, self.pos, self.length = data, 0, len(data)
+
+    def seek(self, pos):
+        self.pos = pos
+
+    async def read(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+
+class _FakeBucket:
+    def __init__(self):
+        self.store = {}
+        self.uploads = []
+
+    def open_upload_stream(self, filename, metadata=None):
+        grid_in = _FakeGridIn(self.store, filename, metadata)
+        self.uploads.append(grid_in)
+        return grid_in
+
+    async def open_download_stream(self, file_id):
+        return _FakeGridOut(self.store[file_id])
+
+
+@pytest.fixture
+def bucket():
+    fake = _FakeBucket()
+    with patch("blob_store.get_video_bucket", return_value=fake):
+        yield fake
+
+
+class TestBlobStore:
+    @pytest.mark.asyncio
+    async def test_upload_bytes_in_chunks(self, bucket):
+        """Raw bytes are written in VIDEO_CHUNK_SIZE pieces."""
+        data = b"x" * 25
+        with patch("blob_store.VIDEO_CHUNK_SIZE", 10):
+            meta = await blob_store.upload_video(None, data, filename="a.mp4")
+        assert [len(c) for c in bucket.uploads[0].writes] == [10, 10, 5]
+        assert meta["video_length"] == 25
+        assert meta["content_type"] == "video/mp4"
+
+    @pytest.mark.asyncio
+    async def test_upload_async_stream(self, bucket):
+        """Async chunk streams are written as they arrive."""
+        async def chunks():
+            yield b"ab"
+            yield b""
+            yield b"cd"
+
+        meta = await blob_store.upload_video(None, chunks(), filename="a.mp4")
+        assert bucket.store[meta["video_file_id"]] == b"abcd"
+
+    @pytest.mark.asyncio
+    async def test_failed_upload_is_aborted(self, bucket):
+        async def broken():
+            yield b"ab"
+            raise RuntimeError("provider dropped")
+
+        with pytest.raises(RuntimeError):
+            await blob_store.upload_video(None, broken(), filename="a.mp4")
+        assert bucket.uploads[0].aborted
+
+    @pytest.mark.asyncio
+    async def test_iter_video_range(self, bucket):
+        """Reads are bounded and honour start/end offsets."""
+        bucket.store["f"] = bytes(range(100))
+        chunks = [c async for c in blob_store.iter_video(None, "f", 10, 34, chunk_size=10)]
+        assert [len(c) for c in chunks] == [10, 10, 5]
+        assert b"".join(chunks) == bytes(range(10, 35))
@@ -0,0 +1,100 @@
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+
+from byte_ranges import parse_range_header, RangeNotSatisfiable
+from main import app
+
+VIDEO = bytes(range(256)) * 4          # 1024 bytes
+ETAG = '"abc123"'
+
+
+class TestParseRangeHeader:
+    def test_absent_or_foreign_unit(self):
+        assert parse_range_header(None, 100) is None
+        assert parse_range_header("items=0-1", 100) is None
+
+    def test_single_and_open_ended(self):
+        assert parse_range_header("bytes=0-9", 100) == [(0, 9)]
+        assert parse_range_header("bytes=90-", 100) == [(90, 99)]
+        assert parse_range_header("bytes=95-200", 100) == [(95, 99)]
+
+    def test_suffix(self):
+        assert parse_range_header("bytes=-10", 100) == [(90, 99)]
+        assert parse_range_header("bytes=-500", 100) == [(0, 99)]
+
+    def test_overlapping_ranges_are_merged(self):
+        assert parse_range_header("bytes=20-29, 0-9,5-14", 100) == [(0, 14), (20, 29)]
+
+    def test_malformed_is_ignored(self):
+        assert parse_range_header("bytes=abc", 100) is None
+        assert parse_range_header("bytes=9-0", 100) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=100-", 100)
+
+
+@pytest.fixture
+def video_client():
+    async def fake_iter(db, file_id, start=0, end=None):
+        end = len(VIDEO) - 1 if end is None else end
+        for offset in range(start, end + 1, 100):
+            yield VIDEO[offset:min(offset + 100, end + 1)]
+
+    fake_db = MagicMock()
+    fake_db.__getitem__.return_value.find_one = AsyncMock(return_value={
+        "video_file_id": "fid",
+        "video_length": len(VIDEO),
+        "video_etag": ETAG,
+        "content_type": "video/mp4",
+    })
+    with patch("main.db", fake_db), patch("main.iter_video", fake_iter):
+        yield TestClient(app)
+
+
+class TestVideoRanges:
+    def test_full_body_advertises_ranges(self, video_client):
+        response = video_client.get("/api/video/exec_1")
+        assert response.status_code == 200
+        assert response.content == VIDEO
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["etag"] == ETAG
+        assert response.headers["content-length"] == str(len(VIDEO))
+
+    def test_single_range(self, video_client):
+        response = video_client.get("/api/video/exec_1", headers={"Range": "bytes=100-349"})
+        assert response.status_code == 206
+        assert response.content == VIDEO[100:350]
+        assert response.headers["content-range"] == f"bytes 100-349/{len(VIDEO)}"
+
+    def test_multi_range(self, video_client):
+        response = video_client.get("/api/video/exec_1", headers={"Range": "bytes=0-9,500-509"})
+        assert response.status_code == 206
+        assert response.headers["content-type"].startswith("multipart/byteranges; boundary=")
+        assert int(response.headers["content-length"]) == len(response.content)
+        assert VIDEO[0:10] in response.content and VIDEO[500:510] in response.content
+        assert f"Content-Range: bytes 500-509/{len(VIDEO)}".encode() in response.content
+
+    def test_unsatisfiable_range(self, video_client):
+        response = video_client.get("/api/video/exec_1", headers={"Range": "bytes=5000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(VIDEO)}"
+
+    def test_if_range_mismatch_sends_full_body(self, video_client):
+        response = video_client.get(
+            "/api/video/exec_1", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}
+        )
+        assert response.status_code == 200
+        assert response.content == VIDEO
+
+    def test_if_range_match_honours_range(self, video_client):
+        response = video_client.get(
+            "/api/video/exec_1", headers={"Range": "bytes=0-9", "If-Range": ETAG}
+        )
+        assert response.status_code == 206
+        assert response.content == VIDEO[:10]
+
+    def test_if_none_match(self, video_client):
+        response = video_client.get("/api/video/exec_1", headers={"If-None-Match": ETAG})
+        assert response.status_code == 304
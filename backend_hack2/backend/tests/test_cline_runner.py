@@ -0,0 +1,168 @@
+import asyncio
+import sys
+
+import pytest
+
+import cline_runner
+
+
+def _script(code):
+    return [sys.executable, "-c", code]
+
+
+@pytest.fixture
+def runs(async_mongo, monkeypatch):
+    monkeypatch.setattr(cline_runner, "CLINE_FLUSH_INTERVAL", 0.05)
+    monkeypatch.setattr(cline_runner, "CLINE_KILL_GRACE", 1)
+    col = async_mongo["cline_executions"]
+    async_mongo._database["cline_executions"].insert_one(
+        {"execution_id": "c1", "repo_url": "https://github.com/o/r", "status": "pending"})
+    return col
+
+
+def _doc(async_mongo):
+    return async_mongo._database["cline_executions"].find_one({"execution_id": "c1"})
+
+
+class TestRunAgent:
+    @pytest.mark.asyncio
+    async def test_streams_lines_into_document(self, runs, async_mongo):
+        code = "import sys, time\nprint('one'); time.sleep(0.2)\nprint('two')\nprint('oops', file=sys.stderr)"
+        seen = []
+
+        async def watch():
+            while True:
+                doc = _doc(async_mongo)
+                seen.append(doc.get("log_seq", 0))
+                await asyncio.sleep(0.05)
+
+        watcher = asyncio.create_task(watch())
+        result = await cline_runner.run_agent(runs, "c1", {}, command=_script(code), cwd=".")
+        watcher.cancel()
+
+        assert result.status == "completed"
+        assert result.returncode == 0
+        assert result.stdout == "one\ntwo"
+        assert result.stderr == "oops"
+        doc = _doc(async_mongo)
+        assert doc["status"] == "running"       # the final status is the caller's to write
+        assert doc["log_seq"] == 3
+        assert {"stream": "stderr", "line": "oops"} in doc["log"]
+        # the first line was visible before the process exited
+        assert 1 in seen
+
+    @pytest.mark.asyncio
+    async def test_nonzero_exit_is_failed(self, runs):
+        result = await cline_runner.run_agent(
+            runs, "c1", {}, command=_script("import sys; print('bad', file=sys.stderr); sys.exit(3)"), cwd=".")
+
+        assert result.status == "failed"
+        assert result.returncode == 3
+        assert result.stderr == "bad"
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_process(self, runs):
+        started = asyncio.get_running_loop().time()
+        result = await cline_runner.run_agent(
+            runs, "c1", {}, command=_script("import time; print('start'); time.sleep(30)"), cwd=".", timeout=0.3)
+
+        assert result.status == "timeout"
+        assert result.returncode is not None
+        assert result.stdout == "start"
+        assert asyncio.get_running_loop().time() - started < 5
+
+    @pytest.mark.asyncio
+    async def test_cancel_requested_stops_run(self, runs, async_mongo):
+        async def cancel_soon():
+            await asyncio.sleep(0.2)
+            async_mongo._database["cline_executions"].update_one(
+                {"execution_id": "c1"}, {"$set": {"cancel_requested": True}})
+
+        asyncio.create_task(cancel_soon())
+        result = await cline_runner.run_agent(
+            runs, "c1", {}, command=_script("import time; time.sleep(30)"), cwd=".")
+
+        assert result.status == "cancelled"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_while_queued_never_starts(self, runs, async_mongo):
+        async_mongo._database["cline_executions"].update_one(
+            {"execution_id": "c1"}, {"$set": {"cancel_requested": True}})
+
+        result = await cline_runner.run_agent(runs, "c1", {}, command=["/nonexistent"], cwd=".")
+
+        assert result.status == "cancelled"
+        assert result.returncode is None
+
+    @pytest.mark.asyncio
+    async def test_task_cancellation_kills_process(self, runs, tmp_path):
+        marker = tmp_path / "alive"
+        code = f"import time\nfor _ in range(100):\n    time.sleep(0.05)\nopen({str(marker)!r}, 'w').write('x')"
+        task = asyncio.create_task(cline_runner.run_agent(runs, "c1", {}, command=_script(code), cwd="."))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        await asyncio.sleep(0.2)
+        assert not marker.exists()
+        assert cline_runner.stats()["running"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self, async_mongo, monkeypatch):
+        monkeypatch.setattr(cline_runner, "CLINE_MAX_CONCURRENCY", 1)
+        monkeypatch.setattr(cline_runner, "_semaphore", None)
+        monkeypatch.setattr(cline_runner, "CLINE_FLUSH_INTERVAL", 0.05)
+        raw = async_mongo._database["cline_executions"]
+        raw.insert_many([{"execution_id": f"c{i}", "status": "pending"} for i in range(2)])
+        code = "import time; print(time.time()); time.sleep(0.3); print(time.time())"
+
+        a, b = await asyncio.gather(*(
+            cline_runner.run_agent(async_mongo["cline_executions"], f"c{i}", {}, command=_script(code), cwd=".")
+            for i in range(2)
+        ))
+
+        spans = sorted((float(r.stdout.split()[0]), float(r.stdout.split()[1])) for r in (a, b))
+        assert spans[1][0] >= spans[0][1]           # the second run started after the first ended
+
+
+class TestClineEndpoints:
+    @pytest.fixture
+    def api_db(self, async_mongo):
+        from unittest.mock import patch
+
+        async_mongo._database["cline_executions"].insert_one({
+            "execution_id": "c1", "repo_url": "https://github.com/o/r", "status": "running",
+            # only the last three of five lines are kept
+            "log_seq": 5, "log": [{"stream": "stdout", "line": f"l{i}"} for i in (3, 4, 5)],
+        })
+        with patch("main.db", async_mongo):
+            yield async_mongo
+
+    async def _call(self, method, url):
+        import httpx
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url)
+
+    @pytest.mark.asyncio
+    async def test_status_returns_lines_after(self, api_db):
+        full = (await self._call("GET", "/api/cline/status/c1")).json()
+        tail = (await self._call("GET", "/api/cline/status/c1?after=4")).json()
+        done = (await self._call("GET", "/api/cline/status/c1?after=5")).json()
+
+        assert [l["line"] for l in full["lines"]] == ["l3", "l4", "l5"]
+        assert [l["line"] for l in tail["lines"]] == ["l5"]
+        assert done["lines"] == [] and done["log_seq"] == 5
+
+    @pytest.mark.asyncio
+    async def test_cancel(self, api_db):
+        response = await self._call("POST", "/api/cline/cancel/c1")
+        assert response.status_code == 200
+        assert api_db._database["cline_executions"].find_one({"execution_id": "c1"})["cancel_requested"]
+
+        api_db._database["cline_executions"].update_one({"execution_id": "c1"}, {"$set": {"status": "completed"}})
+        assert (await self._call("POST", "/api/cline/cancel/c1")).status_code == 409
+        assert (await self._call("POST", "/api/cline/cancel/nope")).status_code == 404
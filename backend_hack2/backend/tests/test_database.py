@@ -0,0 +1,123 @@
+import pytest
+
+import database
+from database import INDEXES, HOT_QUERIES, create_indexes, check_query_plans, plan_stages
+
+
+def _ixscan(collection):
+    return {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": f"{collection}_idx"}}}}
+
+
+COLLSCAN = {"queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}}}
+
+
+class _FakeCursor:
+    def __init__(self, explain):
+        self._explain = explain
+        self.sorted_by = None
+
+    def sort(self, keys):
+        self.sorted_by = keys
+        return self
+
+    async def explain(self):
+        return self._explain
+
+
+class _FakeDb:
+    """Explains every query as an index scan, except for ``scans`` collections."""
+
+    def __init__(self, scans=()):
+        self.scans = set(scans)
+        self.finds = []
+
+    def __getitem__(self, name):
+        db = self
+
+        class _Collection:
+            def find(self, filter):
+                db.finds.append((name, filter))
+                return _FakeCursor(COLLSCAN if name in db.scans else _ixscan(name))
+
+        return _Collection()
+
+
+class TestIndexRegistry:
+    def test_hot_collections_are_indexed(self):
+        indexed = {(spec.collection, spec.keys[0][0]) for spec in INDEXES}
+        for collection, field in [
+            ("artefacts", "session"),
+            ("together_reports", "execution_id"),
+            ("cline_executions", "execution_id"),
+            ("runs", "timestamp"),
+            ("runs", "repo"),
+        ]:
+            assert (collection, field) in indexed
+
+    def test_filtered_runs_pages_have_a_matching_index(self):
+        # /api/runs?user_email=|repo=|status= must seek, not sort in memory
+        keys = {(spec.collection, tuple(spec.keys)) for spec in INDEXES}
+        for query in HOT_QUERIES:
+            if query.collection == "runs" and query.sort and len(query.filter) == 1:
+                (field,) = query.filter
+                assert ("runs", ((field, 1), *query.sort)) in keys, query.name
+
+    @pytest.mark.asyncio
+    async def test_create_indexes_applies_registry(self, async_mongo):
+        created = await create_indexes(async_mongo)
+
+        assert created == len(INDEXES)
+        info = async_mongo._database["cline_executions"].index_information()
+        assert any(ix.get("unique") and ix["key"] == [("execution_id", 1)] for ix in info.values())
+        assert "session_1_status_1" in async_mongo._database["artefacts"].index_information()
+
+    @pytest.mark.asyncio
+    async def test_create_indexes_continues_after_failure(self, async_mongo, monkeypatch):
+        # an options conflict with an existing index must not stop the rest
+        async_mongo._database["runs"].create_index("id")
+        bad = database.IndexSpec("runs", [("id", 1)], {"unique": True})
+        monkeypatch.setattr(database, "INDEXES", [bad] + [s for s in INDEXES if s.keys != [("id", 1)]])
+
+        created = await create_indexes(async_mongo)
+
+        assert created == len(database.INDEXES) - 1
+        assert "email_1" in async_mongo._database["users"].index_information()
+
+
+class TestQueryPlanCheck:
+    def test_plan_stages_walks_nested_plans(self):
+        plan = {"stage": "SORT", "inputStage": {"stage": "OR", "inputStages": [
+            {"stage": "IXSCAN"}, {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}}]}}
+        assert plan_stages(plan) == ["SORT", "OR", "IXSCAN", "FETCH", "COLLSCAN"]
+
+    def test_plan_stages_handles_sbe_wrapper(self):
+        assert "IXSCAN" in plan_stages({"queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}})
+
+    @pytest.mark.asyncio
+    async def test_all_indexed(self):
+        fake = _FakeDb()
+        results = await check_query_plans(fake)
+
+        assert len(results) == len(HOT_QUERIES)
+        assert all(r["ok"] for r in results)
+        assert len(fake.finds) == len(HOT_QUERIES)
+
+    @pytest.mark.asyncio
+    async def test_collscan_is_reported(self):
+        results = await check_query_plans(_FakeDb(scans={"together_reports"}))
+
+        failed = [r for r in results if not r["ok"]]
+        assert [r["collection"] for r in failed] == ["together_reports"]
+        assert "COLLSCAN" in failed[0]["stages"]
+
+    @pytest.mark.asyncio
+    async def test_check_script_exit_code(self, monkeypatch, capsys):
+        import check_indexes
+
+        monkeypatch.setattr(check_indexes, "db", _FakeDb())
+        assert await check_indexes.main(create=False) == 0
+
+        monkeypatch.setattr(check_indexes, "db", _FakeDb(scans={"runs"}))
+        assert await check_indexes.main(create=False) == 1
+        assert "COLLSCAN" in capsys.readouterr().out
@@ -0,0 +1,61 @@
+import pytest
+import httpx
+
+import http_clients
+
+
+class TestHttpClients:
+    @pytest.mark.asyncio
+    async def test_pool_is_shared_and_counted(self):
+        client = http_clients.get_client("kestra")
+        assert http_clients.get_client("kestra") is client
+
+        client._transport = httpx.MockTransport(lambda request: httpx.Response(200, json={}))
+        before = http_clients.stats()["kestra"]["requests"]
+        await client.get("http://kestra:8080/api/v1/executions/x")
+        await client.get("http://kestra:8080/api/v1/executions/y")
+
+        stats = http_clients.stats()["kestra"]
+        assert stats["requests"] == before + 2
+        assert stats["max_connections"] == http_clients.POOLS["kestra"].max_connections
+        await http_clients.close_clients()
+
+    @pytest.mark.asyncio
+    async def test_open_and_close(self):
+        await http_clients.open_clients()
+        clients = {name: http_clients.get_client(name) for name in http_clients.POOLS}
+        await http_clients.close_clients()
+
+        assert all(client.is_closed for client in clients.values())
+        assert not http_clients.get_client("slack").is_closed    # reopened lazily
+        await http_clients.close_clients()
+
+    def test_pool_limit_overrides(self, monkeypatch):
+        monkeypatch.setenv("HTTP_POOL_LIMITS", "pika=3:12,custom=7")
+        monkeypatch.setattr(http_clients, "POOLS", dict(http_clients.POOLS))
+        http_clients._configure()
+
+        assert http_clients.POOLS["pika"].max_connections == 3
+        assert http_clients.POOLS["pika"].timeout == 12.0
+        assert http_clients.POOLS["custom"].max_connections == 7
+
+    @pytest.mark.asyncio
+    async def test_log_follows_use_their_own_pool(self, monkeypatch):
+        import kestra_client
+        import log_hub
+
+        names = []
+        client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"state": {"current": "SUCCESS"}})))
+
+        def get_client(name):
+            names.append(name)
+            return client
+        monkeypatch.setattr(kestra_client, "get_client", get_client)
+        monkeypatch.setattr(kestra_client, "LOG_DRAIN_GRACE", 0.01)
+
+        async for _ in kestra_client.follow_logs("exec-1"):
+            pass
+
+        assert names == ["kestra_follow"]
+        assert http_clients.POOLS["kestra_follow"].max_connections >= log_hub.LOG_HUB_MAX_CONNECTIONS
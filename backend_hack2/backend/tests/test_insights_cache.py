@@ -0,0 +1,81 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+
+import insights_cache
+
+WINDOW = ("2024-01-01", "2024-01-15")
+REPO = "https://github.com/test/repo"
+
+
+@pytest.fixture
+def redis_store():
+    """In-memory stand-in for the database cache_* helpers."""
+    store = {}
+
+    async def cache_get(key):
+        return store.get(key)
+
+    async def cache_set(key, value, ttl=3600):
+        store[key] = value
+
+    async def cache_add(key, value, ttl=3600):
+        if key in store:
+            return False
+        store[key] = value
+        return True
+
+    async def cache_delete(key):
+        store.pop(key, None)
+
+    with patch("insights_cache.cache_get", cache_get), \
+         patch("insights_cache.cache_set", cache_set), \
+         patch("insights_cache.cache_add", cache_add), \
+         patch("insights_cache.cache_delete", cache_delete), \
+         patch.dict(insights_cache._stats, {k: 0 for k in insights_cache._stats}):
+        yield store
+
+
+class TestInsightsCache:
+    @pytest.mark.asyncio
+    async def test_miss_then_hit(self, redis_store):
+        fetch = AsyncMock(return_value={"issues": 1})
+        assert await insights_cache.get_or_fetch(REPO, WINDOW, fetch) == {"issues": 1}
+        assert await insights_cache.get_or_fetch(REPO, WINDOW, fetch) == {"issues": 1}
+        assert fetch.await_count == 1
+        stats = insights_cache.stats()
+        assert stats["misses"] == 1 and stats["hits"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_refreshing(self, redis_store):
+        key = insights_cache.insights_key(REPO, WINDOW)
+        redis_store[key] = {"insights": {"old": True}, "fetched_at": time.time() - 10 ** 6}
+        refreshed = asyncio.Event()
+
+        async def fetch():
+            refreshed.set()
+            return {"old": False}
+
+        assert await insights_cache.get_or_fetch(REPO, WINDOW, fetch) == {"old": True}
+        await asyncio.wait_for(refreshed.wait(), 1)
+        await asyncio.sleep(0)
+        assert redis_store[key]["insights"] == {"old": False}
+        assert f"{key}:refreshing" not in redis_store
+        assert insights_cache.stats()["stale_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_window_is_part_of_key(self, redis_store):
+        fetch = AsyncMock(return_value={})
+        await insights_cache.get_or_fetch(REPO, WINDOW, fetch)
+        await insights_cache.get_or_fetch(REPO, ("2024-01-02", "2024-01-16"), fetch)
+        assert fetch.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, redis_store):
+        fetch = AsyncMock(return_value={})
+        await insights_cache.get_or_fetch(REPO, WINDOW, fetch)
+        await insights_cache.invalidate(REPO, WINDOW)
+        await insights_cache.get_or_fetch(REPO, WINDOW, fetch)
+        assert fetch.await_count == 2
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import job_queue
+
+
+@pytest.fixture
+def handlers():
+    """Isolated handler registry for each test."""
+    with patch.dict(job_queue._handlers, clear=True), patch.dict(job_queue._dead_hooks, clear=True):
+        yield
+
+
+class TestJobQueue:
+    @pytest.mark.asyncio
+    async def test_enqueue_is_idempotent_with_dedupe_key(self, async_mongo):
+        first = await job_queue.enqueue(async_mongo, "video", {"n": 1}, dedupe_key="video:exec_1")
+        second = await job_queue.enqueue(async_mongo, "video", {"n": 2}, dedupe_key="video:exec_1")
+        assert first == second
+        assert await async_mongo["jobs"].count_documents({}) == 1
+
+    @pytest.mark.asyncio
+    async def test_lease_is_exclusive_until_visibility_timeout(self, async_mongo):
+        await job_queue.enqueue(async_mongo, "video", {})
+        job = await job_queue.lease(async_mongo, "video", "w1")
+        assert job["status"] == "running" and job["attempts"] == 1
+        assert await job_queue.lease(async_mongo, "video", "w2") is None
+
+        # w1 dies: once the lease lapses another worker takes over
+        await async_mongo["jobs"].update_one(
+            {"_id": job["_id"]},
+            {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}},
+        )
+        taken = await job_queue.lease(async_mongo, "video", "w2")
+        assert taken["_id"] == job["_id"] and taken["attempts"] == 2
+        assert not await job_queue.heartbeat(async_mongo, job, "w1")
+
+    @pytest.mark.asyncio
+    async def test_failure_backs_off_then_dead_letters(self, async_mongo):
+        await job_queue.enqueue(async_mongo, "video", {"token": "s3cret"}, max_attempts=2, redact=("token",))
+        job = await job_queue.lease(async_mongo, "video", "w1")
+        assert await job_queue.fail(async_mongo, job, "w1", "boom") == "queued"
+        # backoff: not runnable yet
+        assert await job_queue.lease(async_mongo, "video", "w1") is None
+
+        await async_mongo["jobs"].update_one({"_id": job["_id"]}, {"$set": {"run_at": datetime.utcnow()}})
+        job = await job_queue.lease(async_mongo, "video", "w1")
+        assert await job_queue.fail(async_mongo, job, "w1", "boom again") == "dead"
+        stored = await async_mongo["jobs"].find_one({"_id": job["_id"]})
+        assert stored["status"] == "dead" and stored["last_error"] == "boom again"
+        assert "token" not in stored["payload"]
+
+    def test_parse_concurrency(self, handlers):
+        job_queue.handler("a")(lambda p: None)
+        job_queue.handler("b")(lambda p: None)
+        assert job_queue.parse_concurrency("b=3, c=2") == {"a": 1, "b": 3, "c": 2}
+
+    @pytest.mark.asyncio
+    async def test_worker_respects_per_type_concurrency(self, async_mongo, handlers):
+        running, peak, done = 0, 0, []
+
+        @job_queue.handler("video")
+        async def handle(payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+            done.append(payload["n"])
+            return {"ok": True}
+
+        for n in range(5):
+            await job_queue.enqueue(async_mongo, "video", {"n": n})
+
+        worker = job_queue.Worker(async_mongo, {"video": 2}, poll_interval=0.01)
+        stop = asyncio.Event()
+        runner = asyncio.create_task(worker.run(stop))
+        for _ in range(200):
+            if len(done) == 5:
+                break
+            await asyncio.sleep(0.01)
+        stop.set()
+        await runner
+
+        assert sorted(done) == list(range(5))
+        assert peak == 2
+        assert await async_mongo["jobs"].count_documents({"status": "done"}) == 5
+
+    @pytest.mark.asyncio
+    async def test_worker_calls_dead_hook(self, async_mongo, handlers):
+        dead = []
+
+        async def on_dead(payload, error):
+            dead.append((payload["n"], error))
+
+        @job_queue.handler("video", on_dead=on_dead)
+        async def handle(payload):
+            raise RuntimeError("provider down")
+
+        await job_queue.enqueue(async_mongo, "video", {"n": 7}, max_attempts=1)
+        worker = job_queue.Worker(async_mongo, {"video": 1}, poll_interval=0.01)
+        await worker.poll_once()
+        await asyncio.gather(*worker._tasks)
+        assert dead == [(7, "provider down")]
+
+    @pytest.mark.asyncio
+    async def test_job_that_kills_its_worker_is_dead_lettered(self, async_mongo, handlers):
+        dead = []
+
+        async def on_dead(payload, error):
+            dead.append((payload["n"], error))
+
+        job_queue.handler("video", on_dead=on_dead)(lambda payload: None)
+        await job_queue.enqueue(async_mongo, "video", {"n": 3}, max_attempts=2)
+
+        async def expire():
+            await async_mongo["jobs"].update_many(
+                {}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+        # every attempt dies with its worker (OOM, SIGKILL) – the lease just lapses
+        assert (await job_queue.lease(async_mongo, "video", "w1"))["attempts"] == 1
+        await expire()
+        assert (await job_queue.lease(async_mongo, "video", "w2"))["attempts"] == 2
+        await expire()
+        assert await job_queue.lease(async_mongo, "video", "w3") is None
+
+        worker = job_queue.Worker(async_mongo, {"video": 1}, poll_interval=0.01)
+        assert await worker.poll_once() == 0
+        stored = await async_mongo["jobs"].find_one({})
+        assert stored["status"] == "dead" and stored["attempts"] == 2
+        assert dead == [(3, "Lease expired on attempt 2 (worker lost)")]
+
+        # parked once: a second worker finds nothing to reap
+        assert await job_queue.reap_exhausted(async_mongo, "video", "w4") == []
@@ -0,0 +1,113 @@
+import json
+import pytest
+import httpx
+from unittest.mock import patch
+
+import kestra_client
+
+
+def _kestra(lines, states):
+    """Mock Kestra: a follow stream replaying ``lines`` and a state sequence."""
+    calls = {"follow": 0, "state": 0}
+
+    def handler(request):
+        if request.url.path.endswith("/follow"):
+            calls["follow"] += 1
+            body = "".join(f"event: log\ndata: {json.dumps({'message': line})}\n\n" for line in lines)
+            return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+        calls["state"] += 1
+        state = states[min(calls["state"], len(states)) - 1]
+        return httpx.Response(200, json={"state": {"current": state}})
+
+    return httpx.MockTransport(handler), calls
+
+
+@pytest.fixture
+def fast_tail(monkeypatch):
+    monkeypatch.setattr(kestra_client, "LOG_STATE_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(kestra_client, "LOG_DRAIN_GRACE", 0.1)
+    monkeypatch.setattr(kestra_client, "LOG_RECONNECT_DELAY", 0.01)
+    monkeypatch.setattr(kestra_client, "LOG_BATCH_WINDOW", 0.05)
+
+    def use(transport):
+        client = httpx.AsyncClient(transport=transport)
+        monkeypatch.setattr(kestra_client, "get_client", lambda name: client)
+    return use
+
+
+async def _collect(execution_id, after=0):
+    return [item async for item in kestra_client.follow_logs(execution_id, after=after)]
+
+
+class TestTriggerWorkflow:
+    @pytest.mark.asyncio
+    async def test_forwards_incremental_tests_input(self, monkeypatch):
+        sent = []
+
+        def handler(request):
+            sent.append(json.loads(request.content))
+            return httpx.Response(200, json={"id": "exec-1"})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(kestra_client, "get_client", lambda name: client)
+
+        await kestra_client.trigger_workflow("https://github.com/o/r", "main", "a@example.com", "t")
+        await kestra_client.trigger_workflow(
+            "https://github.com/o/r", "main", "a@example.com", "t", incremental_tests=True)
+
+        assert [body["incrementalTests"] for body in sent] == [False, True]
+
+
+class TestFollowLogs:
+    @pytest.mark.asyncio
+    async def test_batches_lines_and_ends_on_terminal_state(self, fast_tail):
+        transport, calls = _kestra(["one", "two", "three"], ["RUNNING", "RUNNING", "SUCCESS"])
+        fast_tail(transport)
+
+        events = await _collect("exec_1")
+
+        logs = [e for e in events if e[0] == "logs"]
+        assert [line for _, _, batch in logs for line in batch] == ["one", "two", "three"]
+        assert logs[-1][1] == 3
+        assert len(logs) == 1                      # one burst → one event
+        assert events[-1] == ("end", "SUCCESS", None)
+        assert calls["follow"] >= 2                # reconnects did not duplicate lines
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_delivered_lines(self, fast_tail):
+        transport, _ = _kestra(["one", "two", "three", "four"], ["SUCCESS"])
+        fast_tail(transport)
+
+        events = await _collect("exec_1", after=2)
+
+        logs = [e for e in events if e[0] == "logs"]
+        assert [line for _, _, batch in logs for line in batch] == ["three", "four"]
+        assert logs[-1][1] == 4
+
+    @pytest.mark.asyncio
+    async def test_missing_execution_reports_error(self, fast_tail):
+        fast_tail(httpx.MockTransport(lambda request: httpx.Response(404)))
+        events = await _collect("nope")
+        assert events[-1][0] == "error"
+
+    def test_format_sse(self):
+        assert kestra_client.format_sse("logs", 7, ["a", "b\nc"]) == "id: 7\ndata: a\ndata: b\ndata: c\n\n"
+        assert kestra_client.format_sse("heartbeat", None) == ": keep-alive\n\n"
+        assert kestra_client.format_sse("end", "FAILED") == "event: end\ndata: FAILED\n\n"
+
+
+class TestStatusEndpoint:
+    @pytest.mark.asyncio
+    async def test_last_event_id_is_forwarded(self):
+        from main import app
+
+        async def fake_stream(execution_id, last_event_id):
+            yield f"id: {last_event_id}\n\n"
+
+        with patch("main.get_logs_stream", side_effect=fake_stream) as stream:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.get("/api/status/exec_1", headers={"Last-Event-ID": "42"})
+
+        stream.assert_called_once_with("exec_1", 42)
+        assert response.text == "id: 42\n\n"
@@ -0,0 +1,235 @@
+import json
+
+import httpx
+import pytest
+from unittest.mock import patch
+
+import kestra_outputs
+
+EXEC = "exec-1"
+BASE = f"kestra:///hackathon/devops-autopilot/executions/{EXEC}/tasks/scan-repo/tr1"
+
+
+class _FakeGridIn:
+    def __init__(self, store, filename, metadata=None):
+        self.store, self.filename, self.metadata = store, filename, metadata
+        self._id = f"file_{len(store) + 1}"
+        self.chunks = []
+        self.aborted = False
+
+    async def write(self, chunk):
+        self.chunks.append(chunk)
+
+    async def abort(self):
+        self.aborted = True
+
+    async def close(self):
+        self.store[self._id] = b"".join(self.chunks)
+
+
+class _FakeGridOut:
+    def __init__(self, data):
+        self.data, self.pos = data, 0
+
+    async def read(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+
+class _FakeBucket:
+    def __init__(self):
+        self.store = {}
+        self.uploads = []
+
+    def open_upload_stream(self, filename, metadata=None):
+        grid_in = _FakeGridIn(self.store, filename, metadata)
+        self.uploads.append(grid_in)
+        return grid_in
+
+    async def open_download_stream(self, file_id):
+        return _FakeGridOut(self.store[file_id])
+
+
+@pytest.fixture
+def kestra(monkeypatch):
+    """Mock Kestra storage: ``files`` maps URI -> bytes; ``failures`` queues status codes."""
+    state = {"files": {}, "failures": [], "requests": []}
+
+    def handler(request):
+        uri = request.url.params["path"]
+        state["requests"].append(uri)
+        if state["failures"]:
+            return httpx.Response(state["failures"].pop(0))
+        if uri not in state["files"]:
+            return httpx.Response(404)
+        return httpx.Response(200, content=state["files"][uri])
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(kestra_outputs, "get_client", lambda name: client)
+    monkeypatch.setattr(kestra_outputs, "KESTRA_OUTPUT_RETRY_DELAY", 0)
+    monkeypatch.setattr(kestra_outputs, "KESTRA_OUTPUT_CHUNK_SIZE", 4)
+    return state
+
+
+@pytest.fixture
+def bucket():
+    fake = _FakeBucket()
+    with patch("kestra_outputs.get_output_bucket", return_value=fake):
+        yield fake
+
+
+@pytest.fixture
+def runs(async_mongo):
+    async_mongo._database["runs"].insert_one({"id": EXEC, "status": "RUNNING", "repo": "https://github.com/o/r",
+                                              "user_email": "a@example.com", "timestamp": "2024-01-01T00:00:00Z"})
+    return async_mongo
+
+
+class TestValidRefs:
+    def test_keeps_known_outputs_of_this_execution(self):
+        refs = {
+            "bug_report": f"{BASE}/bug_report.txt",
+            "timings": "kestra:///hackathon/devops-autopilot/executions/other/tasks/x/timings.json",
+            "test_summary": "http://evil.example/summary.json",
+            "unknown": f"{BASE}/x.txt",
+        }
+        assert kestra_outputs.valid_refs(EXEC, refs) == {"bug_report": f"{BASE}/bug_report.txt"}
+        assert kestra_outputs.valid_refs(EXEC, "nope") == {}
+
+
+class TestStoreOutputs:
+    @pytest.mark.asyncio
+    async def test_stores_text_in_gridfs_and_json_on_run(self, kestra, bucket, runs):
+        summary = {"totals": {"tests": 2}, "failures": []}
+        kestra["files"].update({
+            f"{BASE}/bug_report.txt": b"FAILED tests/test_a.py::test_x",
+            f"{BASE}/summary.json": json.dumps(summary).encode(),
+            f"{BASE}/timings.json": b'{"setup_seconds": 1.5, "test_seconds": 3}',
+        })
+
+        fields = await kestra_outputs.store_outputs(runs, EXEC, {
+            "bug_report": f"{BASE}/bug_report.txt",
+            "test_summary": f"{BASE}/summary.json",
+            "timings": f"{BASE}/timings.json",
+        })
+
+        run = runs._database["runs"].find_one({"id": EXEC})
+        assert run["test_summary"] == summary
+        assert run["scan"] == {"setup_seconds": 1.5, "test_seconds": 3}
+        meta = run["outputs"]["bug_report"]
+        assert meta["length"] == 30 and meta["truncated"] is False
+        assert bucket.store[meta["file_id"]] == b"FAILED tests/test_a.py::test_x"
+        assert max(len(c) for c in bucket.uploads[0].chunks) <= 4        # read in chunks
+        assert "outputs_failed" not in fields
+
+    @pytest.mark.asyncio
+    async def test_text_is_capped_and_flagged(self, kestra, bucket, runs):
+        kestra["files"][f"{BASE}/report.txt"] = b"x" * 100
+
+        with patch.object(kestra_outputs, "KESTRA_OUTPUT_MAX_BYTES", 10):
+            meta = await kestra_outputs.fetch_to_gridfs(runs, EXEC, "raw_report", f"{BASE}/report.txt")
+
+        assert meta["length"] == 10 and meta["truncated"] is True
+        assert bucket.store[meta["file_id"]] == b"x" * 10
+
+    @pytest.mark.asyncio
+    async def test_oversized_json_is_skipped(self, kestra, bucket, runs, monkeypatch):
+        monkeypatch.setattr(kestra_outputs, "KESTRA_OUTPUT_JSON_MAX_BYTES", 8)
+        kestra["files"][f"{BASE}/summary.json"] = json.dumps({"failures": ["x" * 50]}).encode()
+
+        with pytest.raises(kestra_outputs.OutputTooLarge):
+            await kestra_outputs.fetch_json(EXEC, f"{BASE}/summary.json", limit=8)
+        fields = await kestra_outputs.store_outputs(runs, EXEC, {"test_summary": f"{BASE}/summary.json"})
+
+        assert fields == {"outputs_failed": ["test_summary"]}
+
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self, kestra, bucket, runs):
+        kestra["files"][f"{BASE}/bug_report.txt"] = b"report"
+        kestra["failures"] = [503, 502]
+
+        fields = await kestra_outputs.store_outputs(runs, EXEC, {"bug_report": f"{BASE}/bug_report.txt"})
+
+        assert len(kestra["requests"]) == 3
+        assert [u.aborted for u in bucket.uploads] == [True, True, False]
+        assert bucket.store[fields["outputs.bug_report"]["file_id"]] == b"report"
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self, kestra, bucket, runs, monkeypatch):
+        monkeypatch.setattr(kestra_outputs, "KESTRA_OUTPUT_RETRIES", 1)
+        kestra["failures"] = [500, 500]
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await kestra_outputs.store_outputs(runs, EXEC, {"bug_report": f"{BASE}/bug_report.txt"})
+
+    @pytest.mark.asyncio
+    async def test_missing_file_is_not_retried(self, kestra, bucket, runs):
+        fields = await kestra_outputs.store_outputs(runs, EXEC, {"bug_report": f"{BASE}/bug_report.txt"})
+
+        assert len(kestra["requests"]) == 1
+        assert fields == {"outputs_failed": ["bug_report"]}
+
+    @pytest.mark.asyncio
+    async def test_retry_skips_already_stored_outputs(self, kestra, bucket, runs):
+        runs._database["runs"].update_one({"id": EXEC}, {"$set": {"test_summary": {"totals": {}}}})
+        kestra["files"][f"{BASE}/timings.json"] = b"{}"
+
+        await kestra_outputs.store_outputs(runs, EXEC, {
+            "test_summary": f"{BASE}/summary.json", "timings": f"{BASE}/timings.json"})
+
+        assert kestra["requests"] == [f"{BASE}/timings.json"]
+
+
+class TestWebhookAndDownload:
+    async def _request(self, method, url, **kwargs):
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_webhook_enqueues_output_fetch(self, runs):
+        enqueued = []
+
+        async def enqueue(db, job_type, payload, **kwargs):
+            enqueued.append((job_type, payload, kwargs.get("dedupe_key")))
+            return f"job-{len(enqueued)}"
+
+        with patch("main.db", runs), patch("main.job_queue.enqueue", side_effect=enqueue):
+            response = await self._request("POST", "/webhook/kestra", json={
+                "id": EXEC, "repo": "https://github.com/o/r", "user_email": "a@example.com",
+                "outputs": {"bug_report": f"{BASE}/bug_report.txt", "bogus": "kestra:///elsewhere"},
+            })
+
+        assert response.status_code == 200
+        assert enqueued[0] == ("kestra_outputs", {"execution_id": EXEC, "outputs": {
+            "bug_report": f"{BASE}/bug_report.txt"}}, f"kestra_outputs:{EXEC}")
+        assert enqueued[1][0] == "post_kestra"
+        assert runs._database["runs"].find_one({"id": EXEC})["outputs_job_id"] == "job-1"
+
+    @pytest.mark.asyncio
+    async def test_webhook_rejects_oversized_body(self, runs, monkeypatch):
+        import main
+
+        monkeypatch.setattr(main, "WEBHOOK_MAX_BYTES", 100)
+        with patch("main.db", runs):
+            response = await self._request("POST", "/webhook/kestra", json={"id": EXEC, "bug_report": "x" * 500})
+
+        assert response.status_code == 413
+
+    @pytest.mark.asyncio
+    async def test_download_stored_output(self, runs, bucket):
+        bucket.store["file_1"] = b"line one\nline two\n"
+        runs._database["runs"].update_one({"id": EXEC}, {"$set": {
+            "outputs.raw_report": {"file_id": "file_1", "length": 18, "truncated": True}}})
+
+        with patch("main.db", runs):
+            response = await self._request("GET", f"/api/runs/{EXEC}/outputs/raw_report")
+            missing = await self._request("GET", f"/api/runs/{EXEC}/outputs/bug_report")
+
+        assert response.status_code == 200
+        assert response.text == "line one\nline two\n"
+        assert response.headers["x-output-truncated"] == "true"
+        assert missing.status_code == 404
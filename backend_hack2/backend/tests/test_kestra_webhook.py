@@ -0,0 +1,81 @@
+import pytest
+import httpx
+from unittest.mock import patch, AsyncMock
+
+from main import app
+
+
+@pytest.fixture
+def webhook_db(async_mongo):
+    with patch("main.db", async_mongo), \
+         patch("main.job_queue.enqueue", new=AsyncMock(return_value="job-1")):
+        yield async_mongo
+
+
+async def _post(payload):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/webhook/kestra", json=payload)
+
+
+class TestKestraWebhook:
+    @pytest.mark.asyncio
+    async def test_stores_scan_timings(self, webhook_db):
+        scan = {"setup_seconds": 4.2, "test_seconds": 31.5, "deps_cache": "hit", "pytest_exit_code": 1}
+        response = await _post({
+            "id": "exec-1", "repo": "https://github.com/o/r", "user_email": "a@example.com", "scan": scan,
+        })
+
+        assert response.status_code == 200
+        assert response.json()["job_id"] == "job-1"
+        run = webhook_db._database["runs"].find_one({"id": "exec-1"})
+        assert run["status"] == "COMPLETED"
+        assert run["scan"] == scan
+
+    @pytest.mark.asyncio
+    async def test_stores_test_summary(self, webhook_db):
+        summary = {
+            "totals": {"tests": 3, "passed": 2, "failures": 1, "errors": 0, "skipped": 0, "time": 0.4},
+            "exit_code": 1, "selection": "full", "omitted": 0,
+            "failures": [{"test": "tests/test_a.py::test_x", "kind": "failure", "type": "AssertionError",
+                          "message": "assert 1 == 2", "file": "tests/test_a.py", "line": 3,
+                          "traceback": "E   assert 1 == 2"}],
+        }
+        response = await _post({
+            "id": "exec-3", "repo": "https://github.com/o/r", "user_email": "a@example.com",
+            "bug_report": "Tests: 3 run, 2 passed, 1 failed", "test_summary": summary,
+        })
+
+        assert response.status_code == 200
+        assert webhook_db._database["runs"].find_one({"id": "exec-3"})["test_summary"] == summary
+
+    @pytest.mark.asyncio
+    async def test_scan_is_optional(self, webhook_db):
+        response = await _post({"id": "exec-2", "repo": "https://github.com/o/r", "user_email": "a@example.com"})
+
+        assert response.status_code == 200
+        run = webhook_db._database["runs"].find_one({"id": "exec-2"})
+        assert "scan" not in run and "test_summary" not in run
+
+    @pytest.mark.asyncio
+    async def test_triggered_run_is_completed(self, webhook_db):
+        webhook_db._database["runs"].insert_one({"id": "exec-4", "repo": "https://github.com/o/r",
+                                                 "user_email": "a@example.com", "status": "RUNNING"})
+
+        assert (await _post({"id": "exec-4"})).status_code == 200
+        run = webhook_db._database["runs"].find_one({"id": "exec-4"})
+        assert run["status"] == "COMPLETED" and run["repo"] == "https://github.com/o/r"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status", ["VIDEO_GENERATING", "VIDEO_READY", "VIDEO_FAILED"])
+    async def test_redelivery_does_not_rewind_status(self, webhook_db, status):
+        payload = {"id": "exec-5", "repo": "https://github.com/o/r", "user_email": "a@example.com"}
+        assert (await _post(payload)).status_code == 200
+        finished_at = webhook_db._database["runs"].find_one({"id": "exec-5"})["finished_at"]
+        # the post_kestra job moves the run on…
+        webhook_db._database["runs"].update_one({"id": "exec-5"}, {"$set": {"status": status}})
+
+        # …then Kestra delivers the same webhook again
+        assert (await _post(payload)).status_code == 200
+        run = webhook_db._database["runs"].find_one({"id": "exec-5"})
+        assert run["status"] == status and run["finished_at"] == finished_at
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import llm_cache
+
+
+class _FakeCollection:
+    """Just enough of a Motor collection for llm_cache."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, projection=None):
+        doc = self.docs.get(query["_id"])
+        if not doc or doc["expires_at"] <= query["expires_at"]["$gt"]:
+            return None
+        doc.update(update["$set"])
+        return {"_id": query["_id"], "output": doc["output"]}
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = dict(doc)
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, query, projection):
+        ordered = sorted(self.docs.items(), key=lambda kv: kv[1]["last_used_at"])
+        cursor = MagicMock()
+        cursor.sort.return_value.limit.side_effect = lambda n: MagicMock(
+            to_list=AsyncMock(return_value=[{"_id": k} for k, _ in ordered[:n]])
+        )
+        return cursor
+
+    async def delete_many(self, query):
+        ids = query["_id"]["$in"]
+        for key in ids:
+            self.docs.pop(key, None)
+        return MagicMock(deleted_count=len(ids))
+
+
+@pytest.fixture
+def collection():
+    fake = _FakeCollection()
+    with patch("llm_cache._collection", return_value=fake), \
+         patch.dict(llm_cache._stats, {k: 0 for k in llm_cache._stats}):
+        yield fake
+
+
+async def _lookup(insights, compute, template_version="1", model="m"):
+    return await llm_cache.get_or_compute(
+        kind="report", model=model, template_version=template_version,
+        insights=insights, compute=compute,
+    )
+
+
+class TestLLMCache:
+    def test_key_ignores_dict_ordering(self):
+        a = llm_cache.cache_key("k", "m", "1", {"a": 1, "b": [1, 2]})
+        b = llm_cache.cache_key("k", "m", "1", {"b": [1, 2], "a": 1})
+        assert a == b
+        assert a != llm_cache.cache_key("k", "m", "2", {"a": 1, "b": [1, 2]})
+
+    @pytest.mark.asyncio
+    async def test_repeat_insights_skip_llm(self, collection):
+        compute = AsyncMock(return_value="summary")
+        assert await _lookup({"x": 1}, compute) == "summary"
+        assert await _lookup({"x": 1}, compute) == "summary"
+        assert compute.await_count == 1
+        assert llm_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_model_or_template_change_misses(self, collection):
+        compute = AsyncMock(return_value="summary")
+        await _lookup({"x": 1}, compute)
+        await _lookup({"x": 1}, compute, template_version="2")
+        await _lookup({"x": 1}, compute, model="other")
+        assert compute.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, collection):
+        with patch("llm_cache.LLM_CACHE_MAX_ENTRIES", 2):
+            for i in range(3):
+                await _lookup({"i": i}, AsyncMock(return_value=str(i)))
+        assert len(collection.docs) == 2
+        assert llm_cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cache_errors_do_not_fail_call(self):
+        broken = MagicMock()
+        broken.find_one_and_update = AsyncMock(side_effect=RuntimeError("mongo down"))
+        broken.replace_one = AsyncMock(side_effect=RuntimeError("mongo down"))
+        with patch("llm_cache._collection", return_value=broken):
+            assert await _lookup({"x": 1}, AsyncMock(return_value="ok")) == "ok"
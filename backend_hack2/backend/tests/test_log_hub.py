@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+import httpx
+from unittest.mock import patch
+
+import log_hub
+from log_hub import LogHub, TooManyStreams
+
+
+class _Upstream:
+    """Fake ``follow_logs``: yields whatever the test pushes, counts follows."""
+
+    def __init__(self):
+        self.follows = 0
+        self.queue = asyncio.Queue()
+
+    async def follow(self, execution_id, after=0):
+        self.follows += 1
+        while True:
+            item = await self.queue.get()
+            yield item
+            if item[0] in ("end", "error"):
+                return
+
+    async def push(self, *items):
+        for item in items:
+            await self.queue.put(item)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+
+@pytest.fixture
+def upstream():
+    fake = _Upstream()
+    with patch("log_hub.follow_logs", fake.follow):
+        yield fake
+
+
+async def _drain(hub, sub):
+    return [frame async for frame in hub.stream(sub)]
+
+
+class TestLogHub:
+    @pytest.mark.asyncio
+    async def test_viewers_share_one_upstream(self, upstream):
+        hub = LogHub()
+        first, second = hub.subscribe("exec_1"), hub.subscribe("exec_1")
+        readers = [asyncio.create_task(_drain(hub, sub)) for sub in (first, second)]
+
+        await upstream.push(("logs", 2, ["a", "b"]), ("end", "SUCCESS", None))
+        frames = await asyncio.gather(*readers)
+
+        assert upstream.follows == 1
+        for stream in frames:
+            assert "id: 2\ndata: a\ndata: b\n\n" in stream
+            assert stream[-1] == "event: end\ndata: SUCCESS\n\n"
+        assert hub.connections == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_viewer_skips_ahead(self, upstream):
+        hub = LogHub(client_queue=2)
+        slow = hub.subscribe("exec_1")
+        fast = hub.subscribe("exec_1")
+        fast_reader = asyncio.create_task(_drain(hub, fast))
+
+        for seq in range(1, 6):
+            await upstream.push(("logs", seq, [f"line {seq}"]))
+        await upstream.push(("end", "SUCCESS", None))
+
+        fast_frames = await fast_reader
+        slow_frames = await _drain(hub, slow)
+
+        assert sum(f.startswith("id:") for f in fast_frames) == 5
+        assert any(f.startswith("event: skipped") for f in slow_frames)
+        assert slow_frames[-1] == "event: end\ndata: SUCCESS\n\n"
+        assert hub.skipped_lines > 0
+
+    @pytest.mark.asyncio
+    async def test_late_joiner_replays_from_buffer(self, upstream):
+        hub = LogHub()
+        early = hub.subscribe("exec_1")
+        await upstream.push(("logs", 3, ["a", "b", "c"]))
+
+        late = hub.subscribe("exec_1", after=1)
+        await upstream.push(("end", "FAILED", None))
+        frames = await _drain(hub, late)
+        await _drain(hub, early)
+
+        assert frames[1] == "id: 3\ndata: b\ndata: c\n\n"
+        assert upstream.follows == 1
+
+    @pytest.mark.asyncio
+    async def test_connection_cap(self, upstream):
+        hub = LogHub(max_connections=1)
+        sub = hub.subscribe("exec_1")
+        with pytest.raises(TooManyStreams):
+            hub.subscribe("exec_2")
+        hub.unsubscribe(sub)
+        hub.subscribe("exec_2")
+        assert hub.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_endpoint_returns_503_at_cap(self, upstream, monkeypatch):
+        from main import app
+
+        monkeypatch.setattr(log_hub, "log_hub", LogHub(max_connections=0))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/api/status/exec_1")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "5"
+
+    @pytest.mark.asyncio
+    async def test_unread_stream_releases_its_slot(self, upstream, monkeypatch):
+        import gc
+
+        hub = LogHub(max_connections=1)
+        monkeypatch.setattr(log_hub, "log_hub", hub)
+
+        stream = log_hub.get_logs_stream("exec_1")
+        await stream.aclose()                           # closed without ever being iterated
+        assert hub.connections == 0
+
+        stream = log_hub.get_logs_stream("exec_1")
+        del stream                                      # dropped outright
+        gc.collect()
+        assert hub.connections == 0
+        log_hub.get_logs_stream("exec_2")               # the slot is free again
+
+    @pytest.mark.asyncio
+    async def test_response_releases_slot_when_client_leaves_before_body(self, upstream, monkeypatch):
+        import gc
+        from starlette.requests import Request
+        from main import stream_status
+
+        hub = LogHub(max_connections=1)
+        monkeypatch.setattr(log_hub, "log_hub", hub)
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "method": "GET", "headers": [],
+                 "path": "/api/status/exec_1", "query_string": b""}
+        response = await stream_status("exec_1", Request(scope))
+        assert hub.connections == 1
+
+        async def receive():                            # the client is already gone
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        await response(scope, receive, send)
+        assert hub.connections == 0
+
+        # the server cancelled the request before the response was even sent
+        response = await stream_status("exec_1", Request(scope))
+        del response
+        gc.collect()
+        assert hub.connections == 0
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+
+from operation_poller import OperationPoller, OperationTimeout, OperationFailed
+
+
+def _finishes_after(polls, result="video"):
+    calls = []
+
+    async def check():
+        calls.append(asyncio.get_running_loop().time())
+        return len(calls) >= polls, result
+    return check, calls
+
+
+class TestOperationPoller:
+    @pytest.mark.asyncio
+    async def test_many_operations_share_one_loop(self):
+        poller = OperationPoller()
+        futures = [poller.track(_finishes_after(3, i)[0], initial_interval=0.01) for i in range(200)]
+        assert await asyncio.gather(*futures) == list(range(200))
+        stats = poller.stats()
+        assert stats["completed"] == 200 and stats["checks"] == 600
+        assert stats["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_adaptive_backoff(self):
+        poller = OperationPoller()
+        check, calls = _finishes_after(4)
+        await poller.track(check, initial_interval=0.02, backoff=2.0, max_interval=1.0)
+        gaps = [b - a for a, b in zip(calls, calls[1:])]
+        assert gaps[1] > gaps[0] * 1.5 and gaps[2] > gaps[1] * 1.5
+
+    @pytest.mark.asyncio
+    async def test_deadline(self):
+        poller = OperationPoller()
+        check, _ = _finishes_after(10 ** 6)
+        with pytest.raises(OperationTimeout):
+            await poller.track(check, deadline=0.1, initial_interval=0.02)
+        assert poller.stats()["timed_out"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancellation_stops_polling_and_calls_hook(self):
+        poller = OperationPoller()
+        check, calls = _finishes_after(10 ** 6)
+        cancelled = asyncio.Event()
+
+        async def on_cancel():
+            cancelled.set()
+
+        future = poller.track(check, initial_interval=0.01, max_interval=0.01, on_cancel=on_cancel)
+        await asyncio.sleep(0.05)
+        future.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        polls = len(calls)
+        await asyncio.sleep(0.05)
+        assert len(calls) <= polls + 1
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_then_terminal_failure(self):
+        poller = OperationPoller()
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("blip")
+            return True, "ok"
+
+        assert await poller.track(flaky, initial_interval=0.01) == "ok"
+
+        async def failed():
+            raise OperationFailed("provider said no")
+
+        with pytest.raises(OperationFailed):
+            await poller.track(failed, initial_interval=0.01)
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+
+import provider_limits
+from provider_limits import ProviderLimiter, _Slot
+
+
+class TestProviderLimits:
+    def test_parse_limits(self):
+        assert provider_limits.parse_limits("veo=2:10, pika=3:30:5") == {
+            "veo": (2, 10.0, None),
+            "pika": (3, 30.0, 5),
+        }
+
+    @pytest.mark.asyncio
+    async def test_in_flight_cap_queues_callers(self):
+        limiter = ProviderLimiter("veo", max_in_flight=2, rpm=6000, burst=10, use_redis=False)
+        running, peak = 0, 0
+
+        async def call():
+            nonlocal running, peak
+            async with _Slot(limiter):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.02)
+                running -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        assert peak == 2
+        assert limiter.stats()["acquired"] == 6
+        assert limiter.stats()["max_wait_seconds"] > 0
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_spaces_out_requests(self):
+        # 600 rpm = one token every 0.1 s, burst of 1
+        limiter = ProviderLimiter("groq", max_in_flight=10, rpm=600, burst=1, use_redis=False)
+        started = time.monotonic()
+        for _ in range(3):
+            async with _Slot(limiter):
+                pass
+        assert time.monotonic() - started >= 0.18
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout(self):
+        limiter = ProviderLimiter("pika", max_in_flight=1, rpm=6000, use_redis=False)
+        token = await limiter.acquire()
+        with pytest.raises(RuntimeError, match="capacity"):
+            await limiter.acquire(timeout=0.05)
+        limiter.release(token)
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_fall_back_to_local(self):
+        limiter = ProviderLimiter("together", max_in_flight=1, rpm=6000)
+        broken = AsyncMock(side_effect=ConnectionError("redis down"))
+        with patch("provider_limits._slot_script", broken), patch("provider_limits._bucket_script", broken):
+            async with _Slot(limiter):
+                pass
+        assert limiter.stats()["backend"] == "local"
+
+    @pytest.mark.asyncio
+    async def test_wait_observers_receive_samples(self):
+        samples = []
+        limiter = ProviderLimiter("coderabbit", max_in_flight=1, rpm=6000, use_redis=False)
+        with patch("provider_limits._wait_observers", [lambda name, secs: samples.append(name)]):
+            async with _Slot(limiter):
+                pass
+        assert samples == ["coderabbit"]
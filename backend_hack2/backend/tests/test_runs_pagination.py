@@ -0,0 +1,91 @@
+import pytest
+import httpx
+from unittest.mock import patch
+
+import ids
+from main import app
+
+
+@pytest.fixture
+def runs_db(async_mongo):
+    docs = []
+    for i in range(25):
+        docs.append({
+            "id": f"exec-{i:02d}",
+            "repo": "https://github.com/org/a" if i % 2 else "https://github.com/org/b",
+            "status": "RUNNING" if i % 5 == 0 else "COMPLETED",
+            # pairs of runs share a timestamp – the id must break the tie
+            "timestamp": f"2024-01-01T00:00:{i // 2:02d}Z",
+            "user_email": "a@example.com" if i < 20 else "b@example.com",
+        })
+    async_mongo._database["runs"].insert_many(docs)
+    with patch("main.db", async_mongo):
+        yield async_mongo
+
+
+async def _get(params):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get("/api/runs", params=params)
+
+
+class TestRunsPagination:
+    @pytest.mark.asyncio
+    async def test_pages_cover_everything_once_in_order(self, runs_db):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+            body = (await _get(params)).json()
+            seen.extend(run["id"] for run in body["runs"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        assert seen == [f"exec-{i:02d}" for i in reversed(range(25))]
+        assert "_id" not in body["runs"][0]
+
+    @pytest.mark.asyncio
+    async def test_filters_and_projection(self, runs_db):
+        body = (await _get({"user_email": "a@example.com", "status": "RUNNING",
+                            "fields": "id,status"})).json()
+
+        assert body["runs"] == [{"id": f"exec-{i:02d}", "status": "RUNNING"} for i in (15, 10, 5, 0)]
+        assert body["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("limit", [1, 2, 5, 26])
+    async def test_webhook_created_and_legacy_runs_page_cleanly(self, runs_db, limit):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # a manual Kestra execution: the webhook creates the run
+            with patch("main.job_queue.enqueue", return_value="job-1"):
+                assert (await client.post("/webhook/kestra", json={"id": "manual-1"})).status_code == 200
+        runs_db._database["runs"].insert_many([{"id": "legacy-a"}, {"id": "legacy-b", "timestamp": None}])
+
+        seen, cursor = [], None
+        while True:
+            response = await _get({"limit": limit, **({"cursor": cursor} if cursor else {})})
+            assert response.status_code == 200
+            body = response.json()
+            seen.extend(run["id"] for run in body["runs"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        # newest first; runs without a timestamp come last
+        assert seen == ["manual-1"] + [f"exec-{i:02d}" for i in reversed(range(25))] + ["legacy-b", "legacy-a"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("params", [{"limit": 0}, {"limit": 500}, {"fields": "github_token"},
+                                        {"cursor": "not-a-cursor"}])
+    async def test_rejects_bad_parameters(self, runs_db, params):
+        assert (await _get(params)).status_code == 400
+
+
+class TestIds:
+    def test_ids_are_unique_and_time_ordered(self):
+        generated = [ids.new_id("cline_") for _ in range(2000)]
+        assert len(set(generated)) == len(generated)
+        assert generated == sorted(generated)
+        assert all(len(value) == len("cline_") + 26 for value in generated)
+
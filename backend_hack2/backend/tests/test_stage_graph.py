@@ -0,0 +1,72 @@
+import asyncio
+import time
+import pytest
+
+from stage_graph import Stage, StageFailed, run_stages
+
+
+def _sleeper(seconds, value=None, log=None, name=None):
+    async def run(deps):
+        if log is not None:
+            log.append(name)
+        await asyncio.sleep(seconds)
+        return value
+    return run
+
+
+class TestRunStages:
+    @pytest.mark.asyncio
+    async def test_independent_branches_overlap(self):
+        """Total time follows the critical path, not the sum of stages."""
+        timings = {}
+        started = time.perf_counter()
+        results = await run_stages([
+            Stage("a", _sleeper(0.05, "a")),
+            Stage("b", _sleeper(0.2, "b"), ("a",)),
+            Stage("c", _sleeper(0.2, "c"), ("a",)),
+            Stage("d", lambda deps: asyncio.sleep(0, result=deps), ("b", "c")),
+        ], timings)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.4
+        assert results["d"] == {"b": "b", "c": "c"}
+        assert timings["b"]["start"] >= timings["a"]["end"]
+        assert abs(timings["b"]["start"] - timings["c"]["start"]) < 0.05
+        assert all(t["status"] == "ok" for t in timings.values())
+
+    @pytest.mark.asyncio
+    async def test_optional_failure_does_not_block(self):
+        async def broken(deps):
+            raise ValueError("boom")
+
+        timings = {}
+        results = await run_stages([
+            Stage("report", broken, optional=True),
+            Stage("video", _sleeper(0.01, "mp4")),
+            Stage("persist", lambda deps: asyncio.sleep(0, result=deps), ("report", "video")),
+        ], timings)
+
+        assert results["persist"] == {"report": None, "video": "mp4"}
+        assert timings["report"]["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_required_failure_cancels_siblings(self):
+        async def broken(deps):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("no key")
+
+        timings = {}
+        with pytest.raises(StageFailed) as info:
+            await run_stages([
+                Stage("video", broken),
+                Stage("report", _sleeper(5)),
+            ], timings)
+
+        assert info.value.stage == "video"
+        assert timings["video"]["status"] == "failed"
+        assert timings["report"]["status"] == "cancelled"
+
+    @pytest.mark.asyncio
+    async def test_unknown_dependency_rejected(self):
+        with pytest.raises(ValueError):
+            await run_stages([Stage("a", _sleeper(0), ("missing",))], {})
@@ -0,0 +1,86 @@
+import pytest
+import httpx
+from unittest.mock import patch
+
+import telemetry
+from main import app
+
+
+class TestRegistry:
+    def test_histogram_renders_cumulative_buckets(self):
+        hist = telemetry.Histogram("t_latency_seconds", "test", ("route",), buckets=(0.1, 1))
+        try:
+            hist.observe(0.05, route="/a")
+            hist.observe(0.5, route="/a")
+            hist.observe(5, route="/a")
+            text = telemetry.render()
+        finally:
+            telemetry._registry.remove(hist)
+
+        assert "# TYPE t_latency_seconds histogram" in text
+        assert 't_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+        assert 't_latency_seconds_bucket{route="/a",le="1"} 2' in text
+        assert 't_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+        assert 't_latency_seconds_count{route="/a"} 3' in text
+
+    def test_label_values_are_escaped(self):
+        counter = telemetry.Counter("t_total", "test", ("path",))
+        try:
+            counter.inc(path='a"b')
+            assert 't_total{path="a\\"b"} 1' in telemetry.render()
+        finally:
+            telemetry._registry.remove(counter)
+
+
+class TestMetricsEndpoint:
+    @pytest.mark.asyncio
+    async def test_requests_are_counted_by_route_template(self):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/")
+            response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'autopilot_http_requests_total{method="GET",route="/",status="200"}' in response.text
+        assert "autopilot_http_request_duration_seconds_bucket" in response.text
+
+    @pytest.mark.asyncio
+    async def test_scrape_does_not_query_mongo(self, async_mongo):
+        async_mongo._database["runs"].insert_many([
+            {"id": "a", "timestamp": "2999-01-01T00:00:00Z"},
+            {"id": "b", "timestamp": "2000-01-01T00:00:00Z"},
+        ])
+        async_mongo._database["jobs"].insert_one({"type": "post_kestra", "status": "queued"})
+        await telemetry.refresh_business_totals(async_mongo)
+
+        transport = httpx.ASGITransport(app=app)
+        with patch("main.db", None):                       # any DB access would fail
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                text = (await client.get("/metrics")).text
+                summary = (await client.get("/metrics", params={"format": "json"})).json()
+
+        assert 'autopilot_business_total{kind="total_runs"} 2' in text
+        assert 'autopilot_business_total{kind="recent_runs_24h"} 1' in text
+        assert 'autopilot_jobs{type="post_kestra",status="queued"} 1' in text
+        assert summary["total_runs"] == 2
+        assert "providers" in summary
+
+
+class TestProviderMetrics:
+    @pytest.mark.asyncio
+    async def test_provider_calls_are_timed(self):
+        import provider_limits
+
+        limiter = provider_limits.ProviderLimiter("t_provider", 1, 6000, use_redis=False)
+        with patch.dict(provider_limits._limiters, {"t_provider": limiter}):
+            async with provider_limits.limit("t_provider"):
+                pass
+            with pytest.raises(ValueError):
+                async with provider_limits.limit("t_provider"):
+                    raise ValueError("boom")
+
+        text = telemetry.render()
+        assert 'autopilot_provider_call_duration_seconds_count{provider="t_provider",outcome="ok"} 1' in text
+        assert 'autopilot_provider_call_duration_seconds_count{provider="t_provider",outcome="error"} 1' in text
+        assert 'autopilot_provider_queue_wait_seconds_count{provider="t_provider"} 2' in text
@@ -0,0 +1,113 @@
+import httpx
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+import text_codec
+
+REPORT = "\n".join(
+    f"FAILED tests/test_mod{i % 7}.py::test_case_{i} – AssertionError: expected {i} got {i + 1}"
+    for i in range(60)
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_codec(monkeypatch):
+    """Isolate the in-process dictionary caches per test."""
+    for name in ("_dicts", "_active", "_compressors", "_decompressors"):
+        monkeypatch.setattr(text_codec, name, {})
+
+
+class TestEncode:
+    @pytest.mark.parametrize("codec", ["zlib", "zstd"])
+    def test_round_trip_with_version_marker(self, monkeypatch, codec):
+        if codec == "zstd":
+            pytest.importorskip("zstandard")
+        monkeypatch.setattr(text_codec, "TEXT_CODEC", codec)
+
+        stored = text_codec.encode(REPORT)
+
+        assert stored["_codec"] == text_codec.CODEC_VERSION and stored["alg"] == codec
+        assert stored["size"] == len(REPORT.encode()) and len(stored["data"]) < stored["size"] // 3
+        assert text_codec.decode(stored) == REPORT
+
+    def test_small_and_non_text_values_are_stored_unchanged(self):
+        assert text_codec.encode("short") == "short"
+        assert text_codec.encode(None) is None
+        assert text_codec.decode("legacy plain string") == "legacy plain string"
+        assert text_codec.decode(None) is None
+
+    def test_text_that_does_not_shrink_stays_plain(self, monkeypatch):
+        monkeypatch.setattr(text_codec, "TEXT_CODEC_MIN_BYTES", 1)
+        assert text_codec.encode("ab") == "ab"           # the frame header outweighs the saving
+
+    def test_disabled_and_unknown_versions(self, monkeypatch):
+        monkeypatch.setattr(text_codec, "TEXT_CODEC", "none")
+        assert text_codec.encode(REPORT) == REPORT
+
+        with pytest.raises(ValueError):
+            text_codec.decode({"_codec": 99, "alg": "zlib", "data": b""})
+
+
+class TestDictionaries:
+    @pytest.mark.asyncio
+    async def test_trained_dictionary_is_used_and_loaded_on_demand(self, async_mongo, monkeypatch):
+        pytest.importorskip("zstandard")
+        monkeypatch.setattr(text_codec, "TEXT_CODEC", "zstd")
+        samples = [REPORT.replace("test_case", f"test_{n}_case") for n in range(200)]
+
+        dict_id = await text_codec.save_dictionary(
+            async_mongo, "artefacts.report", text_codec.train_dictionary(samples, 8 * 1024), len(samples))
+        with_dict = text_codec.encode(samples[0], "artefacts.report")
+        plain = text_codec.encode(samples[0])
+
+        assert with_dict["dict"] == dict_id and "dict" not in plain
+        assert len(with_dict["data"]) < len(plain["data"])
+
+        # a fresh process: the dictionary is not cached yet
+        text_codec._dicts.clear()
+        text_codec._decompressors.clear()
+        with pytest.raises(text_codec.UnknownDictionary):
+            text_codec.decode(with_dict)
+        doc = await text_codec.decode_doc(async_mongo, "artefacts", {"report": with_dict, "prompt": "p"})
+        assert doc == {"report": samples[0], "prompt": "p"}
+
+        text_codec._active.clear()
+        assert await text_codec.load_dictionaries(async_mongo) == 1
+        assert text_codec._active == {"artefacts.report": dict_id}
+
+
+class TestEndpoints:
+    async def _get(self, url):
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(url)
+
+    @pytest.mark.asyncio
+    async def test_reports_read_both_compressed_and_legacy_documents(self, async_mongo):
+        raw = async_mongo._database["together_reports"]
+        raw.insert_one({"execution_id": "new", "repo_url": "r", "created_at": datetime.utcnow(),
+                        "report": text_codec.encode(REPORT, "together_reports.report")})
+        raw.insert_one({"execution_id": "old", "repo_url": "r", "created_at": datetime.utcnow(),
+                        "report": "plain old report"})
+
+        with patch("main.db", async_mongo):
+            new, old = await self._get("/api/together-ai/report/new"), await self._get("/api/together-ai/report/old")
+
+        assert new.json()["report"] == REPORT
+        assert old.json()["report"] == "plain old report"
+
+    @pytest.mark.asyncio
+    async def test_cline_status_decodes_output(self, async_mongo):
+        async_mongo._database["cline_executions"].insert_one({
+            "execution_id": "cline_1", "repo_url": "r", "status": "completed",
+            "output": text_codec.encode(REPORT, "cline_executions.output"), "error": None,
+            "bug_report": text_codec.encode(REPORT, "cline_executions.bug_report"),
+        })
+
+        with patch("main.db", async_mongo):
+            body = (await self._get("/api/cline/status/cline_1")).json()
+
+        assert body["output"] == REPORT and body["error"] is None
@@ -0,0 +1,201 @@
+"""Transparent compression for large text fields stored in MongoDB.
+
+Reports and agent logs compress to a fraction of their size, and keeping
+them compressed shrinks the documents Mongo has to hold in its cache and
+send over the wire.  Fields listed in ``COMPRESSED_FIELDS`` are
+encoded on write and decoded on read:
+
+* strings shorter than ``TEXT_CODEC_MIN_BYTES`` (or that do not shrink) are
+  stored unchanged;
+* anything else becomes a sub-document carrying a version marker::
+
+      {"_codec": 1, "alg": "zstd", "dict": 123456, "size": 48213, "data": Binary(...)}
+
+Plain strings are always read back as-is, so documents written before this
+module existed keep working, and ``backfill_text_codec.py`` can compress
+them in place later.
+
+``zstd`` is used when the optional ``zstandard`` package is installed,
+otherwise stdlib ``zlib`` (and ``TEXT_CODEC=none`` disables compression).
+With zstd, a dictionary trained on a field's existing values
+(``backfill_text_codec.py --train``) helps most on the many small,
+similar documents (Cline errors, short reports).  Dictionaries live in the
+``codec_dicts`` collection and are cached in-process.  Call
+:func:`load_dictionaries` at start-up; :func:`decode_doc` fetches any that
+are missing on demand.  ``bench_text_codec.py`` measures the size and CPU
+trade-offs on a real corpus.
+"""
+
+import logging
+import os
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import Binary
+
+try:                                              # zstd is optional; zlib is the fallback
+    import zstandard
+except ImportError:                               # pragma: no cover
+    zstandard = None
+
+CODEC_VERSION = 1
+TEXT_CODEC = os.getenv("TEXT_CODEC", "zstd")      # zstd | zlib | none
+TEXT_CODEC_LEVEL = int(os.getenv("TEXT_CODEC_LEVEL", "3"))
+TEXT_CODEC_MIN_BYTES = int(os.getenv("TEXT_CODEC_MIN_BYTES", "512"))
+CODEC_DICT_COLLECTION = "codec_dicts"
+
+# collection -> text fields stored through the codec
+COMPRESSED_FIELDS: Dict[str, tuple] = {
+    "artefacts": ("report",),
+    "together_reports": ("report",),
+    "cline_executions": ("output", "error", "bug_report"),
+}
+
+_dicts: Dict[int, Any] = {}                       # dict id -> zstandard.ZstdCompressionDict
+_active: Dict[str, int] = {}                      # "collection.field" -> dict id used for writes
+_compressors: Dict[tuple, Any] = {}
+_decompressors: Dict[Optional[int], Any] = {}
+
+
+class UnknownDictionary(LookupError):
+    """A value was compressed with a dictionary that is not loaded."""
+
+    def __init__(self, dict_id: int):
+        super().__init__(f"compression dictionary {dict_id} is not loaded")
+        self.dict_id = dict_id
+
+
+def algorithm() -> str:
+    """The algorithm new values are written with."""
+    if TEXT_CODEC == "none":
+        return "none"
+    if TEXT_CODEC == "zstd" and zstandard is None:
+        return "zlib"
+    return TEXT_CODEC
+
+
+def is_encoded(value: Any) -> bool:
+    return isinstance(value, dict) and "_codec" in value
+
+
+def _compressor(level: int, dict_id: Optional[int]):
+    key = (level, dict_id)
+    if key not in _compressors:
+        _compressors[key] = zstandard.ZstdCompressor(
+            level=level, dict_data=_dicts[dict_id] if dict_id else None, write_content_size=True
+        )
+    return _compressors[key]
+
+
+def _decompressor(dict_id: Optional[int]):
+    if dict_id not in _decompressors:
+        if dict_id and dict_id not in _dicts:
+            raise UnknownDictionary(dict_id)
+        _decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=_dicts[dict_id] if dict_id else None)
+    return _decompressors[dict_id]
+
+
+def compress(raw: bytes, alg: str, level: int = TEXT_CODEC_LEVEL, dict_id: Optional[int] = None) -> bytes:
+    if alg == "zstd":
+        return _compressor(level, dict_id).compress(raw)
+    if alg == "zlib":
+        return zlib.compress(raw, min(level, 9))
+    raise ValueError(f"unknown compression algorithm {alg!r}")
+
+
+def decompress(data: bytes, alg: str, dict_id: Optional[int] = None) -> bytes:
+    if alg == "zstd":
+        if zstandard is None:
+            raise RuntimeError("value is zstd-compressed but the zstandard package is not installed")
+        return _decompressor(dict_id).decompress(data)
+    if alg == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"unknown compression algorithm {alg!r}")
+
+
+def encode(text: Optional[str], family: Optional[str] = None) -> Any:
+    """The stored form of ``text`` (``family`` is ``"collection.field"``, for its dictionary)."""
+    if not isinstance(text, str):
+        return text
+    alg = algorithm()
+    raw = text.encode("utf-8")
+    if alg == "none" or len(raw) < TEXT_CODEC_MIN_BYTES:
+        return text
+    dict_id = _active.get(family) if alg == "zstd" else None
+    data = compress(raw, alg, TEXT_CODEC_LEVEL, dict_id)
+    if len(data) >= len(raw):
+        return text
+    value = {"_codec": CODEC_VERSION, "alg": alg, "size": len(raw), "data": Binary(data)}
+    if dict_id:
+        value["dict"] = dict_id
+    return value
+
+
+def decode(value: Any) -> Any:
+    """The text behind a stored value; plain strings (legacy documents) pass through."""
+    if not is_encoded(value):
+        return value
+    if value["_codec"] != CODEC_VERSION:
+        raise ValueError(f"unsupported text codec version {value['_codec']!r}")
+    return decompress(bytes(value["data"]), value["alg"], value.get("dict")).decode("utf-8")
+
+
+async def decode_doc(db, collection: str, doc: Optional[dict]) -> Optional[dict]:
+    """Decode ``doc``'s compressed fields in place, loading unknown dictionaries first."""
+    if not doc:
+        return doc
+    for key in COMPRESSED_FIELDS.get(collection, ()):
+        value = doc.get(key)
+        if not is_encoded(value):
+            continue
+        if value.get("dict") and value["dict"] not in _dicts:
+            await load_dictionaries(db, [value["dict"]])
+        doc[key] = decode(value)
+    return doc
+
+
+# ----------------------------------------------------------------------
+# Trained dictionaries (zstd only)
+# ----------------------------------------------------------------------
+def _register(doc: dict) -> None:
+    _dicts[doc["_id"]] = zstandard.ZstdCompressionDict(bytes(doc["data"]))
+    _decompressors.pop(doc["_id"], None)
+
+
+async def load_dictionaries(db, ids: Optional[Iterable[int]] = None) -> int:
+    """Cache dictionaries from ``codec_dicts`` (all, or just ``ids``). Returns how many loaded.
+
+    Without ``ids`` this also selects the newest dictionary of each field
+    for new writes.
+    """
+    if zstandard is None:
+        return 0
+    query = {"_id": {"$in": list(ids)}} if ids is not None else {}
+    loaded = 0
+    async for doc in db[CODEC_DICT_COLLECTION].find(query).sort("created_at", 1):
+        _register(doc)
+        if ids is None:
+            _active[doc["family"]] = doc["_id"]
+        loaded += 1
+    return loaded
+
+
+def train_dictionary(samples: List[str], size: int = 64 * 1024) -> bytes:
+    """A zstd dictionary of at most ``size`` bytes trained on ``samples``."""
+    if zstandard is None:
+        raise RuntimeError("training a dictionary needs the zstandard package")
+    trained = zstandard.train_dictionary(size, [s.encode("utf-8") for s in samples])
+    return trained.as_bytes()
+
+
+async def save_dictionary(db, family: str, data: bytes, samples: int = 0) -> int:
+    """Store a trained dictionary and use it for new writes to ``family``. Returns its id."""
+    dict_id = zstandard.ZstdCompressionDict(data).dict_id()
+    doc = {"_id": dict_id, "family": family, "data": Binary(data),
+           "samples": samples, "created_at": datetime.utcnow()}
+    await db[CODEC_DICT_COLLECTION].replace_one({"_id": dict_id}, doc, upsert=True)
+    _register(doc)
+    _active[family] = dict_id
+    logging.info(f"Compression dictionary {dict_id} ({len(data)} bytes) active for {family}")
+    return dict_id
@@ -1,5 +1,6 @@
 import os
-import httpx
+
+from http_clients import get_client
 
 SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK")
 HEYGEN_API_KEY = os.getenv("HEYGEN_API_KEY")
@@ -14,8 +15,7 @@ async def handle_kestra_webhook(data: dict):
     
     # 1. Send Slack Notification
     if SLACK_WEBHOOK:
-        async with httpx.AsyncClient() as client:
-            await client.post(SLACK_WEBHOOK, json={"text": message})
+        await get_client("slack").post(SLACK_WEBHOOK, json={"text": message})
             
     # 2. Trigger Video Generation (Stub)
     video_url = await generate_video_summary(repo, status)
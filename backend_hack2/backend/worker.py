@@ -0,0 +1,157 @@
+"""Background worker process: runs the jobs the API enqueues.
+
+Usage:
+    python worker.py
+
+Per-type concurrency comes from ``JOB_CONCURRENCY`` (for example
+``post_kestra=2,cline=1``).  Scale throughput by starting more worker
+processes – each one leases jobs independently from the ``jobs`` collection.
+"""
+
+import asyncio
+import os
+import signal
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import cline_runner
+import http_clients
+import job_queue
+import kestra_outputs
+import telemetry
+import text_codec
+from job_queue import POST_KESTRA_JOB, CLINE_JOB, KESTRA_OUTPUTS_JOB
+from agents import process_kestra_completion
+from database import db, ping_db
+from logging_config import setup_logging
+
+DEFAULT_CONCURRENCY = f"{POST_KESTRA_JOB}=2,{CLINE_JOB}=2,{KESTRA_OUTPUTS_JOB}=4"
+# Prometheus scrape port for job and provider metrics (0 disables it)
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
+
+# ----------------------------------------------------------------------
+# Post-Kestra video generation
+# ----------------------------------------------------------------------
+async def _post_kestra_dead(payload: dict, error: str) -> None:
+    await db["runs"].update_one(
+        {"id": payload["execution_id"]},
+        {"$set": {"status": "VIDEO_FAILED", "error": error}},
+    )
+
+
+@job_queue.handler(POST_KESTRA_JOB, on_dead=_post_kestra_dead)
+async def run_post_kestra(payload: dict) -> dict:
+    exec_id = payload["execution_id"]
+    await db["runs"].update_one({"id": exec_id}, {"$set": {"status": "VIDEO_GENERATING"}})
+
+    # A previous attempt may have stored the artefact before dying.
+    existing = await db["artefacts"].find_one({"session": exec_id, "status": "READY"}, {"_id": 1})
+    if existing:
+        result = {"message": "✅ Autopilot finished – video & report ready",
+                  "artefact_id": str(existing["_id"])}
+    else:
+        result = await process_kestra_completion(
+            repo_url=payload["repo_url"],
+            execution_id=exec_id,
+            user_email=payload["user_email"],
+            db=db,
+        )
+    # Store the result back onto the run document
+    await db["runs"].update_one(
+        {"id": exec_id},
+        {"$set": {
+            "status": "VIDEO_READY",
+            "completion_message": result["message"],
+            "artefact_id": result["artefact_id"],
+        }},
+    )
+    return result
+
+
+# ----------------------------------------------------------------------
+# Kestra outputs (fetched by reference)
+# ----------------------------------------------------------------------
+@job_queue.handler(KESTRA_OUTPUTS_JOB)
+async def run_kestra_outputs(payload: dict) -> dict:
+    fields = await kestra_outputs.store_outputs(db, payload["execution_id"], payload["outputs"])
+    return {"stored": sorted(k for k in fields if k != "outputs_failed"),
+            "failed": fields.get("outputs_failed", [])}
+
+
+# ----------------------------------------------------------------------
+# Cline AI agent
+# ----------------------------------------------------------------------
+async def _cline_dead(payload: dict, error: str) -> None:
+    await db["cline_executions"].update_one(
+        {"execution_id": payload["execution_id"]},
+        {"$set": {"status": "failed", "error": error, "completed_at": datetime.utcnow()}},
+    )
+
+
+@job_queue.handler(CLINE_JOB, on_dead=_cline_dead)
+async def run_cline(payload: dict) -> dict:
+    execution_id = payload["execution_id"]
+    env = os.environ.copy()
+    env["REPO_URL"] = payload["repo_url"]
+    env["EXECUTION_ID"] = execution_id            # names the agent's worktree
+    env["GITHUB_TOKEN"] = payload.get("github_token") or ""
+    env["BUG_REPORT"] = payload.get("bug_report", "")
+
+    # Streams output into the cline_executions document while it runs;
+    # capped, time-limited and cancellable (see cline_runner).
+    result = await cline_runner.run_agent(db["cline_executions"], execution_id, env)
+
+    error = None
+    if result.status == "timeout":
+        error = f"Timed out after {cline_runner.CLINE_TIMEOUT:.0f}s"
+    elif result.status != "completed":
+        error = result.stderr or None
+    await db["cline_executions"].update_one(
+        {"execution_id": execution_id},
+        {
+            "$set": {
+                "status": result.status,
+                "output": text_codec.encode(result.stdout, "cline_executions.output"),
+                "error": text_codec.encode(error, "cline_executions.error"),
+                "returncode": result.returncode,
+                "duration": result.duration,
+                "completed_at": datetime.utcnow(),
+            }
+        }
+    )
+    return {"status": result.status, "returncode": result.returncode}
+
+
+# ----------------------------------------------------------------------
+# Entry-point
+# ----------------------------------------------------------------------
+async def main():
+    setup_logging(os.getenv("LOG_LEVEL", "INFO"))
+    await ping_db()
+    await text_codec.load_dictionaries(db)
+    worker = job_queue.Worker(
+        db,
+        job_queue.parse_concurrency(os.getenv("JOB_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await http_clients.open_clients()
+    metrics_server = None
+    if WORKER_METRICS_PORT:
+        metrics_server = await telemetry.serve(WORKER_METRICS_PORT)
+    try:
+        await worker.run(stop)
+    finally:
+        if metrics_server:
+            metrics_server.close()
+        await http_clients.close_clients()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+"""Test impact analysis for scan-repo.
+
+A full scan runs pytest under coverage with per-test contexts and records
+which source files each test executed.  An incremental scan diffs the new
+commit against the last scanned one and runs only the tests that touch a
+changed file, plus the tests that failed last time.  Every
+``SCAN_FULL_EVERY`` scans (or whenever the map cannot be trusted) it falls
+back to a full run.
+
+State lives in ``state.json`` in a per repo/branch directory on the cache
+volume::
+
+    {"map_commit": sha, "last_commit": sha, "runs_since_full": n,
+     "failed": [nodeid, ...], "tests": {nodeid: [file, ...]}}
+
+Usage (from the cloned repo)::
+
+    python impact.py select STATE HEAD_SHA OUT_FILE   # prints full|incremental|none
+    python impact.py run SELECTED_FILE [pytest args...]
+    python impact.py record STATE HEAD_SHA [--coverage FILE]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+SCAN_FULL_EVERY = int(os.getenv("SCAN_FULL_EVERY", "20"))
+
+# Changes to these can affect any test – always run everything.
+GLOBAL_FILES = ("conftest.py", "pytest.ini", "tox.ini", "setup.cfg", "setup.py", "pyproject.toml")
+GLOBAL_PREFIXES = ("requirements",)
+
+
+def load_state(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}"
+    with open(tmp, "w") as handle:
+        json.dump(state, handle)
+    os.replace(tmp, path)
+
+
+def changed_files(base, head):
+    """Paths changed between ``base`` and ``head`` (fetching ``base`` into the shallow clone).
+
+    Renames are listed as a deletion plus an addition, so tests mapped to
+    the old path are still selected.
+    """
+    subprocess.run(["git", "fetch", "-q", "--depth", "1", "origin", base], check=True)
+    out = subprocess.run(
+        ["git", "diff", "--name-only", "--no-renames", base, head], check=True, capture_output=True, text=True
+    ).stdout
+    return [line for line in out.splitlines() if line]
+
+
+def is_test_file(path):
+    name = os.path.basename(path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def is_global(path):
+    name = os.path.basename(path)
+    return name in GLOBAL_FILES or name.startswith(GLOBAL_PREFIXES)
+
+
+def impacted(state, changed):
+    """Node ids to run for ``changed`` files, or None if everything must run."""
+    if any(is_global(path) for path in changed):
+        return None
+    by_file = {}
+    for nodeid, files in state["tests"].items():
+        for path in files:
+            by_file.setdefault(path, set()).add(nodeid)
+    selected = set()
+    for path in changed:
+        selected |= by_file.get(path, set())
+        if is_test_file(path) and os.path.exists(path):
+            selected.add(path)                  # new or edited test module: run all of it
+    selected |= set(state.get("failed", []))
+    # drop tests whose module no longer exists
+    return sorted(n for n in selected if os.path.exists(n.split("::", 1)[0]))
+
+
+def select(state_path, head, out_path):
+    state = load_state(state_path)
+    mode, reason, nodeids = "full", "", []
+    if not state.get("tests"):
+        reason = "no impact map yet"
+    elif state.get("runs_since_full", 0) + 1 >= SCAN_FULL_EVERY:
+        reason = f"periodic full run (every {SCAN_FULL_EVERY})"
+    elif state.get("last_commit") == head and not state.get("failed"):
+        mode, reason = "none", "commit already scanned"
+    else:
+        try:
+            changed = changed_files(state["last_commit"], head)
+        except (subprocess.CalledProcessError, KeyError) as exc:
+            changed, reason = None, f"cannot diff against last scan ({exc})"
+        if changed is not None:
+            nodeids = impacted(state, changed)
+            if nodeids is None:
+                reason = "test configuration or requirements changed"
+            else:
+                mode = "incremental" if nodeids else "none"
+                reason = f"{len(changed)} changed file(s) → {len(nodeids)} test(s)"
+    with open(out_path, "w") as handle:
+        handle.write("\n".join(nodeids))
+    print(f"🎯 Test selection: {mode} – {reason}", file=sys.stderr)
+    print(mode)
+
+
+def run(selected_path, extra):
+    import pytest
+
+    with open(selected_path) as handle:
+        nodeids = [line for line in handle.read().splitlines() if line]
+    sys.exit(pytest.main(nodeids + extra))
+
+
+def failed_tests(cache_dir=".pytest_cache"):
+    """Node ids that failed in the pytest run that just finished (its lastfailed cache)."""
+    try:
+        with open(os.path.join(cache_dir, "v", "cache", "lastfailed")) as handle:
+            return sorted(json.load(handle))
+    except (OSError, ValueError):
+        return []
+
+
+def coverage_map(coverage_path):
+    """{nodeid: [file, ...]} from a coverage file recorded with ``--cov-context=test``."""
+    from coverage import CoverageData
+
+    data = CoverageData(basename=coverage_path)
+    data.read()
+    root = os.getcwd()
+    tests = {}
+    for measured in data.measured_files():
+        rel = os.path.relpath(measured, root)
+        if rel.startswith(".."):
+            continue                            # site-packages etc.
+        for contexts in data.contexts_by_lineno(measured).values():
+            for context in contexts:
+                if not context:
+                    continue
+                nodeid = context.rsplit("|", 1)[0]
+                tests.setdefault(nodeid, set()).add(rel)
+    return {nodeid: sorted(files) for nodeid, files in tests.items()}
+
+
+def record(state_path, head, coverage_path=None):
+    state = load_state(state_path)
+    if coverage_path:
+        state.update(tests=coverage_map(coverage_path), map_commit=head, runs_since_full=0)
+    else:
+        state["runs_since_full"] = state.get("runs_since_full", 0) + 1
+    state["last_commit"] = head
+    state["failed"] = failed_tests()
+    save_state(state_path, state)
+
+
+def main(argv):
+    command, args = argv[0], argv[1:]
+    if command == "select":
+        select(*args)
+    elif command == "run":
+        run(args[0], args[1:])
+    elif command == "record":
+        coverage_path = None
+        if "--coverage" in args:
+            i = args.index("--coverage")
+            coverage_path = args[i + 1]
+            args = args[:i] + args[i + 2:]
+        record(*args, coverage_path=coverage_path)
+    else:
+        sys.exit(f"unknown command {command}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,167 @@
+"""Compact failure summary from pytest's JUnit XML.
+
+Raw pytest console output can run to megabytes, and all of it used to be
+inlined into the agent's ``BUG_REPORT`` and the webhook body.  This turns
+``junit.xml`` (written with ``-o junit_family=xunit1`` so test cases carry
+``file``/``line``) into:
+
+* ``summary.json`` – totals plus one entry per failure: test id, exception
+  type, message, location and a trimmed traceback;
+* ``bug_report.txt`` – the same, rendered as text for the LLM prompt.
+
+Both stay within ``REPORT_MAX_CHARS``.  Failures that do not fit are counted
+in ``omitted``.  Without a JUnit file (pytest crashed, or no tests ran) the
+tail of the raw log is used instead.
+
+Usage::
+
+    python report.py JUNIT_XML RAW_REPORT OUT_DIR EXIT_CODE [SELECTION]
+"""
+
+import json
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+REPORT_MAX_CHARS = int(os.getenv("REPORT_MAX_CHARS", "6000"))
+REPORT_TRACEBACK_LINES = int(os.getenv("REPORT_TRACEBACK_LINES", "12"))
+REPORT_MESSAGE_CHARS = 300
+
+# "tests/test_x.py:12: AssertionError" – pytest's crash location line
+_LOCATION = re.compile(r"^(?P<file>[^\s:][^:]*):(?P<line>\d+): (?P<type>[A-Za-z_][\w.]*)$")
+_EXC_TYPE = re.compile(r"^(?P<type>[A-Za-z_][\w.]*(Error|Exception|Exit|Failed|Interrupt|Warning)|AssertionError)\b")
+
+
+def _test_id(case):
+    path = case.get("file") or ""
+    classname = case.get("classname", "")
+    module = path[:-3].replace("/", ".") if path.endswith(".py") else ""
+    cls = classname[len(module) + 1:] if module and classname.startswith(module + ".") else ""
+    if not path:
+        path = classname.replace(".", "/") + ".py"
+    return "::".join(p for p in (path, cls, case.get("name", "")) if p)
+
+
+def _failure(case, node, kind):
+    text = (node.text or "").rstrip()
+    lines = text.splitlines()
+    message = (node.get("message") or "").strip()
+    entry = {"test": _test_id(case), "kind": kind, "type": None, "message": "", "file": None, "line": None}
+
+    for raw in reversed(lines):
+        match = _LOCATION.match(raw.strip())
+        if match:
+            entry.update(file=match["file"], line=int(match["line"]), type=match["type"])
+            break
+    if entry["type"] is None:
+        match = _EXC_TYPE.match(message)
+        entry["type"] = match["type"] if match else node.get("type") or kind
+    if entry["file"] is None and case.get("file"):
+        entry.update(file=case.get("file"), line=int(case.get("line", 0)) + 1)
+
+    first = message.splitlines()[0] if message else ""
+    if first.startswith(f"{entry['type']}: "):
+        first = first[len(entry["type"]) + 2:]
+    entry["message"] = first[:REPORT_MESSAGE_CHARS]
+    # the end of the traceback is where the error surfaced; blank lines and
+    # the crash-location line (already in file/line) are dropped
+    body = [l for l in lines if l.strip() and not _LOCATION.match(l.strip())]
+    entry["traceback"] = "\n".join(body[-REPORT_TRACEBACK_LINES:])
+    return entry
+
+
+def parse_junit(path):
+    """(totals, failures) from a JUnit XML file."""
+    root = ET.parse(path).getroot()
+    suites = [root] if root.tag == "testsuite" else list(root.iter("testsuite"))
+    totals = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0, "time": 0.0}
+    for suite in suites:
+        for key in ("tests", "failures", "errors", "skipped"):
+            totals[key] += int(suite.get(key, 0))
+        totals["time"] += float(suite.get("time", 0))
+    totals["time"] = round(totals["time"], 2)
+    totals["passed"] = totals["tests"] - totals["failures"] - totals["errors"] - totals["skipped"]
+
+    failures = []
+    for case in root.iter("testcase"):
+        for kind in ("failure", "error"):
+            node = case.find(kind)
+            if node is not None:
+                failures.append(_failure(case, node, kind))
+    return totals, failures
+
+
+def render(entry):
+    location = f"{entry['file']}:{entry['line']}" if entry["file"] else "unknown location"
+    head = f"FAILED {entry['test']} – {entry['type']}: {entry['message']}".rstrip(": ")
+    return f"{head}\n  at {location}\n" + "\n".join("    " + l for l in entry["traceback"].splitlines())
+
+
+def _omitted_note(count):
+    return f"\n\n… and {count} more failure(s) not shown"
+
+
+def summarise(totals, failures, exit_code, selection="full", budget=None):
+    """(summary dict, text) with as many failures as fit in ``budget`` characters."""
+    budget = REPORT_MAX_CHARS if budget is None else budget
+    header = (f"Tests: {totals['tests']} run, {totals['passed']} passed, {totals['failures']} failed, "
+              f"{totals['errors']} errors, {totals['skipped']} skipped in {totals['time']}s "
+              f"(selection: {selection}, exit code {exit_code})")
+    if not failures:
+        header += "\nNo test failures detected." if totals["tests"] else "\nNo tests found in repository."
+    summary = {"totals": totals, "exit_code": exit_code, "selection": selection, "failures": [], "omitted": 0}
+    text = header
+    used = len(json.dumps(summary)) + len(str(len(failures)))      # room for the final "omitted"
+    for i, entry in enumerate(failures):
+        block = render(entry)
+        cost = max(len(block), len(json.dumps(entry))) + 2
+        # keep room for the "… more not shown" line in case the next one does not fit
+        rest = len(failures) - i - 1
+        note = len(_omitted_note(rest)) if rest else 0
+        if used + cost > budget or len(text) + cost + note > budget:
+            summary["omitted"] = len(failures) - i
+            text += _omitted_note(summary["omitted"])
+            break
+        summary["failures"].append(entry)
+        text += "\n\n" + block
+        used += cost
+    return summary, text
+
+
+def fallback(raw_path, exit_code, selection, budget=None):
+    """Summary from the raw log when there is no JUnit file."""
+    budget = REPORT_MAX_CHARS if budget is None else budget
+    try:
+        with open(raw_path, errors="replace") as handle:
+            raw = handle.read()
+    except OSError:
+        raw = ""
+    limit = budget - 200
+    tail = raw[-limit:] if len(raw) > limit else raw
+    while len(json.dumps(tail)) > limit:            # escaped newlines/non-ASCII grow in summary.json
+        tail = tail[len(json.dumps(tail)) - limit:]
+    if selection == "none":
+        text = "No tests impacted by this change."
+    else:
+        text = f"Test run produced no JUnit report (selection: {selection}, exit code {exit_code}).\n{tail}"
+    return {"totals": None, "exit_code": exit_code, "selection": selection,
+            "failures": [], "omitted": 0, "log_tail": tail}, text
+
+
+def main(junit_path, raw_path, out_dir, exit_code, selection="full"):
+    exit_code = int(exit_code)
+    try:
+        totals, failures = parse_junit(junit_path)
+        summary, text = summarise(totals, failures, exit_code, selection)
+    except (OSError, ET.ParseError):
+        summary, text = fallback(raw_path, exit_code, selection)
+    with open(os.path.join(out_dir, "summary.json"), "w") as handle:
+        json.dump(summary, handle)
+    with open(os.path.join(out_dir, "bug_report.txt"), "w") as handle:
+        handle.write(text + "\n")
+    print(text.splitlines()[0])
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,226 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+import impact
+
+
+def _touch(root, *paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text("")
+
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    """A cloned repo with two source files and two test modules, as the cwd."""
+    _touch(tmp_path, "app/core.py", "app/util.py", "tests/test_core.py", "tests/test_util.py")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _state(**extra):
+    state = {
+        "last_commit": "aaa",
+        "runs_since_full": 0,
+        "failed": [],
+        "tests": {
+            "tests/test_core.py::test_parse": ["app/core.py"],
+            "tests/test_core.py::TestCore::test_both": ["app/core.py", "app/util.py"],
+            "tests/test_util.py::test_join": ["app/util.py"],
+        },
+    }
+    state.update(extra)
+    return state
+
+
+def _git(*args, cwd):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class TestState:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "impact" / "abc" / "state.json")
+        impact.save_state(path, _state())
+
+        assert impact.load_state(path) == _state()
+        assert os.listdir(os.path.dirname(path)) == ["state.json"]      # temp file replaced
+
+    def test_missing_or_corrupt_state_is_empty(self, tmp_path):
+        corrupt = tmp_path / "state.json"
+        corrupt.write_text("{not json")
+
+        assert impact.load_state(str(tmp_path / "missing.json")) == {}
+        assert impact.load_state(str(corrupt)) == {}
+
+
+class TestImpacted:
+    def test_selects_tests_covering_changed_files(self, checkout):
+        assert impact.impacted(_state(), ["app/util.py", "README.md"]) == [
+            "tests/test_core.py::TestCore::test_both",
+            "tests/test_util.py::test_join",
+        ]
+
+    @pytest.mark.parametrize("path", ["conftest.py", "tests/conftest.py", "pyproject.toml",
+                                      "requirements-dev.txt"])
+    def test_global_file_forces_full_run(self, checkout, path):
+        assert impact.impacted(_state(), ["app/core.py", path]) is None
+
+    def test_reruns_last_failures(self, checkout):
+        state = _state(failed=["tests/test_util.py::test_join"])
+
+        assert impact.impacted(state, ["app/core.py"]) == [
+            "tests/test_core.py::TestCore::test_both",
+            "tests/test_core.py::test_parse",
+            "tests/test_util.py::test_join",
+        ]
+
+    def test_changed_test_module_runs_whole_module(self, checkout):
+        _touch(checkout, "tests/test_new.py")
+
+        assert impact.impacted(_state(), ["tests/test_new.py"]) == ["tests/test_new.py"]
+
+    def test_drops_deleted_modules(self, checkout):
+        state = _state(failed=["tests/test_gone.py::test_old"])
+        state["tests"]["tests/test_gone.py::test_old"] = ["app/core.py"]
+
+        selected = impact.impacted(state, ["app/core.py", "tests/test_removed.py"])
+
+        assert selected == ["tests/test_core.py::TestCore::test_both", "tests/test_core.py::test_parse"]
+
+
+class TestSelect:
+    def _select(self, tmp_path, capsys, state, head="bbb"):
+        state_path, out_path = tmp_path / "state.json", tmp_path / "selected.txt"
+        if state is not None:
+            impact.save_state(str(state_path), state)
+        impact.select(str(state_path), head, str(out_path))
+        return capsys.readouterr().out.strip(), out_path.read_text().splitlines()
+
+    def test_full_without_a_map(self, tmp_path, capsys):
+        assert self._select(tmp_path, capsys, None) == ("full", [])
+
+    def test_periodic_full_run(self, checkout, capsys, monkeypatch):
+        monkeypatch.setattr(impact, "SCAN_FULL_EVERY", 5)
+        monkeypatch.setattr(impact, "changed_files", lambda base, head: pytest.fail("should not diff"))
+
+        assert self._select(checkout, capsys, _state(runs_since_full=4)) == ("full", [])
+
+        monkeypatch.setattr(impact, "changed_files", lambda base, head: ["app/util.py"])
+        assert self._select(checkout, capsys, _state(runs_since_full=3))[0] == "incremental"
+
+    def test_commit_already_scanned(self, checkout, capsys, monkeypatch):
+        monkeypatch.setattr(impact, "changed_files", lambda base, head: pytest.fail("should not diff"))
+
+        assert self._select(checkout, capsys, _state(), head="aaa") == ("none", [])
+
+    def test_same_commit_with_failures_reruns_them(self, checkout, capsys, monkeypatch):
+        monkeypatch.setattr(impact, "changed_files", lambda base, head: [])
+        state = _state(failed=["tests/test_util.py::test_join"])
+
+        assert self._select(checkout, capsys, state, head="aaa") == (
+            "incremental", ["tests/test_util.py::test_join"])
+
+    def test_incremental(self, checkout, capsys, monkeypatch):
+        monkeypatch.setattr(impact, "changed_files", lambda base, head: ["app/core.py"])
+
+        assert self._select(checkout, capsys, _state()) == (
+            "incremental", ["tests/test_core.py::TestCore::test_both", "tests/test_core.py::test_parse"])
+
+    def test_nothing_impacted(self, checkout, capsys, monkeypatch):
+        monkeypatch.setattr(impact, "changed_files", lambda base, head: ["README.md"])
+
+        assert self._select(checkout, capsys, _state()) == ("none", [])
+
+    def test_full_when_diff_fails(self, checkout, capsys, monkeypatch):
+        def changed_files(base, head):
+            raise subprocess.CalledProcessError(128, ["git", "fetch"])
+        monkeypatch.setattr(impact, "changed_files", changed_files)
+
+        assert self._select(checkout, capsys, _state()) == ("full", [])
+
+
+class TestChangedFiles:
+    def test_diffs_against_commit_missing_from_shallow_clone(self, tmp_path, monkeypatch):
+        for key in ("AUTHOR", "COMMITTER"):
+            monkeypatch.setenv(f"GIT_{key}_NAME", "scan")
+            monkeypatch.setenv(f"GIT_{key}_EMAIL", "scan@example.com")
+        origin = tmp_path / "origin"
+        _touch(origin, "app/core.py", "app/util.py", "docs/old.md")
+        (origin / "app" / "util.py").write_text("def join(*parts):\n    return '/'.join(parts)\n")
+        _git("init", "-q", cwd=origin)
+        _git("add", ".", cwd=origin)
+        _git("commit", "-q", "-m", "base", cwd=origin)
+        base = _git("rev-parse", "HEAD", cwd=origin)
+        (origin / "app" / "core.py").write_text("x = 1\n")
+        (origin / "docs" / "old.md").unlink()
+        _touch(origin, "tests/test_core.py")
+        _git("mv", "app/util.py", "app/paths.py", cwd=origin)
+        _git("add", "-A", cwd=origin)
+        _git("commit", "-q", "-m", "change", cwd=origin)
+
+        clone = tmp_path / "clone"
+        _git("clone", "-q", "--depth", "1", origin.as_uri(), str(clone), cwd=tmp_path)
+        monkeypatch.chdir(clone)
+
+        # a rename lists both paths, so tests mapped to the old one still run
+        assert sorted(impact.changed_files(base, "HEAD")) == [
+            "app/core.py", "app/paths.py", "app/util.py", "docs/old.md", "tests/test_core.py"]
+
+    def test_unknown_commit_raises(self, tmp_path, monkeypatch):
+        _git("init", "-q", cwd=tmp_path)
+        monkeypatch.chdir(tmp_path)
+
+        with pytest.raises(subprocess.CalledProcessError):
+            impact.changed_files("0" * 40, "HEAD")
+
+
+class TestRecord:
+    def _lastfailed(self, root, nodeids):
+        cache = root / ".pytest_cache" / "v" / "cache"
+        cache.mkdir(parents=True)
+        (cache / "lastfailed").write_text(json.dumps({n: True for n in nodeids}))
+
+    def test_incremental_run_keeps_map(self, checkout):
+        state_path = str(checkout / "state" / "state.json")
+        impact.save_state(state_path, _state(runs_since_full=2))
+        self._lastfailed(checkout, ["tests/test_util.py::test_join"])
+
+        impact.record(state_path, "bbb")
+
+        state = impact.load_state(state_path)
+        assert state["tests"] == _state()["tests"]
+        assert state["runs_since_full"] == 3
+        assert state["last_commit"] == "bbb"
+        assert state["failed"] == ["tests/test_util.py::test_join"]
+
+    def test_full_run_records_coverage_map(self, checkout, tmp_path_factory):
+        coverage = pytest.importorskip("coverage")
+        outside = tmp_path_factory.mktemp("site-packages") / "lib.py"
+        outside.write_text("")
+        data = coverage.CoverageData(basename=str(checkout / ".coverage"))
+        data.set_context("")
+        data.add_lines({str(checkout / "app" / "core.py"): [1]})         # import-time, no test
+        data.set_context("tests/test_core.py::test_parse|run")
+        data.add_lines({str(checkout / "app" / "core.py"): [1, 2], str(outside): [1]})
+        data.set_context("tests/test_core.py::TestCore::test_both|setup")
+        data.add_lines({str(checkout / "app" / "util.py"): [3]})
+        data.set_context("tests/test_core.py::TestCore::test_both|run")
+        data.add_lines({str(checkout / "app" / "core.py"): [2]})
+        data.write()
+
+        state_path = str(checkout / "state" / "state.json")
+        impact.save_state(state_path, _state(runs_since_full=7, failed=["tests/test_util.py::test_join"]))
+        impact.record(state_path, "ccc", coverage_path=str(checkout / ".coverage"))
+
+        state = impact.load_state(state_path)
+        assert state["tests"] == {
+            "tests/test_core.py::test_parse": ["app/core.py"],
+            "tests/test_core.py::TestCore::test_both": ["app/core.py", "app/util.py"],
+        }
+        assert state["map_commit"] == state["last_commit"] == "ccc"
+        assert state["runs_since_full"] == 0
+        assert state["failed"] == []
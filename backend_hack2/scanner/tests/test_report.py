@@ -0,0 +1,199 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import report
+
+SAMPLE_TESTS = '''
+import pytest
+
+
+@pytest.fixture
+def db():
+    raise RuntimeError("database is down")
+
+
+class TestMath:
+    def test_ok(self):
+        assert 1 + 1 == 2
+
+    def test_div(self):
+        assert 1 / 0
+
+
+@pytest.mark.parametrize("a,b", [(1, 2), (2, 3)])
+def test_add(a, b):
+    assert a + 1 == 2
+
+
+def test_uses_db(db):
+    pass
+
+
+@pytest.mark.skip
+def test_skipped():
+    pass
+'''
+
+
+@pytest.fixture(scope="module")
+def junit(tmp_path_factory):
+    """junit.xml from a real xunit1 pytest run, as scan.sh writes it."""
+    root = tmp_path_factory.mktemp("repo")
+    (root / "tests").mkdir()
+    (root / "tests" / "test_sample.py").write_text(SAMPLE_TESTS.lstrip())
+    subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "-o", "junit_family=xunit1",
+         "--junitxml=junit.xml", "tests"],
+        cwd=root, capture_output=True,
+    )
+    return str(root / "junit.xml")
+
+
+def _junit(tmp_path, cases, count=None):
+    path = tmp_path / "junit.xml"
+    path.write_text(
+        f'<?xml version="1.0"?>\n<testsuites><testsuite name="pytest" tests="{count or len(cases)}" '
+        f'failures="{len(cases)}" errors="0" skipped="0" time="1.5">{"".join(cases)}</testsuite></testsuites>'
+    )
+    return str(path)
+
+
+def _failing_case(n, traceback_lines=40):
+    body = "\n".join(f"    frame {n}.{i}" for i in range(traceback_lines))
+    return (f'<testcase classname="tests.test_big" file="tests/test_big.py" line="{n}" name="test_{n}">'
+            f'<failure message="assert {n} == 0">{body}\ntests/test_big.py:{n + 1}: AssertionError'
+            f'</failure></testcase>')
+
+
+class TestParseJunit:
+    def test_totals(self, junit):
+        totals, _ = report.parse_junit(junit)
+
+        assert {k: totals[k] for k in ("tests", "passed", "failures", "errors", "skipped")} == {
+            "tests": 6, "passed": 2, "failures": 2, "errors": 1, "skipped": 1}
+
+    def test_xunit1_ids_and_locations(self, junit):
+        _, failures = report.parse_junit(junit)
+
+        assert [(f["test"], f["kind"], f["type"], f["file"], f["line"]) for f in failures] == [
+            ("tests/test_sample.py::TestMath::test_div", "failure", "ZeroDivisionError",
+             "tests/test_sample.py", 14),
+            ("tests/test_sample.py::test_add[2-3]", "failure", "AssertionError", "tests/test_sample.py", 19),
+            ("tests/test_sample.py::test_uses_db", "error", "RuntimeError", "tests/test_sample.py", 6),
+        ]
+        assert failures[0]["message"] == "division by zero"
+        assert failures[1]["message"] == "assert (2 + 1) == 2"
+        assert "database is down" in failures[2]["message"]
+        assert failures[2]["traceback"].endswith("E       RuntimeError: database is down")
+
+    def test_classname_only_ids(self, tmp_path):
+        path = _junit(tmp_path, [
+            '<testcase classname="tests.test_api.TestLogin" name="test_bad_password">'
+            '<failure message="AssertionError: 401 != 200">boom</failure></testcase>',
+        ])
+
+        _, [entry] = report.parse_junit(path)
+
+        assert entry["test"] == "tests/test_api/TestLogin.py::test_bad_password"
+        assert (entry["type"], entry["message"], entry["file"]) == ("AssertionError", "401 != 200", None)
+
+
+class TestFailure:
+    def test_trims_traceback_and_message(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(report, "REPORT_TRACEBACK_LINES", 5)
+        monkeypatch.setattr(report, "REPORT_MESSAGE_CHARS", 20)
+        path = _junit(tmp_path, [_failing_case(7).replace('message="assert 7 == 0"', f'message="{"x" * 50}"')])
+
+        _, [entry] = report.parse_junit(path)
+
+        assert entry["traceback"].splitlines() == [f"    frame 7.{i}" for i in range(35, 40)]
+        assert entry["message"] == "x" * 20
+        assert (entry["file"], entry["line"]) == ("tests/test_big.py", 8)   # crash line, not the def
+
+    def test_setup_error_without_location(self):
+        import xml.etree.ElementTree as ET
+
+        case = ET.fromstring('<testcase classname="tests.test_db" file="tests/test_db.py" line="9" '
+                             'name="test_query"><error message="failed on setup with &quot;'
+                             'OSError: no socket&quot;">fixture exploded</error></testcase>')
+
+        entry = report._failure(case, case.find("error"), "error")
+
+        assert entry["kind"] == "error"
+        assert entry["type"] == "error"                   # nothing better to go on
+        assert (entry["file"], entry["line"]) == ("tests/test_db.py", 10)   # junit lines are 0-based
+
+
+class TestSummarise:
+    def test_all_fit(self, junit):
+        totals, failures = report.parse_junit(junit)
+
+        summary, text = report.summarise(totals, failures, 1, "incremental")
+
+        assert summary["omitted"] == 0
+        assert len(summary["failures"]) == 3
+        assert text.startswith("Tests: 6 run, 2 passed, 2 failed, 1 errors, 1 skipped")
+        assert "(selection: incremental, exit code 1)" in text
+        assert "FAILED tests/test_sample.py::test_add[2-3] – AssertionError: assert (2 + 1) == 2" in text
+
+    def test_no_failures(self):
+        totals = {"tests": 3, "passed": 3, "failures": 0, "errors": 0, "skipped": 0, "time": 0.1}
+
+        assert report.summarise(totals, [], 0)[1].endswith("No test failures detected.")
+        assert report.summarise(dict(totals, tests=0, passed=0), [], 5)[1].endswith(
+            "No tests found in repository.")
+
+    @pytest.mark.parametrize("budget", [1500, 3000, 6000])
+    def test_counts_omitted_within_budget(self, tmp_path, budget):
+        totals, failures = report.parse_junit(_junit(tmp_path, [_failing_case(n) for n in range(60)]))
+
+        summary, text = report.summarise(totals, failures, 1, budget=budget)
+
+        assert 0 < len(summary["failures"]) < 60
+        assert summary["omitted"] == 60 - len(summary["failures"])
+        assert text.endswith(f"… and {summary['omitted']} more failure(s) not shown")
+        assert len(text) <= budget
+        assert len(json.dumps(summary)) <= budget
+
+
+class TestMain:
+    def test_writes_reports_within_budget(self, tmp_path, monkeypatch, capsys):
+        monkeypatch.setattr(report, "REPORT_MAX_CHARS", 2500)
+        junit = _junit(tmp_path, [_failing_case(n) for n in range(30)])
+
+        report.main(junit, str(tmp_path / "missing.txt"), str(tmp_path), "1", "full")
+
+        summary = json.loads((tmp_path / "summary.json").read_text())
+        text = (tmp_path / "bug_report.txt").read_text()
+        assert summary["omitted"] == 30 - len(summary["failures"]) > 0
+        assert len((tmp_path / "summary.json").read_text()) <= 2500
+        assert len(text.rstrip("\n")) <= 2500
+        assert capsys.readouterr().out.startswith("Tests: 30 run, 0 passed, 30 failed")
+
+    def test_falls_back_to_raw_log_without_junit(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(report, "REPORT_MAX_CHARS", 1000)
+        raw = tmp_path / "report.txt"
+        raw.write_text("collecting ...\n" + "ImportError: no module named 'x' ✗\n" * 200 + "END OF LOG\n")
+
+        report.main(str(tmp_path / "junit.xml"), str(raw), str(tmp_path), "2", "full")
+
+        summary = json.loads((tmp_path / "summary.json").read_text())
+        text = (tmp_path / "bug_report.txt").read_text()
+        assert summary["totals"] is None and summary["failures"] == []
+        assert summary["log_tail"].endswith("END OF LOG\n")
+        assert text.startswith("Test run produced no JUnit report (selection: full, exit code 2).")
+        assert len((tmp_path / "summary.json").read_text()) <= 1000
+        assert len(text) <= 1000
+
+    def test_unreadable_junit_uses_fallback(self, tmp_path):
+        (tmp_path / "junit.xml").write_text("<testsuite")
+
+        summary, text = report.fallback(str(tmp_path / "missing.txt"), 0, "none", budget=500)
+        report.main(str(tmp_path / "junit.xml"), str(tmp_path / "missing.txt"), str(tmp_path), "0", "none")
+
+        assert text == "No tests impacted by this change."
+        assert (tmp_path / "bug_report.txt").read_text() == text + "\n"
+        assert json.loads((tmp_path / "summary.json").read_text()) == summary